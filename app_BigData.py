@@ -1,57 +1,474 @@
 # Import packages
-from dash import Dash, html, dash_table, dcc
+from dash import Dash, html, dash_table, dcc, no_update, Patch, ctx
 from dash.dependencies import Input, Output, State
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
+from plotly.colors import sequential, hex_to_rgb
 import sqlite3 
 import csv
 import numpy as np
+import os
+import threading
+import weakref
+import tempfile
+import glob
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from functools import lru_cache, wraps, partial
+from contextlib import contextmanager
+import gzip
+import zlib
+import struct
+import base64
+import hashlib
+import copy
+import io
+import hmac
+import secrets
+import shutil
+import json
+import sys
+import argparse
+from datetime import datetime
+from urllib.parse import urlencode
+from flask import request, send_from_directory, jsonify, Response, stream_with_context, g, has_request_context
+from dash.exceptions import PreventUpdate
 
-print("-----------------------------")
-print("Programm wird gestartet...")
-print("-----------------------------")
+# Optional: Parquet-Export (pip install pyarrow)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
-print("Daten werden eingelesen..")
+# Optional: Brotli-Komprimierung (pip install brotli)
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-# Datensatz einlesen
+# Optional: Speicherbericht mit eingeblendeten Dateiseiten (pip install psutil)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Optional: Hintergrund-Callbacks (pip install "dash[diskcache]")
+try:
+    import diskcache
+    import psutil
+    from dash import DiskcacheManager
+except ImportError:
+    diskcache = None
+
+# Konfiguration
+# Standardwerte kommen aus Umgebungsvariablen und können beim Erzeugen der App
+# (create_app) überschrieben werden, z.B. create_app({"daten_pfad": "...", "port": 8050}).
+# daten_pfad kann eine Datei, ein Verzeichnis oder ein Muster sein (z.B. "export/*_all_*.csv").
 file_path=('CR300Series wlan_Table1_all_3.csv')
 
-df = pd.read_csv(
-    file_path,
-    skiprows=4,  # Überspringe nur die erste Zeile, wenn diese Metadaten oder ähnliches enthält
-    names=["TIMESTAMP", "RECORD", "WindDir", "WS_ms_Avg", "AirTC_Avg", "RH_Avg", "BP_mbar_Avg", "Rain_mm_Avg", "HAmount_Avg", "Rain_mm_2_Tot", "SlrkW_Avg", "SlrMJ_Tot", "QR_Avg"],
-    skipinitialspace=True,
-    sep=',',
-    decimal=".",
-    engine='python',
-    parse_dates=["TIMESTAMP"]
-)
+def standardKonfiguration():
+    return {
+        "daten_pfad": os.environ.get("DATEN_PFAD", file_path),
+        "host": os.environ.get("HOST", "0.0.0.0"),
+        "port": int(os.environ.get("PORT", "8080")),
+        "debug": False,
+        # Daten nach dem Start in einem eigenen Thread einlesen, statt beim ersten Callback
+        "vorladen": True,
+        "hintergrund_cache": os.environ.get("HINTERGRUND_CACHE", "./cache_hintergrund"),
+        "statischer_export_dir": os.environ.get("STATISCHER_EXPORT_DIR"),
+        "statischer_export_url": os.environ.get("STATISCHER_EXPORT_URL"),
+        "aktualisierung_sekunden": int(os.environ.get("AKTUALISIERUNG_SEKUNDEN", "60")),
+        # neue Zeilen der Datei alle x Sekunden nachladen (0 = aus)
+        "nachladen_sekunden": int(os.environ.get("NACHLADEN_SEKUNDEN", "60")),
+        "komprimierung_min_bytes": int(os.environ.get("KOMPRIMIERUNG_MIN_BYTES", "1024")),
+        # Speicherbudget in MB: ältere Jahre der Rohdaten werden auf die Festplatte ausgelagert
+        # (ohne Budget bleibt alles im Arbeitsspeicher)
+        "speicher_budget_mb": float(os.environ["SPEICHER_BUDGET_MB"]) if os.environ.get("SPEICHER_BUDGET_MB") else None,
+        "speicher_verzeichnis": os.environ.get("SPEICHER_VERZEICHNIS", "./cache_speicher"),
+        # Format der ausgelagerten Jahre: "archiv" (komprimiert, siehe Archiv) oder "npy" (unkomprimiert, mmap)
+        "speicher_format": os.environ.get("SPEICHER_FORMAT", "archiv"),
+        # Prozesse zum Einlesen mehrerer Dateien (0 = Anzahl der Kerne)
+        "einlese_prozesse": int(os.environ.get("EINLESE_PROZESSE", "0")),
+        # ohne Token ist das Profiling (/profiling/...) abgeschaltet
+        "profiling_token": os.environ.get("PROFILING_TOKEN")
+    }
 
-df["TIMESTAMP"] = pd.to_datetime(
-    df["TIMESTAMP"], format="%Y-%m-%d %H:%M:%S",
-    errors="coerce"
-)
-print("Daten erfolgreich eingelesen")
+konfiguration = standardKonfiguration()
+
+# Metriken
+# Aufrufzahlen, Laufzeiten (gesamt und je Phase), Antwortgrößen und Cache-Treffer werden bei
+# jedem Aufruf nur hochgezählt. In Text (Prometheus-Format) umgewandelt werden sie erst,
+# wenn /metrics abgefragt wird. Hintergrund-Aufträge laufen in eigenen Prozessen und legen
+# ihre Messwerte in einer Warteschlange im Hintergrund-Cache ab, die beim Abfragen geleert wird.
+latenz_grenzen = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+bytes_grenzen = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+metrik_beschreibungen = {
+    "klimastation_callback_aufrufe_total": ("counter", "Aufrufe je Callback und Ergebnis (ok, kein_update, fehler)", None),
+    "klimastation_callback_sekunden": ("histogram", "Laufzeit je Callback", latenz_grenzen),
+    "klimastation_callback_phase_sekunden": ("histogram", "Laufzeit je Callback und Phase (filtern, aggregieren, diagramm, serialisieren)", latenz_grenzen),
+    "klimastation_antwort_bytes": ("histogram", "Größe der Callback-Antworten vor der Komprimierung", bytes_grenzen),
+    "klimastation_cache_zugriffe_total": ("counter", "Cache-Zugriffe je Cache und Ergebnis (treffer, fehlgriff)", None),
+    "klimastation_laden_sekunden": ("histogram", "Laufzeit beim Einlesen der Daten je Phase (einlesen, rollup_stunde, rollup_tag, rollup_monat, abdeckung, klimatologie, skizzen, auslagern, nachladen)", latenz_grenzen),
+    "klimastation_daten_zeilen": ("gauge", "Anzahl Zeilen der eingelesenen Rohdaten", None),
+    "klimastation_speicher_bytes": ("gauge", "Speicherbedarf je Bereich (rollups, klimatologie, skizzen, roh_ram, roh_datei, roh_datei_resident)", None),
+    "klimastation_speicher_budget_bytes": ("gauge", "Konfiguriertes Speicherbudget", None)
+}
+
+class Metriken:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.zaehler = {}
+        self.histogramme = {}
+        self.sammler = []
+        self.pid = os.getpid()
+        self.warteschlange = None
+
+    # In Hintergrund-Prozessen landen Messwerte in der Warteschlange statt im eigenen Speicher
+    def anderer_prozess(self, eintrag):
+        if os.getpid() == self.pid or self.warteschlange is None:
+            return False
+        self.warteschlange.push(eintrag, prefix="metriken")
+        return True
+
+    def zaehle(self, name, labels, wert=1):
+        labels = tuple(sorted(labels.items()))
+        if self.anderer_prozess(("zaehle", name, labels, wert)):
+            return
+        with self.lock:
+            self.zaehler[(name, labels)] = self.zaehler.get((name, labels), 0) + wert
+
+    def beobachte(self, name, labels, wert):
+        labels = tuple(sorted(labels.items()))
+        if self.anderer_prozess(("beobachte", name, labels, wert)):
+            return
+        grenzen = metrik_beschreibungen[name][2]
+        with self.lock:
+            histogramm = self.histogramme.get((name, labels))
+            if histogramm is None:
+                # je Grenze eine Anzahl, dann Summe und Gesamtanzahl
+                histogramm = self.histogramme[(name, labels)] = [0] * (len(grenzen) + 2)
+            for i, grenze in enumerate(grenzen):
+                if wert <= grenze:
+                    histogramm[i] += 1
+                    break
+            histogramm[-2] += wert
+            histogramm[-1] += 1
+
+    @contextmanager
+    def stoppuhr(self, name, labels):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.beobachte(name, labels, perf_counter() - start)
+
+    def uebernehmeWarteschlange(self):
+        if self.warteschlange is None:
+            return
+        while True:
+            schluessel, eintrag = self.warteschlange.pull(prefix="metriken")
+            if schluessel is None:
+                return
+            art, name, labels, wert = eintrag
+            if art == "zaehle":
+                self.zaehle(name, dict(labels), wert)
+            else:
+                self.beobachte(name, dict(labels), wert)
+
+    def text(self):
+        self.uebernehmeWarteschlange()
+        with self.lock:
+            proben = [(name, labels, wert) for (name, labels), wert in self.zaehler.items()]
+            histogramme = [(name, labels, list(werte)) for (name, labels), werte in self.histogramme.items()]
+        for sammler in self.sammler:
+            proben += sammler()
+
+        def labeltext(labels):
+            if not labels:
+                return ""
+            teile = []
+            for schluessel, wert in labels:
+                wert = str(wert).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                teile.append(f'{schluessel}="{wert}"')
+            return "{" + ",".join(teile) + "}"
+
+        zeilen = []
+        for name, (typ, hilfe, grenzen) in metrik_beschreibungen.items():
+            zeilen += [f"# HELP {name} {hilfe}", f"# TYPE {name} {typ}"]
+            for probe_name, labels, wert in sorted(proben, key=lambda p: (p[0], p[1])):
+                if probe_name == name:
+                    zeilen.append(f"{name}{labeltext(labels)} {wert}")
+            for probe_name, labels, werte in sorted(histogramme, key=lambda h: (h[0], h[1])):
+                if probe_name != name:
+                    continue
+                kumuliert = 0
+                for grenze, anzahl in zip(grenzen, werte):
+                    kumuliert += anzahl
+                    zeilen.append(f"{name}_bucket{labeltext(labels + (('le', str(grenze)),))} {kumuliert}")
+                zeilen.append(f"{name}_bucket{labeltext(labels + (('le', '+Inf'),))} {werte[-1]}")
+                zeilen.append(f"{name}_sum{labeltext(labels)} {werte[-2]}")
+                zeilen.append(f"{name}_count{labeltext(labels)} {werte[-1]}")
+        return "\n".join(zeilen) + "\n"
+
+metriken = Metriken()
+
+# Laufzeit und Phasen des aktuellen Callbacks (je Thread)
+messung_lokal = threading.local()
+
+# Profiling
+# Auf Anfrage (POST /profiling/start, nur mit Token) werden die nächsten N Aufrufe eines
+# Callbacks per Stichprobe profiliert: Ein eigener Thread liest in festen Abständen den
+# Aufrufstapel des Callbacks. Das Ergebnis wird im "folded"-Format ausgeliefert, das
+# flamegraph.pl, speedscope oder inferno direkt einlesen. Ohne offenen Auftrag kostet das
+# je Callback nur eine Abfrage.
+profil_max_auftraege = 20
+profil_max_aufrufe = 100
+
+class Abtaster(threading.Thread):
+    def __init__(self, thread_id, wurzel, intervall):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.wurzel = wurzel
+        self.intervall = intervall
+        self.stapel = {}
+        self.beendet = threading.Event()
+
+    def run(self):
+        while not self.beendet.wait(self.intervall):
+            rahmen = sys._current_frames().get(self.thread_id)
+            namen = []
+            # nur die Aufrufe unterhalb des Callbacks, nicht Flask/Dash darüber
+            while rahmen is not None and rahmen is not self.wurzel:
+                code = rahmen.f_code
+                namen.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                rahmen = rahmen.f_back
+            if self.beendet.is_set():
+                break
+            if rahmen is None or not namen:
+                continue
+            schluessel = ";".join(reversed(namen))
+            self.stapel[schluessel] = self.stapel.get(schluessel, 0) + 1
+
+    def beende(self):
+        self.beendet.set()
+        self.join()
+        return self.stapel
+
+class Profilierung:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.auftraege = {}
+        self.callbacks = set()
+        self.offen = False
+        self.pid = os.getpid()
+        self.warteschlange = None
+
+    def aktualisiereOffen(self):
+        self.offen = any(a["gestartet"] < a["anzahl"] for a in self.auftraege.values())
+
+    def starte(self, callback, anzahl, intervall):
+        auftrag = {
+            "id": secrets.token_hex(8),
+            "callback": callback,
+            "anzahl": anzahl,
+            "intervall_ms": round(intervall * 1000, 3),
+            "erstellt": datetime.now().isoformat(timespec="seconds"),
+            "gestartet": 0,
+            "aufrufe": [],
+            "stapel": {}
+        }
+        with self.lock:
+            # ältere Aufträge verwerfen
+            while len(self.auftraege) >= profil_max_auftraege:
+                del self.auftraege[next(iter(self.auftraege))]
+            self.auftraege[auftrag["id"]] = auftrag
+            self.aktualisiereOffen()
+        return auftrag["id"]
+
+    # Gilt der Aufruf als einer der nächsten N eines Auftrags? Hintergrund-Aufträge
+    # (name_hintergrund) zählen zum Callback mit demselben Namen.
+    def beanspruche(self, name):
+        self.uebernehmeWarteschlange()
+        with self.lock:
+            for auftrag in self.auftraege.values():
+                if auftrag["gestartet"] < auftrag["anzahl"] and name in (auftrag["callback"], auftrag["callback"] + "_hintergrund"):
+                    auftrag["gestartet"] += 1
+                    self.aktualisiereOffen()
+                    return auftrag["id"], auftrag["intervall_ms"] / 1000
+        return None
+
+    # Aufrufe ohne Ergebnis (no_update, z.B. ausgeblendete Kachel) oder ohne Stichprobe
+    # (kürzer als das Intervall, z.B. nur Hintergrund-Auftrag angestoßen) zählen nicht
+    def freigeben(self, auftrag_id):
+        with self.lock:
+            auftrag = self.auftraege.get(auftrag_id)
+            if auftrag is not None:
+                auftrag["gestartet"] -= 1
+                self.aktualisiereOffen()
+
+    def speichere(self, auftrag_id, name, dauer, stapel):
+        # Hintergrund-Prozesse übergeben ihr Profil über den Hintergrund-Cache
+        if os.getpid() != self.pid:
+            if self.warteschlange is not None:
+                self.warteschlange.push((auftrag_id, name, dauer, stapel), prefix="profil")
+            return
+        with self.lock:
+            auftrag = self.auftraege.get(auftrag_id)
+            if auftrag is None or len(auftrag["aufrufe"]) >= auftrag["anzahl"]:
+                return
+            nummer = len(auftrag["aufrufe"]) + 1
+            auftrag["aufrufe"].append({
+                "nummer": nummer,
+                "callback": name,
+                "sekunden": round(dauer, 4),
+                "stichproben": sum(stapel.values())
+            })
+            # je Aufruf ein eigener Wurzelknoten, damit langsame Aufrufe im Flamegraph auffallen
+            wurzel = f"{name} #{nummer} {dauer * 1000:.0f}ms"
+            for schluessel, anzahl in stapel.items():
+                schluessel = wurzel + ";" + schluessel
+                auftrag["stapel"][schluessel] = auftrag["stapel"].get(schluessel, 0) + anzahl
+            auftrag["gestartet"] = max(auftrag["gestartet"], len(auftrag["aufrufe"]))
+            self.aktualisiereOffen()
+
+    def uebernehmeWarteschlange(self):
+        if self.warteschlange is None or os.getpid() != self.pid:
+            return
+        while True:
+            schluessel, eintrag = self.warteschlange.pull(prefix="profil")
+            if schluessel is None:
+                return
+            self.speichere(*eintrag)
+
+    def status(self, auftrag_id):
+        self.uebernehmeWarteschlange()
+        with self.lock:
+            auftrag = self.auftraege.get(auftrag_id)
+            if auftrag is None:
+                return None
+            status = {k: v for k, v in auftrag.items() if k != "stapel"}
+            status["aufrufe"] = list(auftrag["aufrufe"])
+            status["fertig"] = len(auftrag["aufrufe"]) >= auftrag["anzahl"]
+            return status
+
+    def folded(self, auftrag_id):
+        self.uebernehmeWarteschlange()
+        with self.lock:
+            auftrag = self.auftraege.get(auftrag_id)
+            if auftrag is None:
+                return None
+            return "".join(f"{schluessel} {anzahl}\n" for schluessel, anzahl in auftrag["stapel"].items())
 
-# Spalten HA-mount_Avg, SlrMJ_Tot und Qr_Avg rauslöschen
-df.drop(columns=["HAmount_Avg", "SlrMJ_Tot", "QR_Avg"], inplace=True)
+profilierung = Profilierung()
 
-numeric_col = df.columns.drop("TIMESTAMP")
-df[numeric_col] = df[numeric_col].replace(",", ".", regex=True).astype(float)
+# Datensatz einlesen
+csv_spalten = ["TIMESTAMP", "RECORD", "WindDir", "WS_ms_Avg", "AirTC_Avg", "RH_Avg", "BP_mbar_Avg", "Rain_mm_Avg", "HAmount_Avg", "Rain_mm_2_Tot", "SlrkW_Avg", "SlrMJ_Tot", "QR_Avg"]
+
+def leseDaten(pfad, kopfzeilen=4, still=False):
+    if not still:
+        print("Daten werden eingelesen..")
+    if istArchiv(pfad):
+        return Archiv(pfad).rahmen(slice(None))
+    df = pd.read_csv(
+        pfad,
+        skiprows=kopfzeilen,  # Überspringe nur die erste Zeile, wenn diese Metadaten oder ähnliches enthält
+        names=csv_spalten,
+        skipinitialspace=True,
+        sep=',',
+        decimal=".",
+        engine='c',
+        parse_dates=["TIMESTAMP"]
+    )
+
+    df["TIMESTAMP"] = pd.to_datetime(
+        df["TIMESTAMP"], format="%Y-%m-%d %H:%M:%S",
+        errors="coerce"
+    )
+    if not still:
+        print("Daten erfolgreich eingelesen")
+
+    # Spalten HA-mount_Avg, SlrMJ_Tot und Qr_Avg rauslöschen
+    df.drop(columns=["HAmount_Avg", "SlrMJ_Tot", "QR_Avg"], inplace=True)
+
+    numeric_col = df.columns.drop("TIMESTAMP")
+    df[numeric_col] = df[numeric_col].replace(",", ".", regex=True).astype(float)
+
+    # Timestamp in datetime
+    df["TIMESTAMP"] = pd.to_datetime(df["TIMESTAMP"], dayfirst=True)
+    df["WS_ms_Avg"] = pd.to_numeric(df["WS_ms_Avg"], errors="coerce")
 
-# Timestamp in datetime
-df["TIMESTAMP"] = pd.to_datetime(df["TIMESTAMP"], dayfirst=True)
-df["WS_ms_Avg"] = pd.to_numeric(df["WS_ms_Avg"], errors="coerce")
+    # Index setzen
+    return df.set_index("TIMESTAMP")
 
-# Index setzen
-df = df.set_index("TIMESTAMP")
-#print(df.head(5).to_string())
+# Nur die ab Byte ab_byte angehängten, vollständigen Zeilen lesen (zum Nachladen).
+# Gibt die Zeilen (oder None) und das Byte zurück, ab dem beim nächsten Mal gelesen wird.
+def leseNeueDaten(pfad, ab_byte):
+    with open(pfad, "rb") as datei:
+        datei.seek(ab_byte)
+        inhalt = datei.read()
+    ende = inhalt.rfind(b"\n") + 1
+    if ende == 0:
+        return None, ab_byte
+    return leseDaten(io.BytesIO(inhalt[:ende]), kopfzeilen=0, still=True), ab_byte + ende
 
-# Stündliche Aggregation
+# Mehrere Dateien
+# Der Datenlogger legt regelmäßig neue Tabellendateien an. daten_pfad kann deshalb auch ein
+# Verzeichnis oder ein Muster sein. Die Dateien werden parallel in einem Prozess-Pool gelesen,
+# danach zusammengeführt, doppelte Datensätze (gleicher TIMESTAMP und RECORD) entfernt und
+# nach Zeit sortiert. Rollups usw. entstehen wie bei einer Datei einmal aus dem Ergebnis.
+daten_endungen = (".csv", ".dat")
+# Jeder Prozess importiert das Skript neu (knapp 1 s); darunter wird nacheinander gelesen
+einlese_parallel_bytes = 64 * 2**20
+
+# Dateien zu daten_pfad, älteste zuerst (nach Änderungszeit): Die letzte Datei ist die, an die
+# der Logger gerade anhängt und die beim Nachladen gelesen wird
+def datenDateien(pfad):
+    if os.path.isdir(pfad):
+        dateien = [os.path.join(pfad, name) for name in os.listdir(pfad) if name.lower().endswith(daten_endungen + (archiv_endung,))]
+    elif glob.has_magic(pfad):
+        dateien = [datei for datei in glob.glob(pfad) if os.path.isfile(datei)]
+    else:
+        return [pfad]
+    return sorted(dateien, key=lambda datei: (os.path.getmtime(datei), datei))
+
+def vereinigeDaten(teile):
+    df = pd.concat(teile)
+    doppelt = pd.MultiIndex.from_arrays([df.index, df["RECORD"]]).duplicated(keep="last")
+    if doppelt.any():
+        df = df[~doppelt]
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind="stable")
+    return df
+
+def leseQuellen(dateien, still=False):
+    if not dateien:
+        raise FileNotFoundError("Keine Dateien gefunden: " + konfiguration["daten_pfad"])
+    if len(dateien) == 1:
+        return leseDaten(dateien[0], still=still)
+    if not still:
+        print(f"Daten werden eingelesen ({len(dateien)} Dateien)..")
+    prozesse = min(len(dateien), konfiguration["einlese_prozesse"] or os.cpu_count() or 1)
+    if sum(map(os.path.getsize, dateien)) < einlese_parallel_bytes:
+        prozesse = 1
+    # Hintergrund-Aufträge laufen in Daemon-Prozessen, die keine eigenen Prozesse starten dürfen
+    if prozesse > 1 and not multiprocessing.current_process().daemon:
+        # spawn statt fork: eingelesen wird meist in einem Thread (vorladen)
+        with ProcessPoolExecutor(max_workers=prozesse, mp_context=multiprocessing.get_context("spawn")) as pool:
+            teile = list(pool.map(partial(leseDaten, still=True), dateien))
+    else:
+        teile = [leseDaten(datei, still=True) for datei in dateien]
+    df = vereinigeDaten(teile)
+    if not still:
+        print(f"Daten erfolgreich eingelesen: {len(df)} Zeilen")
+    return df
+
+# Aggregation
 # Überall wird der Mittelwert einfach über das Atrithmetische Mittel berechnet.
 # Spezialfall: WindDir: hier erst Umwandlung in Einheitsvektor, dann arith. Mittel, dann zurück wandeln
-df_hourly = df.resample("h").agg({
+aggregation_regeln = {
     "RECORD": "count",                
     "WindDir": lambda x: np.degrees(np.arctan2(
         np.mean(np.sin(np.radians(x))),
@@ -64,61 +481,1049 @@ df_hourly = df.resample("h").agg({
     "Rain_mm_Avg": "sum",
     "Rain_mm_2_Tot": "sum",
     "SlrkW_Avg": "mean"
-}).reset_index()
+}
 
-# Windrichtung wieder auf 0-360° anpassen
-df_hourly["WindDir"] = (df_hourly["WindDir"] + 360) % 360
+def aggregiere(data, freq):
+    ergebnis = data.resample(freq).agg(aggregation_regeln)
+    # Windrichtung wieder auf 0-360° anpassen
+    ergebnis["WindDir"] = (ergebnis["WindDir"] + 360) % 360
+    return ergebnis
 
-# Rudnen auf zwei Nachkommastellen
-df_hourly = df_hourly.round(2)
-print("Attributstabelle: ")
-print("")
-print(df.tail(10).to_string())
+# Abgeleitete Größen
+# Werden nicht als Spalten gespeichert, sondern erst bei Bedarf für den angefragten Zeitraum und
+# die angefragte Auflösung aus den Basisspalten berechnet (vektorisiert mit NumPy).
+# "mindestens": feinste Auflösung, auf der die Größe sinnvoll ist; auf Rollups wird aus den
+# Mittelwerten der Basisspalten gerechnet.
 
-# Diagramme
+# Taupunkt nach der Magnus-Formel (°C)
+def taupunkt(T, RH):
+    gamma = np.log(RH / 100) + 17.62 * T / (243.12 + T)
+    return 243.12 * gamma / (17.62 - gamma)
 
-# Solare Einstrahlung
+# Hitzeindex nach NOAA (Rothfusz-Regression mit Korrekturen, unter ca. 27 °C Steadman) in °C
+def hitzeindex(T, RH):
+    F = T * 9 / 5 + 32
+    einfach = 0.5 * (F + 61 + (F - 68) * 1.2 + RH * 0.094)
+    voll = (-42.379 + 2.04901523 * F + 10.14333127 * RH - 0.22475541 * F * RH
+            - 6.83783e-3 * F ** 2 - 5.481717e-2 * RH ** 2 + 1.22874e-3 * F ** 2 * RH
+            + 8.5282e-4 * F * RH ** 2 - 1.99e-6 * F ** 2 * RH ** 2)
+    voll = np.where((RH < 13) & (F >= 80) & (F <= 112),
+                    voll - (13 - RH) / 4 * np.sqrt(np.maximum(0, 17 - np.abs(F - 95)) / 17), voll)
+    voll = np.where((RH > 85) & (F >= 80) & (F <= 87), voll + (RH - 85) / 10 * (87 - F) / 5, voll)
+    return (np.where((einfach + F) / 2 >= 80, voll, einfach) - 32) * 5 / 9
 
-fig_solar = px.imshow(
-    [[0]],
-    labels=dict(x='Monat', y='Stunde', color='Solare Einstrahlung (W/m2)'),
-    aspect='auto'
-)
+# Absolute Luftfeuchtigkeit (g/m³) aus Sättigungsdampfdruck (hPa) und relativer Feuchte
+def absoluteFeuchte(T, RH):
+    saettigung = 6.112 * np.exp(17.67 * T / (T + 243.5))
+    return saettigung * RH * 2.1674 / (273.15 + T)
+
+# Windchill nach JAG/TI (°C), nur bei höchstens 10 °C und mehr als 4,8 km/h Wind, sonst Lufttemperatur
+def windchill(T, WS):
+    v = (WS * 3.6) ** 0.16
+    return np.where((T <= 10) & (WS * 3.6 > 4.8), 13.12 + 0.6215 * T - 11.37 * v + 0.3965 * T * v, T)
+
+# Sonnenenergie pro Tag (kWh/m²): mittlere Einstrahlung (kW/m²) mal 24 Stunden
+def sonnenenergie(SR):
+    return SR * 24
+
+abgeleitete_variablen = {
+    "Taupunkt": {"name": "Taupunkt", "einheit": "°C", "basis": ["AirTC_Avg", "RH_Avg"], "formel": taupunkt, "mindestens": "roh"},
+    "Hitzeindex": {"name": "Hitzeindex", "einheit": "°C", "basis": ["AirTC_Avg", "RH_Avg"], "formel": hitzeindex, "mindestens": "roh"},
+    "AbsoluteFeuchte": {"name": "Absolute Luftfeuchtigkeit", "einheit": "g/m³", "basis": ["AirTC_Avg", "RH_Avg"], "formel": absoluteFeuchte, "mindestens": "roh"},
+    "Windchill": {"name": "Windchill", "einheit": "°C", "basis": ["AirTC_Avg", "WS_ms_Avg"], "formel": windchill, "mindestens": "roh"},
+    "Sonnenenergie": {"name": "Sonnenenergie pro Tag", "einheit": "kWh/m²", "basis": ["SlrkW_Avg"], "formel": sonnenenergie, "mindestens": "tag", "art": "balken"}
+}
+aufloesungs_stufen = ["roh", "stunde", "tag", "monat"]
+
+def abgeleitetVerfuegbar(name, aufloesung):
+    return aufloesungs_stufen.index(aufloesung) >= aufloesungs_stufen.index(abgeleitete_variablen[name]["mindestens"])
+
+def berechneAbgeleitet(name, data):
+    variable = abgeleitete_variablen[name]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return variable["formel"](*[data[spalte].to_numpy(dtype=float) for spalte in variable["basis"]])
+
+# Rohdaten in Stufen
+# Mit Speicherbudget (konfiguration["speicher_budget_mb"]) bleiben die Rollups und die jüngsten
+# Jahre der Rohdaten im Arbeitsspeicher. Ältere Jahre werden spaltenweise als .npy-Dateien
+# abgelegt und per Memory-Mapping gelesen: Das Betriebssystem lädt nur die Seiten, die eine
+# Abfrage in Rohauflösung tatsächlich braucht, und kann sie bei Bedarf wieder verwerfen.
+# Zugriff wie bei iloc über Zeilenpositionen: grenzen(start, ende) -> (links, rechts),
+# zeilen(links, rechts) und auswahl(positionen).
+# Ausgelagerte Dateien gehören dem Prozess, der sie angelegt hat. Sie werden entfernt, sobald
+# kein Datenstand den Teil mehr verwendet; bis dahin bleiben sie über die geöffnete Datei bzw.
+# das mmap lesbar, auch wenn ein anderer Prozess das Verzeichnis aufräumt.
+def entferneAusgelagert(pfad, pid):
+    if os.getpid() != pid:
+        return
+    if os.path.isdir(pfad):
+        shutil.rmtree(pfad, ignore_errors=True)
+    else:
+        try:
+            os.remove(pfad)
+        except OSError:
+            pass
+    # leeres Verzeichnis des Datenstands ebenfalls entfernen
+    try:
+        os.rmdir(os.path.dirname(pfad))
+    except OSError:
+        pass
+
+def prozessLaeuft(pid):
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# Verzeichnisse beendeter Prozesse (einmal je Prozess, vor dem ersten Auslagern) entfernen.
+# Je Prozess gibt es ein Unterverzeichnis mit seiner PID, darin eins je Datenstand.
+speicher_aufgeraeumt = False
+
+def raeumeSpeicherAuf(basis):
+    global speicher_aufgeraeumt
+    if speicher_aufgeraeumt:
+        return
+    speicher_aufgeraeumt = True
+    if not os.path.isdir(basis):
+        return
+    for name in os.listdir(basis):
+        if name.isdigit() and (int(name) == os.getpid() or prozessLaeuft(int(name))):
+            continue
+        shutil.rmtree(os.path.join(basis, name), ignore_errors=True)
+
+class KaltesJahr:
+    def __init__(self, verzeichnis, df):
+        os.makedirs(verzeichnis, exist_ok=True)
+        weakref.finalize(self, entferneAusgelagert, verzeichnis, os.getpid())
+        self.spalten = list(df.columns)
+        self.jahr = df.index[0].year
+        spalten = [("TIMESTAMP", df.index.to_numpy())] + [(spalte, df[spalte].to_numpy()) for spalte in self.spalten]
+        for spalte, werte in spalten:
+            pfad = os.path.join(verzeichnis, spalte + ".npy")
+            # erst vollständig schreiben, dann umbenennen
+            with open(pfad + f".{os.getpid()}.tmp", "wb") as datei:
+                np.save(datei, werte)
+            os.replace(pfad + f".{os.getpid()}.tmp", pfad)
+        self.zeiten = np.load(os.path.join(verzeichnis, "TIMESTAMP.npy"), mmap_mode="r")
+        self.werte = {spalte: np.load(os.path.join(verzeichnis, spalte + ".npy"), mmap_mode="r") for spalte in self.spalten}
+        self.dateigroesse = sum(os.path.getsize(os.path.join(verzeichnis, spalte + ".npy")) for spalte, _ in spalten)
+
+    def __len__(self):
+        return len(self.zeiten)
+
+    def searchsorted(self, werte):
+        return np.searchsorted(self.zeiten, [pd.Timestamp(w).to_datetime64() for w in werte])
+
+    def rahmen(self, auswahl):
+        index = pd.DatetimeIndex(np.array(self.zeiten[auswahl]), name="TIMESTAMP")
+        return pd.DataFrame({spalte: np.array(self.werte[spalte][auswahl]) for spalte in self.spalten}, index=index)
+
+# Archivformat
+# Rohdaten verlustfrei komprimiert in Blöcken fester Größe (archiv_blockgroesse Zeilen):
+# - Zeitstempel als Differenz der Differenzen (bei festem Messintervall fast nur Nullen)
+# - Messwerte mit höchstens 6 Nachkommastellen als ganze Zahlen (Wert * 10^Stellen) und deren
+#   Differenzen, andere per XOR mit dem vorherigen Wert (wie in Gorilla)
+# - danach Bytes umsortiert (erst alle ersten Bytes, dann alle zweiten, ...) und mit zlib gepackt
+# Am Ende der Datei steht ein Blockindex (erster/letzter Zeitstempel, Position und Kodierung je
+# Block und Spalte). Ein Zeitraum wird gelesen, indem nur die Blöcke entpackt werden, die er berührt.
+#
+# Aufbau: archiv_kennung | Blöcke | Index (npz) | Position des Index (8 Byte) | archiv_kennung
+archiv_kennung = b"KLIMAZA1"
+archiv_endung = ".kza"
+archiv_blockgroesse = 4096
+# entpackte Blöcke je Archiv im Speicher (die zuletzt benutzten)
+archiv_cache_bloecke = 32
+
+def istArchiv(pfad):
+    return isinstance(pfad, str) and pfad.endswith(archiv_endung)
+
+def mischeBytes(werte):
+    return np.ascontiguousarray(werte.view(np.uint8).reshape(-1, werte.itemsize).T).tobytes()
+
+def entmischeBytes(daten, dtype, anzahl):
+    return np.frombuffer(daten, dtype=np.uint8).reshape(np.dtype(dtype).itemsize, anzahl).T.copy().view(dtype).ravel()
+
+# Ganzzahlen mit Vorzeichen so abbilden, dass kleine Beträge kleine Zahlen ergeben (0, -1, 1, -2, ...)
+def zickzack(werte):
+    return ((werte << 1) ^ (werte >> 63)).view(np.uint64)
+
+def zickzackZurueck(werte):
+    werte = werte.view(np.int64)
+    return ((werte >> 1) & np.int64(0x7FFFFFFFFFFFFFFF)) ^ -(werte & 1)
+
+def dezimalStellen(werte):
+    with np.errstate(invalid="ignore", over="ignore"):
+        for stellen in range(7):
+            ganz = np.round(werte * 10.0 ** stellen)
+            if np.all(np.abs(ganz) < 2 ** 52) and np.array_equal(ganz.astype(np.int64) / 10.0 ** stellen, werte):
+                return stellen
+    return -1
+
+# Spalte kodieren: gibt gepackte Bytes, Dezimalstellen (-1 = XOR) und Markierungen zurück
+# (1: fehlende Werte, 2: negative Nullen; jeweils als Bitmaske an die Daten angehängt)
+def kodiereSpalte(werte):
+    fehlt = np.isnan(werte)
+    stellen = dezimalStellen(werte[~fehlt])
+    if stellen < 0:
+        bits = werte.view(np.uint64)
+        return zlib.compress(mischeBytes(bits ^ np.concatenate([[np.uint64(0)], bits[:-1]]))), -1, 0
+    ganz = np.round(np.where(fehlt, 0, werte) * 10.0 ** stellen).astype(np.int64)
+    if fehlt.any():
+        # Lücken mit dem vorherigen Wert füllen (Differenz 0)
+        ganz = ganz[np.maximum.accumulate(np.where(fehlt, 0, np.arange(len(ganz))))]
+    daten = mischeBytes(zickzack(np.diff(ganz, prepend=0)))
+    negative_null = (werte == 0) & np.signbit(werte)
+    markierungen = 0
+    for bit, maske in [(1, fehlt), (2, negative_null)]:
+        if maske.any():
+            markierungen |= bit
+            daten += np.packbits(maske).tobytes()
+    return zlib.compress(daten), stellen, markierungen
+
+def dekodiereSpalte(daten, anzahl, stellen, markierungen):
+    daten = zlib.decompress(daten)
+    if stellen < 0:
+        return np.bitwise_xor.accumulate(entmischeBytes(daten, np.uint64, anzahl)).view(np.float64)
+    werte = np.cumsum(zickzackZurueck(entmischeBytes(daten[:anzahl * 8], np.uint64, anzahl))) / 10.0 ** stellen
+    position = anzahl * 8
+    for bit, wert in [(1, np.nan), (2, -0.0)]:
+        if markierungen & bit:
+            laenge = (anzahl + 7) // 8
+            werte[np.unpackbits(np.frombuffer(daten[position:position + laenge], dtype=np.uint8), count=anzahl).astype(bool)] = wert
+            position += laenge
+    return werte
+
+def kodiereZeiten(zeiten):
+    abstaende = np.diff(zeiten, prepend=zeiten[0])
+    return zlib.compress(mischeBytes(zickzack(np.diff(abstaende, prepend=0))))
+
+def dekodiereZeiten(daten, anzahl, erste):
+    abstaende = np.cumsum(zickzackZurueck(entmischeBytes(zlib.decompress(daten), np.uint64, anzahl)))
+    return erste + np.cumsum(abstaende)
+
+def schreibeArchiv(df, pfad, blockgroesse=archiv_blockgroesse):
+    spalten = list(df.columns)
+    zeiten = df.index.to_numpy().astype("datetime64[ns]").view(np.int64)
+    werte = [df[spalte].to_numpy(dtype=float) for spalte in spalten]
+    anfaenge = np.arange(0, len(df), blockgroesse)
+    laengen = np.zeros((len(anfaenge), len(spalten) + 1), dtype=np.int64)
+    stellen = np.zeros((len(anfaenge), len(spalten)), dtype=np.int8)
+    markierungen = np.zeros((len(anfaenge), len(spalten)), dtype=np.int8)
+    positionen = np.zeros(len(anfaenge), dtype=np.int64)
+
+    with open(pfad, "wb") as datei:
+        datei.write(archiv_kennung)
+        for i, anfang in enumerate(anfaenge):
+            bereich = slice(anfang, anfang + blockgroesse)
+            positionen[i] = datei.tell()
+            stuecke = [kodiereZeiten(zeiten[bereich])]
+            for j, spalte in enumerate(werte):
+                daten, stellen[i, j], markierungen[i, j] = kodiereSpalte(spalte[bereich])
+                stuecke.append(daten)
+            laengen[i] = [len(stueck) for stueck in stuecke]
+            datei.write(b"".join(stuecke))
+
+        index = io.BytesIO()
+        np.savez(
+            index,
+            spalten=np.array(spalten), blockgroesse=np.array(blockgroesse), zeilen=np.array(len(df)),
+            erste=zeiten[anfaenge] if len(df) else np.zeros(0, dtype=np.int64),
+            letzte=zeiten[np.minimum(anfaenge + blockgroesse, len(df)) - 1] if len(df) else np.zeros(0, dtype=np.int64),
+            positionen=positionen, laengen=laengen, stellen=stellen, markierungen=markierungen
+        )
+        index_position = datei.tell()
+        datei.write(index.getvalue())
+        datei.write(np.int64(index_position).tobytes())
+        datei.write(archiv_kennung)
+
+class Archiv:
+    def __init__(self, pfad):
+        self.pfad = pfad
+        with open(pfad, "rb") as datei:
+            if datei.read(len(archiv_kennung)) != archiv_kennung:
+                raise ValueError(pfad + " ist kein Archiv")
+            datei.seek(-8 - len(archiv_kennung), os.SEEK_END)
+            index_position = int(np.frombuffer(datei.read(8), dtype=np.int64)[0])
+            ende = datei.tell() - 8
+            datei.seek(index_position)
+            index = np.load(io.BytesIO(datei.read(ende - index_position)))
+            self.spalten = [str(spalte) for spalte in index["spalten"]]
+            self.blockgroesse = int(index["blockgroesse"])
+            self.zeilen = int(index["zeilen"])
+            for name in ["erste", "letzte", "positionen", "laengen", "stellen", "markierungen"]:
+                setattr(self, name, index[name])
+        self.dateigroesse = os.path.getsize(pfad)
+        self.jahr = pd.Timestamp(self.erste[0]).year if len(self.erste) else None
+        self.cache = {}
+        self.cache_lock = threading.Lock()
+        # Datei bleibt geöffnet: Blöcke sind auch noch lesbar, wenn die Datei gelöscht wurde
+        self.datei = open(pfad, "rb")
+        self.datei_lock = threading.Lock()
+        weakref.finalize(self, self.datei.close)
+
+    def __len__(self):
+        return self.zeilen
+
+    def _lese(self, block, spalten_bis=None):
+        laengen = self.laengen[block] if spalten_bis is None else self.laengen[block][:spalten_bis]
+        with self.datei_lock:
+            self.datei.seek(int(self.positionen[block]))
+            return self.datei.read(int(laengen.sum()))
+
+    def _anzahl(self, block):
+        return min(self.blockgroesse, self.zeilen - block * self.blockgroesse)
+
+    def blockZeiten(self, block):
+        return dekodiereZeiten(self._lese(block, 1), self._anzahl(block), self.erste[block])
+
+    # Block vollständig entpacken (Zeitstempel und alle Spalten), zuletzt benutzte im Speicher
+    def block(self, block):
+        with self.cache_lock:
+            if block in self.cache:
+                self.cache[block] = self.cache.pop(block)
+                return self.cache[block]
+        daten, anzahl = self._lese(block), self._anzahl(block)
+        grenzen = np.concatenate([[0], np.cumsum(self.laengen[block])])
+        werte = {"TIMESTAMP": dekodiereZeiten(daten[:grenzen[1]], anzahl, self.erste[block])}
+        for j, spalte in enumerate(self.spalten):
+            werte[spalte] = dekodiereSpalte(daten[grenzen[j + 1]:grenzen[j + 2]], anzahl, self.stellen[block, j], self.markierungen[block, j])
+        with self.cache_lock:
+            self.cache[block] = werte
+            while len(self.cache) > archiv_cache_bloecke:
+                self.cache.pop(next(iter(self.cache)))
+        return werte
+
+    # Positionen der Zeitpunkte (wie np.searchsorted); entpackt werden nur die Zeitstempel eines Blocks
+    def searchsorted(self, werte):
+        ergebnis = []
+        for wert in werte:
+            ziel = pd.Timestamp(wert).to_datetime64().astype("datetime64[ns]").view(np.int64)
+            block = int(np.searchsorted(self.letzte, ziel))
+            if block >= len(self.letzte):
+                ergebnis.append(self.zeilen)
+            else:
+                ergebnis.append(block * self.blockgroesse + int(np.searchsorted(self.blockZeiten(block), ziel)))
+        return np.array(ergebnis, dtype=np.int64)
+
+    # Zeilen als DataFrame, auswahl ist ein slice oder ein Array von Positionen
+    def rahmen(self, auswahl):
+        if isinstance(auswahl, slice):
+            links, rechts, _ = auswahl.indices(self.zeilen)
+            positionen = np.arange(links, max(links, rechts))
+        else:
+            positionen = np.asarray(auswahl, dtype=np.int64)
+        bloecke, rang = np.unique(positionen // self.blockgroesse, return_inverse=True)
+        entpackt = [self.block(int(block)) for block in bloecke]
+        versatz = np.concatenate([[0], np.cumsum([len(werte["TIMESTAMP"]) for werte in entpackt])])
+        stellen = versatz[rang] + positionen % self.blockgroesse
+
+        def spalte(name):
+            if not entpackt:
+                return np.zeros(0, dtype=np.int64 if name == "TIMESTAMP" else float)
+            return np.concatenate([werte[name] for werte in entpackt])[stellen]
+        index = pd.DatetimeIndex(spalte("TIMESTAMP").view("datetime64[ns]"), name="TIMESTAMP")
+        return pd.DataFrame({name: spalte(name) for name in self.spalten}, index=index)
+
+    # Zeilen im Zeitraum [start, ende)
+    def ausschnitt(self, start, ende):
+        return self.rahmen(slice(*self.searchsorted([start, ende])))
+
+# Ausgelagertes Jahr der Rohdaten im Archivformat
+class ArchivJahr(Archiv):
+    def __init__(self, verzeichnis, df):
+        os.makedirs(os.path.dirname(verzeichnis), exist_ok=True)
+        pfad = verzeichnis + archiv_endung
+        # erst vollständig schreiben, dann umbenennen
+        schreibeArchiv(df, pfad + f".{os.getpid()}.tmp")
+        os.replace(pfad + f".{os.getpid()}.tmp", pfad)
+        super().__init__(pfad)
+        weakref.finalize(self, entferneAusgelagert, pfad, os.getpid())
+
+rohdaten_nachlauf_zeilen = 100000
+
+class Rohdaten:
+    def __init__(self, df, budget=None, reserviert=0, verzeichnis=None):
+        self.columns = list(df.columns)
+        self.von = df.index.min()
+        self.bis = df.index.max()
+        self.budget = budget
+        self.verzeichnis = verzeichnis
+        self.teile = [df]
+
+        if budget is not None and len(df) > 0:
+            kalt, heiss = self.lagereAus(df, reserviert, verzeichnis)
+            if kalt:
+                self.teile = kalt + ([heiss] if len(heiss) > 0 else [])
+
+        self.offsets = np.cumsum([0] + [len(teil) for teil in self.teile])
+
+    # Jahresgrenzen per Binärsuche, dann von hinten so viele Jahre im Speicher behalten, wie neben
+    # den Rollups (reserviert) ins Budget passen. Liefert die ausgelagerten Jahre und den Rest.
+    # Mit laufendes_jahr=True bleibt das letzte (noch wachsende) Jahr in jedem Fall im Speicher.
+    def lagereAus(self, df, reserviert, verzeichnis, laufendes_jahr=False):
+        erstes, letztes = df.index[0].year, df.index[-1].year
+        neujahre = [pd.Timestamp(year=jahr, month=1, day=1) for jahr in range(erstes + 1, letztes + 1)]
+        positionen = [0, *df.index.searchsorted(neujahre), len(df)]
+        bytes_je_zeile = df.memory_usage(index=True).sum() / len(df)
+        heiss_ab = len(positionen) - (2 if laufendes_jahr else 1)
+        while heiss_ab > 0 and (len(df) - positionen[heiss_ab - 1]) * bytes_je_zeile <= self.budget - reserviert:
+            heiss_ab -= 1
+        if heiss_ab == 0:
+            return [], df
+
+        # eigenes Verzeichnis je Prozess und Datenstand (dieselbe Version kann mehrfach
+        # eingelesen werden); ältere Datenstände räumen ihre Dateien selbst auf
+        basis, version = os.path.split(verzeichnis)
+        raeumeSpeicherAuf(basis)
+        os.makedirs(os.path.join(basis, str(os.getpid())), exist_ok=True)
+        verzeichnis = self.verzeichnis = tempfile.mkdtemp(prefix=version + "-", dir=os.path.join(basis, str(os.getpid())))
+        ausgelagert = ArchivJahr if konfiguration["speicher_format"] == "archiv" else KaltesJahr
+        kalt = [
+            ausgelagert(os.path.join(verzeichnis, str(erstes + i)), df.iloc[positionen[i]:positionen[i + 1]])
+            for i in range(heiss_ab) if positionen[i + 1] > positionen[i]
+        ]
+        # Kopie, damit der Speicher der ausgelagerten Jahre freigegeben wird
+        return kalt, df.iloc[positionen[heiss_ab]:].copy()
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    # Neue Rohdaten mit angehängten Zeilen. Die bisherigen Teile werden übernommen, nicht
+    # kopiert; nur ein kleiner letzter Teil wird mit den neuen Zeilen zusammengefasst.
+    def erweitere(self, neu):
+        roh = copy.copy(self)
+        letzter = self.teile[-1]
+        if isinstance(letzter, pd.DataFrame) and len(letzter) < rohdaten_nachlauf_zeilen:
+            roh.teile = self.teile[:-1] + [pd.concat([letzter, neu])]
+        else:
+            roh.teile = self.teile + [neu]
+        roh.bis = neu.index.max()
+        roh.offsets = np.cumsum([0] + [len(teil) for teil in roh.teile])
+        return roh
+
+    # Budget nach dem Anhängen erneut anwenden: Sobald der Teil im Speicher über das Budget
+    # (abzüglich reserviert) wächst und abgeschlossene Jahre enthält, werden diese ausgelagert.
+    # Ohne Änderung wird self zurückgegeben.
+    def begrenze(self, reserviert, verzeichnis):
+        if self.budget is None:
+            return self
+        erster_heisser = len(self.teile)
+        while erster_heisser > 0 and isinstance(self.teile[erster_heisser - 1], pd.DataFrame):
+            erster_heisser -= 1
+        heiss = [teil for teil in self.teile[erster_heisser:] if len(teil) > 0]
+        if not heiss or heiss[0].index[0].year == self.bis.year:
+            return self
+        if sum(teil.memory_usage(index=True).sum() for teil in heiss) <= self.budget - reserviert:
+            return self
+
+        roh = copy.copy(self)
+        kalt, rest = roh.lagereAus(heiss[0] if len(heiss) == 1 else pd.concat(heiss), reserviert, verzeichnis, laufendes_jahr=True)
+        if not kalt:
+            return self
+        roh.teile = self.teile[:erster_heisser] + kalt + [rest]
+        roh.offsets = np.cumsum([0] + [len(teil) for teil in roh.teile])
+        print(f"Speicher: Rohdaten {[teil.jahr for teil in kalt]} ausgelagert")
+        return roh
+
+    def grenzen(self, start, ende):
+        links = rechts = 0
+        for teil in self.teile:
+            l, r = teil.index.searchsorted([start, ende]) if isinstance(teil, pd.DataFrame) else teil.searchsorted([start, ende])
+            links += l
+            rechts += r
+        return int(links), int(rechts)
+
+    def zeilen(self, links, rechts):
+        stuecke = []
+        for offset, teil in zip(self.offsets, self.teile):
+            l = max(links - offset, 0)
+            r = max(min(rechts - offset, len(teil)), l)
+            if l < r or not stuecke and teil is self.teile[-1]:
+                stuecke.append(teil.iloc[l:r] if isinstance(teil, pd.DataFrame) else teil.rahmen(slice(l, r)))
+        return stuecke[0] if len(stuecke) == 1 else pd.concat(stuecke)
+
+    def ausschnitt(self, start, ende):
+        return self.zeilen(*self.grenzen(start, ende))
+
+    # Zeilen an beliebigen Positionen, in der Reihenfolge der Positionen
+    def auswahl(self, positionen):
+        positionen = np.asarray(positionen, dtype=np.int64)
+        stuecke, reihenfolge = [], []
+        for offset, teil in zip(self.offsets, self.teile):
+            treffer = np.flatnonzero((positionen >= offset) & (positionen < offset + len(teil)))
+            if len(treffer) > 0 or not stuecke and teil is self.teile[-1]:
+                lokal = positionen[treffer] - offset
+                stuecke.append(teil.iloc[lokal] if isinstance(teil, pd.DataFrame) else teil.rahmen(lokal))
+                reihenfolge.append(treffer)
+        if len(stuecke) == 1:
+            return stuecke[0]
+        return pd.concat(stuecke).iloc[np.argsort(np.concatenate(reihenfolge), kind="stable")]
+
+    # Alle Teile nacheinander als DataFrame (ausgelagerte Jahre werden dabei einzeln eingeblendet)
+    def bloecke(self):
+        for teil in self.teile:
+            yield teil if isinstance(teil, pd.DataFrame) else teil.rahmen(slice(None))
+
+    def speicherbericht(self):
+        heiss = [teil for teil in self.teile if isinstance(teil, pd.DataFrame)]
+        kalt = [teil for teil in self.teile if not isinstance(teil, pd.DataFrame)]
+        bericht = {
+            "roh_ram_bytes": int(sum(teil.memory_usage(index=True).sum() for teil in heiss)),
+            "roh_ram_zeilen": int(sum(len(teil) for teil in heiss)),
+            "roh_ram_jahre": [j for teil in heiss if len(teil) > 0 for j in range(teil.index[0].year, teil.index[-1].year + 1)],
+            "roh_datei_bytes": int(sum(teil.dateigroesse for teil in kalt)),
+            "roh_datei_zeilen": int(sum(len(teil) for teil in kalt)),
+            "roh_datei_jahre": [teil.jahr for teil in kalt],
+            "roh_datei_resident_bytes": None
+        }
+        # eingeblendete Seiten der ausgelagerten Dateien (zählen nicht zum Budget, das
+        # Betriebssystem kann sie jederzeit verwerfen)
+        if kalt and psutil is not None:
+            try:
+                # alle Verzeichnisse dieses Prozesses (nach dem Nachladen können ausgelagerte
+                # Jahre aus mehreren Datenständen stammen)
+                verzeichnis = os.path.dirname(os.path.abspath(self.verzeichnis))
+                bericht["roh_datei_resident_bytes"] = sum(
+                    karte.rss for karte in psutil.Process().memory_maps() if karte.path.startswith(verzeichnis))
+            except (psutil.Error, OSError):
+                pass
+        return bericht
+
+# Datenabdeckung
+# Anzahl Messwerte je Stunde und Tag (aus den Rollups) im Vergleich zum Messintervall des
+# Loggers. Damit lassen sich leere Tage im Kalender sperren, leere Zeiträume ohne Filtern
+# erkennen und die Vollständigkeit eines Zeitraums anzeigen.
+class Abdeckung:
+    def __init__(self, df_hourly, df_daily, intervall, von, bis):
+        self.intervall = intervall
+        self.von = von
+        self.bis = bis
+        self.stunden = df_hourly["TIMESTAMP"].to_numpy()
+        anzahl = df_hourly["RECORD"].to_numpy(dtype=np.int64)
+        self.stunden_summe = np.concatenate([[0], np.cumsum(anzahl)])
+        self.leere_stunden_summe = np.concatenate([[0], np.cumsum(anzahl == 0)])
+        self.leere_tage = df_daily.index[df_daily["RECORD"].to_numpy() == 0]
+
+    # Messwerte im Zeitfenster [start, ende) (Binärsuche auf den Stunden)
+    def anzahl(self, start, ende):
+        links, rechts = np.searchsorted(self.stunden, [pd.Timestamp(start).to_datetime64(), pd.Timestamp(ende).to_datetime64()])
+        return int(self.stunden_summe[rechts] - self.stunden_summe[links])
+
+    # Erwartete Messwerte im Zeitfenster, begrenzt auf den Zeitraum der Daten
+    def erwartet(self, start, ende):
+        start = max(pd.Timestamp(start), self.von)
+        ende = min(pd.Timestamp(ende), self.bis + self.intervall)
+        return max(0, int((ende - start) // self.intervall))
+
+    def stundenOhneDaten(self, start, ende):
+        links, rechts = np.searchsorted(self.stunden, [pd.Timestamp(start).to_datetime64(), pd.Timestamp(ende).to_datetime64()])
+        return int(self.leere_stunden_summe[rechts] - self.leere_stunden_summe[links])
+
+    def vollstaendigkeit(self, start, ende):
+        erwartet = self.erwartet(start, ende)
+        return None if erwartet == 0 else min(1.0, self.anzahl(start, ende) / erwartet)
+
+# Messintervall des Loggers (häufigster Abstand, als Median der Abstände)
+def messintervall(zeiten):
+    abstaende = np.diff(zeiten.asi8)
+    abstaende = abstaende[abstaende > 0]
+    if len(abstaende) == 0:
+        return pd.Timedelta(minutes=1)
+    return pd.Timedelta(int(np.median(abstaende)), unit="ns")
+
+# Beginn der Stunde, des Tages bzw. Monats, in dem zeitpunkt liegt
+def periodenBeginn(zeitpunkt, freq):
+    if freq == "h":
+        return zeitpunkt.floor("h")
+    elif freq == "D":
+        return zeitpunkt.normalize()
+    return zeitpunkt.to_period("M").to_timestamp()
+
+# Klimatologie
+# Vieljährige Statistik ausgewählter Variablen je Tag im Jahr und Stunde (aus den Stundenwerten),
+# je Tag im Jahr (aus den Tageswerten) und je Monat (aus den Monatswerten): Anzahl, Mittelwert und
+# Standardabweichung (Welford, je Fach zusammengeführt) sowie Perzentile aus Histogrammen mit festen
+# Klassen. Aufgenommen werden nur abgeschlossene Perioden, beim Nachladen kommen die neu abgeschlossenen
+# hinzu. Die Abweichung eines Messwerts vom Klimamittel kostet damit nur einen Index-Zugriff.
+klima_variablen = {
+    # Variable: untere Grenze, obere Grenze und Klassenbreite der Histogramme
+    "AirTC_Avg": (-40, 50, 0.5),
+    "RH_Avg": (0, 100, 1),
+    "Rain_mm_Avg": (0, 200, 1),
+    "SlrkW_Avg": (0, 1.5, 0.02)
+}
+klima_perzentile = [10, 50, 90]
+klima_faecher = {"h": 366 * 24, "D": 366, "M": 12}
+
+# Tag im Jahr (0-365) im Kalender eines Schaltjahres, damit z.B. der 1. März in jedem Jahr derselbe Tag ist
+def tagImJahr(zeiten):
+    tag = zeiten.dayofyear.to_numpy() - 1
+    return tag + ((~zeiten.is_leap_year) & (tag >= 59))
+
+def klimaFach(zeiten, freq):
+    zeiten = pd.DatetimeIndex(zeiten)
+    if freq == "h":
+        return tagImJahr(zeiten) * 24 + zeiten.hour.to_numpy()
+    elif freq == "D":
+        return tagImJahr(zeiten)
+    return zeiten.month.to_numpy() - 1
+
+class Klimatologie:
+    def __init__(self, freq):
+        self.freq = freq
+        # Beginn der ersten noch nicht aufgenommenen Periode
+        self.bis = None
+        faecher = klima_faecher[freq]
+        self.werte = {}
+        for variable, (unten, oben, breite) in klima_variablen.items():
+            self.werte[variable] = {
+                "n": np.zeros(faecher, dtype=np.int64),
+                "mittel": np.zeros(faecher),
+                "m2": np.zeros(faecher),
+                "histogramm": np.zeros((faecher, int(round((oben - unten) / breite))), dtype=np.uint16),
+                "perzentile": np.full((faecher, len(klima_perzentile)), np.nan)
+            }
+
+    # Neue Klimatologie mit den Perioden aus rollup ab self.bis bis vor die Periode von bis
+    # (die noch nicht abgeschlossen ist). Die bisherige bleibt unverändert.
+    def erweitere(self, rollup, bis):
+        klima = copy.copy(self)
+        ende = periodenBeginn(bis, self.freq)
+        zeiten = pd.DatetimeIndex(rollup["TIMESTAMP"] if "TIMESTAMP" in rollup.columns else rollup.index)
+        links = 0 if self.bis is None else zeiten.searchsorted(self.bis)
+        rechts = zeiten.searchsorted(ende)
+        if rechts <= links:
+            return klima
+        klima.bis = ende
+
+        faecher = klimaFach(zeiten[links:rechts], self.freq)
+        # Perioden ohne Messwerte (z.B. Regensumme 0 an einem Ausfalltag) nicht mitzählen
+        mit_daten = rollup["RECORD"].to_numpy()[links:rechts] > 0
+        klima.werte = {}
+        for variable, alt in self.werte.items():
+            neu = klima.werte[variable] = {name: feld.copy() for name, feld in alt.items()}
+            werte = rollup[variable].to_numpy(dtype=float)[links:rechts]
+            gueltig = mit_daten & ~np.isnan(werte)
+            fach, wert = faecher[gueltig], werte[gueltig]
+            if len(fach) == 0:
+                continue
+            anzahl_faecher = len(neu["n"])
+
+            # Mittelwert und Summe der quadrierten Abweichungen der neuen Werte je Fach,
+            # dann mit den bisherigen zusammenführen (Chan et al.)
+            n_neu = np.bincount(fach, minlength=anzahl_faecher)
+            mittel_neu = np.divide(np.bincount(fach, weights=wert, minlength=anzahl_faecher), n_neu,
+                                   out=np.zeros(anzahl_faecher), where=n_neu > 0)
+            m2_neu = np.bincount(fach, weights=(wert - mittel_neu[fach]) ** 2, minlength=anzahl_faecher)
+            n = neu["n"] + n_neu
+            delta = mittel_neu - neu["mittel"]
+            anteil = np.divide(n_neu, n, out=np.zeros(anzahl_faecher), where=n > 0)
+            neu["m2"] += m2_neu + delta ** 2 * neu["n"] * anteil
+            neu["mittel"] += delta * anteil
+            neu["n"] = n
+
+            # Histogramm (Werte außerhalb landen in der ersten bzw. letzten Klasse; je Fach kommt
+            # höchstens ein Wert pro Jahr hinzu, daher reichen 16 Bit)
+            unten, oben, breite = klima_variablen[variable]
+            klassen = neu["histogramm"].shape[1]
+            klasse = np.clip(((wert - unten) // breite).astype(np.int64), 0, klassen - 1)
+            neu["histogramm"] += np.bincount(fach * klassen + klasse, minlength=anzahl_faecher * klassen).reshape(anzahl_faecher, klassen).astype(np.uint16)
+
+            # Perzentile nur für die geänderten Fächer neu bestimmen, innerhalb der Klasse linear interpoliert
+            geaendert = np.flatnonzero(n_neu)
+            histogramm = neu["histogramm"][geaendert].astype(float)
+            kumuliert = histogramm.cumsum(axis=1)
+            zeilen = np.arange(len(geaendert))
+            for i, q in enumerate(klima_perzentile):
+                ziel = q / 100 * n[geaendert]
+                klasse = (kumuliert < ziel[:, None]).sum(axis=1).clip(0, klassen - 1)
+                davor = kumuliert[zeilen, klasse] - histogramm[zeilen, klasse]
+                anteil_klasse = np.divide(ziel - davor, histogramm[zeilen, klasse],
+                                          out=np.zeros(len(geaendert)), where=histogramm[zeilen, klasse] > 0)
+                neu["perzentile"][geaendert, i] = unten + (klasse + anteil_klasse) * breite
+        return klima
+
+    # Klimawerte für die Zeitpunkte zeiten: Anzahl Jahre, Mittelwert, Standardabweichung und Perzentile
+    def nachschlagen(self, variable, zeiten):
+        werte = self.werte[variable]
+        fach = klimaFach(zeiten, self.freq)
+        n = werte["n"][fach]
+        ergebnis = {
+            "n": n,
+            "mittel": np.where(n > 0, werte["mittel"][fach], np.nan),
+            "std": np.where(n > 1, np.sqrt(werte["m2"][fach] / np.maximum(n - 1, 1)), np.nan)
+        }
+        for i, q in enumerate(klima_perzentile):
+            ergebnis[f"p{q}"] = werte["perzentile"][fach, i]
+        return ergebnis
+
+    @property
+    def groesse(self):
+        return sum(feld.nbytes for werte in self.werte.values() for feld in werte.values())
+
+# Quantil-Skizzen
+# Je Variable und Stunde eine kleine, zusammenführbare Zusammenfassung der Verteilung: Anzahl, Minimum,
+# Maximum und skizzen_punkte Quantile mit gleichem Gewicht (wie ein t-Digest mit gleich großen Zentroiden).
+# Tages-Skizzen entstehen durch Zusammenführen der Stunden, Monats-Skizzen aus den Tagen. Perzentile
+# eines beliebigen Zeitraums ergeben sich aus wenigen hundert Skizzen statt aus den Rohdaten.
+skizzen_variablen = ["AirTC_Avg", "RH_Avg", "WS_ms_Avg", "SlrkW_Avg"]
+skizzen_punkte = 16
+skizzen_stufen = (np.arange(skizzen_punkte) + 0.5) / skizzen_punkte
+
+# Quantile (stufen zwischen 0 und 1) je Gruppe aus gewichteten Punkten. Jeder Punkt steht in der Mitte
+# seines Gewichts, dazwischen wird linear interpoliert, an den Rändern bis zu Minimum bzw. Maximum.
+def gruppenQuantile(gruppe, werte, gewichte, minimum, maximum, anzahl, stufen):
+    stufen = np.asarray(stufen, dtype=float)
+    ergebnis = np.full((anzahl, len(stufen)), np.nan)
+    if len(werte) == 0:
+        return ergebnis
+    reihenfolge = np.lexsort((werte, gruppe))
+    gruppe, werte, gewichte = gruppe[reihenfolge], werte[reihenfolge], gewichte[reihenfolge]
+
+    summe = np.bincount(gruppe, weights=gewichte, minlength=anzahl)
+    kumuliert = np.cumsum(gewichte)
+    vor_gruppe = np.concatenate([[0], np.cumsum(summe)[:-1]])
+    # Rang im Bereich 0..1 innerhalb der Gruppe; um 2 * gruppe verschoben ergibt sich eine sortierte
+    # Achse für die Suche in allen Gruppen gleichzeitig
+    rang = (kumuliert - gewichte / 2 - vor_gruppe[gruppe]) / summe[gruppe]
+    schluessel = gruppe * 2 + rang
+    erster = np.searchsorted(gruppe, np.arange(anzahl), "left")
+    letzter = np.searchsorted(gruppe, np.arange(anzahl), "right")
+
+    g = np.repeat(np.arange(anzahl), len(stufen))
+    q = np.tile(stufen, anzahl)
+    oben = np.searchsorted(schluessel, g * 2 + q)
+    hat_unten, hat_oben = oben > erster[g], oben < letzter[g]
+    i_unten, i_oben = np.maximum(oben - 1, 0), np.minimum(oben, len(werte) - 1)
+    r_unten = np.where(hat_unten, rang[i_unten], 0.0)
+    w_unten = np.where(hat_unten, werte[i_unten], minimum[g])
+    r_oben = np.where(hat_oben, rang[i_oben], 1.0)
+    w_oben = np.where(hat_oben, werte[i_oben], maximum[g])
+    anteil = np.divide(q - r_unten, r_oben - r_unten, out=np.zeros(len(q)), where=r_oben > r_unten)
+    ergebnis[:] = (w_unten + anteil * (w_oben - w_unten)).reshape(anzahl, len(stufen))
+    ergebnis[summe == 0] = np.nan
+    return ergebnis
 
-# Klimastation
+class Quantilskizzen:
+    def __init__(self, index, werte):
+        # index: Beginn der Perioden, werte: je Variable n, minimum, maximum und punkte (Perioden x skizzen_punkte)
+        self.index = index
+        self.werte = werte
 
-latest_entry = df.loc[df.index.max()]
+    # Zeilen links bis rechts als Arrays je Variable
+    def ausschnitt(self, links, rechts):
+        return {variable: {name: feld[links:rechts] for name, feld in felder.items()} for variable, felder in self.werte.items()}
+
+    # Neue Skizzen: die bisherigen vor start, danach neu
+    def verbinde(self, start, neu):
+        davor = self.index.searchsorted(start)
+        return Quantilskizzen(
+            self.index[:davor].append(neu.index),
+            {variable: {name: np.concatenate([feld[:davor], neu.werte[variable][name]]) for name, feld in felder.items()}
+             for variable, felder in self.werte.items()}
+        )
+
+    @property
+    def groesse(self):
+        return sum(feld.nbytes for felder in self.werte.values() for feld in felder.values())
+
+def skizzenFelder(n, minimum, maximum, punkte):
+    return {"n": n.astype(np.int32), "minimum": minimum.astype(np.float32), "maximum": maximum.astype(np.float32), "punkte": punkte.astype(np.float32)}
+
+# Stunden-Skizzen aus Rohdaten (nach Zeit sortiert, Zeitindex)
+def skizzenAusRohdaten(data):
+    zeiten = pd.DatetimeIndex(data.index)
+    erste = zeiten[0].floor("h")
+    index = pd.date_range(erste, zeiten[-1].floor("h"), freq="h")
+    stunde = ((zeiten - erste) // pd.Timedelta(hours=1)).to_numpy()
+    werte = {}
+    for variable in skizzen_variablen:
+        x = data[variable].to_numpy(dtype=float)
+        gueltig = ~np.isnan(x)
+        gruppe, x = stunde[gueltig], x[gueltig]
+        n = np.bincount(gruppe, minlength=len(index))
+        minimum = np.full(len(index), np.nan)
+        maximum = np.full(len(index), np.nan)
+        np.fmin.at(minimum, gruppe, x)
+        np.fmax.at(maximum, gruppe, x)
+        punkte = gruppenQuantile(gruppe, x, np.ones(len(x)), minimum, maximum, len(index), skizzen_stufen)
+        werte[variable] = skizzenFelder(n, minimum, maximum, punkte)
+    return Quantilskizzen(index, werte)
+
+# Skizzen feinerer Perioden zu Tagen ("D") oder Monaten ("M") zusammenführen
+def skizzenZusammenfassen(feiner, freq):
+    perioden = feiner.index.normalize() if freq == "D" else feiner.index.to_period("M").to_timestamp()
+    anfang = np.flatnonzero(np.r_[True, perioden[1:] != perioden[:-1]])
+    gruppe = np.repeat(np.arange(len(anfang)), np.diff(np.r_[anfang, len(perioden)]))
+    werte = {}
+    for variable, felder in feiner.werte.items():
+        n = felder["n"].astype(np.int64)
+        voll = n > 0
+        punkte_gruppe = np.repeat(gruppe[voll], skizzen_punkte)
+        gewichte = np.repeat(n[voll] / skizzen_punkte, skizzen_punkte)
+        minimum = np.fmin.reduceat(felder["minimum"].astype(float), anfang)
+        maximum = np.fmax.reduceat(felder["maximum"].astype(float), anfang)
+        punkte = gruppenQuantile(punkte_gruppe, felder["punkte"][voll].astype(float).ravel(), gewichte,
+                                 minimum, maximum, len(anfang), skizzen_stufen)
+        werte[variable] = skizzenFelder(np.add.reduceat(n, anfang), minimum, maximum, punkte)
+    return Quantilskizzen(perioden[anfang], werte)
+
+# Perzentile je Periode (eine Gruppe je Skizze) oder über alle übergebenen Skizzen (eine Gruppe)
+def skizzenQuantile(felder, stufen, gesamt=False):
+    n = felder["n"].astype(np.int64)
+    voll = n > 0
+    anzahl = 1 if gesamt else len(n)
+    gruppe = np.zeros(len(n), dtype=np.int64) if gesamt else np.arange(len(n))
+    if gesamt:
+        minimum = np.array([np.nanmin(felder["minimum"]) if voll.any() else np.nan])
+        maximum = np.array([np.nanmax(felder["maximum"]) if voll.any() else np.nan])
+    else:
+        minimum, maximum = felder["minimum"].astype(float), felder["maximum"].astype(float)
+    return gruppenQuantile(
+        np.repeat(gruppe[voll], skizzen_punkte),
+        felder["punkte"][voll].astype(float).ravel(),
+        np.repeat(n[voll] / skizzen_punkte, skizzen_punkte),
+        minimum, maximum, anzahl, stufen
+    )
+
+# Skizzen für das Zeitfenster start bis ende: volle Monate aus den Monats-, volle Tage aus den Tages-,
+# der Rest aus den Stunden-Skizzen
+def fensterSkizzen(skizzen, variable, start, ende):
+    start, ende = pd.Timestamp(start).ceil("h"), pd.Timestamp(ende).ceil("h")
+    tag_start, tag_ende = start.ceil("D"), ende.floor("D")
+    monat_start = tag_start if tag_start.day == 1 else (tag_start + pd.offsets.MonthBegin())
+    monat_ende = tag_ende.to_period("M").to_timestamp()
+    stuecke = []
+    if tag_start >= tag_ende:
+        stuecke.append(("h", start, ende))
+    else:
+        stuecke += [("h", start, tag_start), ("h", tag_ende, ende)]
+        if monat_start >= monat_ende:
+            stuecke.append(("D", tag_start, tag_ende))
+        else:
+            stuecke += [("D", tag_start, monat_start), ("D", monat_ende, tag_ende), ("M", monat_start, monat_ende)]
+    teile = []
+    for freq, von, bis in stuecke:
+        ebene = skizzen[freq]
+        links, rechts = ebene.index.searchsorted(von), ebene.index.searchsorted(bis)
+        if rechts > links:
+            teile.append({name: feld[links:rechts] for name, feld in ebene.werte[variable].items()})
+    if not teile:
+        return {name: feld[:0] for name, feld in skizzen["h"].werte[variable].items()}
+    return {name: np.concatenate([teil[name] for teil in teile]) for name in teile[0]}
+
+# Datenstand: Rohdaten und die daraus berechneten Rollups
+# Ein Datenstand wird nach dem Erzeugen nicht mehr verändert. Neue Daten ergeben einen neuen
+# Datenstand (erweitere), der den bisherigen über eine einzige Zuweisung ersetzt.
+# Die version ändert sich mit jedem neuen Datenstand und ist Teil aller Cache-Schlüssel
+# (ETag, Single-Flight, Hintergrund-Cache, Tabellen-Sortierung).
+class Datenstand:
+    def __init__(self, df, quelle_bytes=None, quelle_dateien=None):
+        # bis hierhin ist die (letzte) Datei gelesen, dahinter wird nachgeladen
+        self.quelle_bytes = quelle_bytes
+        self.quelle_dateien = quelle_dateien
+
+        # Stündliche Aggregation, gerundet auf zwei Nachkommastellen
+        with metriken.stoppuhr("klimastation_laden_sekunden", {"phase": "rollup_stunde"}):
+            self.df_hourly = aggregiere(df, "h").reset_index().round(2)
+
+        # Tägliche und monatliche Aggregation (Rollups) direkt aus den Rohdaten,
+        # für die Monats- und Jahresansicht sowie die API
+        with metriken.stoppuhr("klimastation_laden_sekunden", {"phase": "rollup_tag"}):
+            self.df_daily = aggregiere(df, "D")
+        with metriken.stoppuhr("klimastation_laden_sekunden", {"phase": "rollup_monat"}):
+            self.df_monthly = aggregiere(df, "ME")
+
+        # ändert sich, sobald neue Daten eingelesen werden
+        self.version = f"{df.index.max():%Y%m%d%H%M%S}-{len(df)}"
+
+        with metriken.stoppuhr("klimastation_laden_sekunden", {"phase": "abdeckung"}):
+            self.abdeckung = Abdeckung(self.df_hourly, self.df_daily, messintervall(df.index), df.index.min(), df.index.max())
+
+        with metriken.stoppuhr("klimastation_laden_sekunden", {"phase": "klimatologie"}):
+            self.klima = {
+                freq: Klimatologie(freq).erweitere(rollup, df.index.max())
+                for freq, rollup in [("h", self.df_hourly), ("D", self.df_daily), ("M", self.df_monthly)]
+            }
+
+        with metriken.stoppuhr("klimastation_laden_sekunden", {"phase": "skizzen"}):
+            self.skizzen = {"h": skizzenAusRohdaten(df)}
+            self.skizzen["D"] = skizzenZusammenfassen(self.skizzen["h"], "D")
+            self.skizzen["M"] = skizzenZusammenfassen(self.skizzen["D"], "M")
+
+        # Rohdaten, mit Speicherbudget teilweise ausgelagert
+        self.rollup_bytes = int(sum(rollup.memory_usage(index=True).sum() for rollup in (self.df_hourly, self.df_daily, self.df_monthly)))
+        budget = konfiguration["speicher_budget_mb"]
+        with metriken.stoppuhr("klimastation_laden_sekunden", {"phase": "auslagern"}):
+            self.roh = Rohdaten(
+                df,
+                budget=None if budget is None else int(budget * 1024 * 1024),
+                reserviert=self.rollup_bytes,
+                verzeichnis=os.path.join(konfiguration["speicher_verzeichnis"], self.version)
+            )
+        if budget is not None:
+            bericht = self.speicherbericht()
+            print(f"Speicher: Rollups {bericht['rollups_bytes'] / 2**20:.0f} MB, "
+                  f"Rohdaten im Speicher {bericht['roh_ram_bytes'] / 2**20:.0f} MB {bericht['roh_ram_jahre']}, "
+                  f"ausgelagert {bericht['roh_datei_bytes'] / 2**20:.0f} MB {bericht['roh_datei_jahre']}, "
+                  f"Budget {budget:.0f} MB")
+
+    # Neuer Datenstand mit den Zeilen aus neu, die nach dem letzten Messwert liegen. Die Rohdaten
+    # werden geteilt, von den Rollups wird nur der Teil ab der Stunde / dem Tag / dem Monat
+    # des bisher letzten Messwerts neu berechnet.
+    def erweitere(self, neu, quelle_bytes):
+        stand = copy.copy(self)
+        stand.quelle_bytes = quelle_bytes
+        neu = neu[neu.index > self.roh.bis]
+        if len(neu) == 0:
+            return stand
+
+        stand.roh = self.roh.erweitere(neu)
+        # Monatsende ("ME") für resample, Monatsbeginn ("M") für periodenBeginn
+        for attribut, freq, regel in [("df_hourly", "h", "h"), ("df_daily", "D", "D"), ("df_monthly", "M", "ME")]:
+            alt = getattr(self, attribut)
+            start = periodenBeginn(self.roh.bis, freq)
+            teil = aggregiere(stand.roh.zeilen(stand.roh.grenzen(start, start)[0], len(stand.roh)), regel)
+            if attribut == "df_hourly":
+                davor = alt.iloc[:alt["TIMESTAMP"].searchsorted(start)]
+                setattr(stand, attribut, pd.concat([davor, teil.reset_index().round(2)], ignore_index=True))
+            else:
+                davor = alt.iloc[:alt.index.searchsorted(start)]
+                setattr(stand, attribut, pd.concat([davor, teil]))
+
+        stand.rollup_bytes = int(sum(rollup.memory_usage(index=True).sum() for rollup in (stand.df_hourly, stand.df_daily, stand.df_monthly)))
+        stand.version = f"{stand.roh.bis:%Y%m%d%H%M%S}-{len(stand.roh)}"
+        # wächst der Teil im Speicher über ein abgeschlossenes Jahr hinaus, Budget neu anwenden
+        stand.roh = stand.roh.begrenze(stand.rollup_bytes, os.path.join(konfiguration["speicher_verzeichnis"], stand.version))
+        stand.abdeckung = Abdeckung(stand.df_hourly, stand.df_daily, self.abdeckung.intervall, stand.roh.von, stand.roh.bis)
+        stand.klima = {
+            freq: self.klima[freq].erweitere(rollup, stand.roh.bis)
+            for freq, rollup in [("h", stand.df_hourly), ("D", stand.df_daily), ("M", stand.df_monthly)]
+        }
+
+        # Skizzen ab der Stunde / dem Tag / dem Monat des bisher letzten Messwerts neu
+        start = periodenBeginn(self.roh.bis, "h")
+        stand.skizzen = {"h": self.skizzen["h"].verbinde(start, skizzenAusRohdaten(stand.roh.zeilen(stand.roh.grenzen(start, start)[0], len(stand.roh))))}
+        for freq, feiner in [("D", "h"), ("M", "D")]:
+            start = periodenBeginn(self.roh.bis, freq)
+            neu = stand.skizzen[feiner]
+            links = neu.index.searchsorted(start)
+            teil = Quantilskizzen(neu.index[links:], neu.ausschnitt(links, len(neu.index)))
+            stand.skizzen[freq] = self.skizzen[freq].verbinde(start, skizzenZusammenfassen(teil, freq))
+        return stand
+
+    def speicherbericht(self):
+        bericht = {"budget_bytes": self.roh.budget, "rollups_bytes": self.rollup_bytes,
+                   "klimatologie_bytes": sum(klima.groesse for klima in self.klima.values()),
+                   "skizzen_bytes": sum(skizzen.groesse for skizzen in self.skizzen.values())}
+        bericht.update(self.roh.speicherbericht())
+        bericht["im_budget"] = None if self.roh.budget is None else bericht["rollups_bytes"] + bericht["roh_ram_bytes"] <= self.roh.budget
+        if psutil is not None:
+            bericht["prozess_rss_bytes"] = psutil.Process().memory_info().rss
+        return bericht
+
+# Die Daten werden nicht beim Import eingelesen, sondern beim ersten Zugriff über datenstand()
+# (oder nach dem Start im Hintergrund, siehe konfiguration["vorladen"]).
+aktueller_datenstand = None
+datenstand_lock = threading.Lock()
+
+#
+# Jede Anfrage und jeder Callback rechnet mit genau einem Datenstand: Zwischen
+# halteDatenstandFest() und gibDatenstandFrei() liefert datenstand() immer den Stand,
+# der beim ersten Aufruf aktuell war, auch wenn inzwischen nachgeladen wurde.
+# Lesen braucht dafür kein Lock.
+schnappschuss_lokal = threading.local()
+
+def datenstand():
+    global aktueller_datenstand
+    stand = getattr(schnappschuss_lokal, "stand", None)
+    if stand is not None:
+        return stand
+    if aktueller_datenstand is None:
+        with datenstand_lock:
+            if aktueller_datenstand is None:
+                dateien = datenDateien(konfiguration["daten_pfad"])
+                groesse = os.path.getsize(dateien[-1]) if dateien else None
+                with metriken.stoppuhr("klimastation_laden_sekunden", {"phase": "einlesen"}):
+                    df = leseQuellen(dateien)
+                aktueller_datenstand = Datenstand(df, quelle_bytes=groesse, quelle_dateien=dateien)
+    stand = aktueller_datenstand
+    if getattr(schnappschuss_lokal, "fest", False):
+        schnappschuss_lokal.stand = stand
+    return stand
+
+def halteDatenstandFest():
+    schnappschuss_lokal.fest = True
+    schnappschuss_lokal.stand = None
+
+# auch als teardown_request registriert, Flask übergibt dann die Ausnahme der Anfrage (oder None)
+def gibDatenstandFrei(fehler=None):
+    schnappschuss_lokal.fest = False
+    schnappschuss_lokal.stand = None
+
+# für Callbacks ohne Anfrage (Hintergrund-Aufträge); innerhalb einer Anfrage gilt deren Stand
+@contextmanager
+def festerDatenstand():
+    if getattr(schnappschuss_lokal, "fest", False):
+        yield
+        return
+    halteDatenstandFest()
+    try:
+        yield
+    finally:
+        gibDatenstandFrei()
+
+# Nachladen
+# Der Datenlogger hängt laufend Zeilen an die Datei an. Gelesen werden nur die neuen Zeilen,
+# daraus entsteht ein neuer Datenstand. Ist die Datei kürzer geworden (neu angelegt) oder
+# ist bei mehreren Dateien eine hinzugekommen, wird alles vollständig neu eingelesen.
+def ladeNach():
+    global aktueller_datenstand
+    if aktueller_datenstand is None:
+        return
+    dateien = datenDateien(konfiguration["daten_pfad"])
+    if not dateien:
+        return
+    with datenstand_lock:
+        stand = aktueller_datenstand
+        groesse = os.path.getsize(dateien[-1])
+        if dateien == stand.quelle_dateien and groesse == stand.quelle_bytes:
+            return
+        with metriken.stoppuhr("klimastation_laden_sekunden", {"phase": "nachladen"}):
+            # Archive werden nur als Ganzes neu geschrieben
+            if (dateien != stand.quelle_dateien or stand.quelle_bytes is None
+                    or groesse < stand.quelle_bytes or istArchiv(dateien[-1])):
+                neu = Datenstand(leseQuellen(dateien, still=True), quelle_bytes=groesse, quelle_dateien=dateien)
+            else:
+                df, ende = leseNeueDaten(dateien[-1], stand.quelle_bytes)
+                neu = stand if df is None else stand.erweitere(df, ende)
+        aktueller_datenstand = neu
+    if neu.version != stand.version:
+        print(f"Daten nachgeladen: {len(neu.roh) - len(stand.roh)} neue Zeilen, bis {neu.roh.bis}")
+
+# Die Schleife endet, sobald nachladen_stop gesetzt wird
+nachladen_stop = threading.Event()
+
+def nachladenSchleife(sekunden):
+    while not nachladen_stop.wait(sekunden):
+        try:
+            ladeNach()
+        except (OSError, ValueError) as fehler:
+            print("Nachladen fehlgeschlagen: " + str(fehler))
+
+# Diagramme
 
 # Koordinten der Klimastation festlegen
 lat = 48.523669
 lon = 9.054517
 
-# Karte mit Marker und Tooltip
-map = px.scatter_mapbox(
-    pd.DataFrame({
-        "lat": [lat],
-        "lon": [lon],
-    }),
-    lat="lat",
-    lon="lon",
-    zoom=11,
-) 
-
-map.update_traces(
-    marker=dict(
-        size=13,
-        color="rgba(245,166,35, 0.9)"
-    )
-)
-map.update_layout(
-    mapbox_style= "open-street-map",
-    mapbox= dict(
-        center = {"lat": lat, "lon": lon},
-        zoom=11
-    ),
-    margin={"r":0, "l": 0, "t": 0, "b": 0},
-)
-
 # Boxdesign für Map
 mapbox_style = dict(
     showarrow= False,
@@ -129,38 +1534,223 @@ mapbox_style = dict(
     font=dict(color="orange", size=13, family="Arial")
 )
 
-# Lufttemperatur
-map.add_annotation(
-    text=f"{latest_entry['AirTC_Avg']:.0f} °C",
-    xref="paper", 
-    yref="paper",
-    x=0.03,
-    y=0.96,
-    **mapbox_style
-)
+# Klimastation: Karte mit Marker und den Werten des letzten Datensatzes
+def erstelleKarte(latest_entry):
+    import plotly.express as px
 
-# relative Luftfeuchtigkeit
-map.add_annotation(
-    text=f"{latest_entry['RH_Avg']:.0f} %",
-    xref="paper", 
-    yref="paper",
-    x=0.97,
-    y=0.96,
-    **mapbox_style
-)
+    map = px.scatter_mapbox(
+        pd.DataFrame({
+            "lat": [lat],
+            "lon": [lon],
+        }),
+        lat="lat",
+        lon="lon",
+        zoom=11,
+    ) 
 
-# Luftdruck
-map.add_annotation(
-    text=f"{latest_entry['BP_mbar_Avg']:.0f} mbar",
-    xref="paper", 
-    yref="paper",
-    x=0.03,
-    y=0.04,
-    **mapbox_style
-)
+    map.update_traces(
+        marker=dict(
+            size=13,
+            color="rgba(245,166,35, 0.9)"
+        )
+    )
+    map.update_layout(
+        mapbox_style= "open-street-map",
+        mapbox= dict(
+            center = {"lat": lat, "lon": lon},
+            zoom=11
+        ),
+        margin={"r":0, "l": 0, "t": 0, "b": 0},
+    )
+
+    # Lufttemperatur
+    map.add_annotation(
+        text=f"{latest_entry['AirTC_Avg']:.0f} °C",
+        xref="paper", 
+        yref="paper",
+        x=0.03,
+        y=0.96,
+        **mapbox_style
+    )
+
+    # relative Luftfeuchtigkeit
+    map.add_annotation(
+        text=f"{latest_entry['RH_Avg']:.0f} %",
+        xref="paper", 
+        yref="paper",
+        x=0.97,
+        y=0.96,
+        **mapbox_style
+    )
+
+    # Luftdruck
+    map.add_annotation(
+        text=f"{latest_entry['BP_mbar_Avg']:.0f} mbar",
+        xref="paper", 
+        yref="paper",
+        x=0.03,
+        y=0.04,
+        **mapbox_style
+    )
+    return map
+
+# Solare Einstrahlung (Platzhalter bis zum ersten Callback)
+def leereSolarkarte():
+    import plotly.express as px
+
+    return px.imshow(
+        [[0]],
+        labels=dict(x='Monat', y='Stunde', color='Solare Einstrahlung (W/m2)'),
+        aspect='auto'
+    )
+
+# Diagramm für Zeiträume ohne Messwerte
+def keineDaten():
+    fig = go.Figure()
+    fig.add_annotation(
+        text="Keine Daten verfügbar",
+        x=0.5, y=0.5, showarrow=False, font=dict(size=14),
+        xref="paper", yref="paper"
+    )
+    fig.update_layout(
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        margin=dict(l=0, r=0, t=0, b=0),
+        template="plotly_white"
+    )
+    return fig
+
+# Hintergrund-Callbacks
+# Monats- und Jahresansichten werden in einem eigenen Prozess berechnet, damit der
+# Request-Thread nicht blockiert wird. Ergebnisse werden pro Datenstand zwischengespeichert.
+if diskcache is not None:
+
+    # Identische Aufträge (gleiche Figur, gleicher Zeitraum, gleicher Datenstand -> gleicher
+    # Cache-Schlüssel) teilen sich einen laufenden Prozess, statt ihn parallel neu zu starten.
+    # Ein geteilter Prozess wird erst beendet, wenn ihn kein wartender Nutzer mehr braucht.
+    class GeteilterDiskcacheManager(DiskcacheManager):
+
+        def call_job_fn(self, key, job_fn, args, context):
+            with self.handle.transact():
+                laufend = self.handle.get(key + "-job")
+                if laufend is not None and self.job_running(laufend["pid"]) and not self.result_ready(key):
+                    laufend["nutzer"] += 1
+                    self.handle.set(key + "-job", laufend)
+                    metriken.zaehle("klimastation_cache_zugriffe_total", {"cache": "hintergrund_auftrag", "ergebnis": "treffer"})
+                    return laufend["pid"]
+
+                metriken.zaehle("klimastation_cache_zugriffe_total", {
+                    "cache": "hintergrund_auftrag",
+                    "ergebnis": "treffer" if self.result_ready(key) else "fehlgriff"
+                })
+                pid = super().call_job_fn(key, job_fn, args, context)
+                self.handle.set(key + "-job", {"pid": pid, "nutzer": 1}, expire=3600)
+                self.handle.set(f"job-{pid}", key, expire=3600)
+                return pid
 
-# Initialize the app
-app = Dash()
+        def terminate_job(self, job):
+            if job is None:
+                return
+            with self.handle.transact():
+                key = self.handle.get(f"job-{job}")
+                laufend = self.handle.get(key + "-job") if key is not None else None
+                if laufend is not None and laufend["pid"] == int(job):
+                    laufend["nutzer"] -= 1
+                    if laufend["nutzer"] > 0:
+                        self.handle.set(key + "-job", laufend)
+                        return
+                    self.handle.delete(key + "-job")
+                self.handle.delete(f"job-{job}")
+            super().terminate_job(job)
+
+# Hintergrund-Manager für create_app (None, wenn diskcache nicht installiert ist)
+def erstelleHintergrundManager(pfad):
+    if diskcache is None:
+        return None
+    return GeteilterDiskcacheManager(
+        diskcache.Cache(pfad),
+        cache_by=[lambda: datenstand().version],
+        expire=3600
+    )
+
+# Aktuelle Werte
+# Die Kachel "Klimastation" wird regelmäßig aus dem letzten Datensatz der Datei aktualisiert.
+# Dafür wird nur das Dateiende gelesen, nicht der gesamte Datensatz.
+def letzterDatensatz(pfad, blockgroesse=4096):
+    try:
+        with open(pfad, "rb") as datei:
+            datei.seek(0, os.SEEK_END)
+            groesse = datei.tell()
+            datei.seek(max(0, groesse - blockgroesse))
+            ende = datei.read().decode("utf-8", errors="replace")
+    except OSError:
+        return None
+
+    for zeile in reversed(ende.splitlines()):
+        werte = next(csv.reader([zeile], skipinitialspace=True), [])
+        if len(werte) != len(csv_spalten):
+            continue
+        eintrag = dict(zip(csv_spalten, werte))
+        try:
+            return {
+                "TIMESTAMP": pd.to_datetime(eintrag["TIMESTAMP"], format="%Y-%m-%d %H:%M:%S"),
+                "AirTC_Avg": float(eintrag["AirTC_Avg"].replace(",", ".")),
+                "RH_Avg": float(eintrag["RH_Avg"].replace(",", ".")),
+                "BP_mbar_Avg": float(eintrag["BP_mbar_Avg"].replace(",", "."))
+            }
+        except ValueError:
+            continue
+    return None
+
+# Zeitstempel des ersten Datensatzes (nach den Kopfzeilen) direkt aus der Datei lesen
+def ersterZeitstempel(pfad, kopfzeilen=4, max_zeilen=100):
+    try:
+        with open(pfad, encoding="utf-8", errors="replace") as datei:
+            for nummer, werte in enumerate(csv.reader(datei, skipinitialspace=True)):
+                if nummer >= kopfzeilen + max_zeilen:
+                    break
+                if nummer < kopfzeilen or len(werte) != len(csv_spalten):
+                    continue
+                try:
+                    return pd.to_datetime(werte[0], format="%Y-%m-%d %H:%M:%S")
+                except ValueError:
+                    continue
+    except OSError:
+        return None
+    return None
+
+# Letzter Datensatz einer Datei, zwischengespeichert über Größe und Änderungszeit: Bei jedem
+# Intervall wird nur das Ende der Dateien gelesen, die sich seitdem geändert haben
+@lru_cache(maxsize=256)
+def letzterDatensatzJeStand(pfad, groesse, geaendert):
+    return letzterDatensatz(pfad)
+
+# Neuester Datensatz über alle Dateien (bei mehreren Dateien muss die neueste nicht die letzte sein)
+def neuesterDatensatz(pfad):
+    eintraege = []
+    for datei in datenDateien(pfad):
+        try:
+            status = os.stat(datei)
+        except OSError:
+            continue
+        eintrag = letzterDatensatzJeStand(datei, status.st_size, status.st_mtime_ns)
+        if eintrag is not None:
+            eintraege.append(eintrag)
+    return max(eintraege, key=lambda eintrag: eintrag["TIMESTAMP"], default=None)
+
+# Erster Zeitstempel und letzter Datensatz für das Layout. Solange die Daten noch nicht
+# eingelesen sind, kommen sie aus Anfang und Ende der Datei(en), damit die Seite sofort
+# ausgeliefert werden kann.
+def eckdaten():
+    if aktueller_datenstand is None:
+        erste = [zeit for zeit in map(ersterZeitstempel, datenDateien(konfiguration["daten_pfad"])) if zeit is not None]
+        erster = min(erste, default=None)
+        letzter = neuesterDatensatz(konfiguration["daten_pfad"])
+        if erster is not None and letzter is not None:
+            return erster, letzter
+    roh = datenstand().roh
+    letzte = roh.zeilen(len(roh) - 1, len(roh))
+    return roh.von, dict(letzte.iloc[-1], TIMESTAMP=letzte.index[-1])
 
 #Anpassung der Spaltennamen
 table_columns= [
@@ -176,6 +1766,9 @@ table_columns= [
     {"name": "Solare Einstrahlung(W/m²)", "id": "SlrkW_Avg"},
 ]
 
+# Zeilen pro Seite der Rohdaten-Tabelle
+tabelle_seitengroesse = 15
+
 # Layout für Kacheln
 kachel_layout = {
         "backroundColor": "#FaF9F6",
@@ -186,548 +1779,1042 @@ kachel_layout = {
         "margin": "0.75rem",
     }
 
+# Fortschrittsbalken für Hintergrund-Callbacks
+fortschritt_versteckt = {"display": "none"}
+fortschritt_sichtbar = {
+    "display": "block",
+    "width": "100%",
+    "height": "6px",
+    "accentColor": "#FB8C00"
+}
+
 # App layout
-app.layout = html.Div(
-    style={
-        "display": "flex",
-        "flexDirection": "column",
-        "height": "100vh",
-        "overflow": "hidden"
-    },
-    children=[
-        # Hauptbereich mit 3 Spalten
-        html.Div(
-            style={
-                "flex": "1",
-                "display": "flex", 
-                "justifyContent": "center",
-                "alignItems": "stretch",
-                #"height": "98vh",
-                "overflow": "hidden",
-                "gap": "0.4rem",
-                "padding": "1rem",
-                "boxSizing": "border-box",
-                "flexDirection": "row", 
-                #"marginBottom": "1.875rem",
-                },
-            children=[
-
-                # Linke Spalte (flex 3)
-                html.Div(
-                    style={"flex": "2", "display": "flex", "flexDirection": "column"},
-                    children=[
-                        # Datums-Auswahl Dropdown
-                        html.Div(
-                            id="kachel_date",
-                            children=[
-                                html.H2("Zeitraum", 
+# Wird bei jedem Seitenaufruf erzeugt, damit Datumsauswahl und Karte den aktuellen
+# Datenstand zeigen. Die Daten selbst müssen dafür noch nicht eingelesen sein (eckdaten).
+# Leere Tage für den Tageskalender, alle Tage leerer Monate für den Monatskalender
+# und Jahre ganz ohne Messwerte
+def leereZeitraeume(stand):
+    leere_tage = stand.abdeckung.leere_tage
+    monate = stand.df_monthly
+    leere_monate = monate.index[monate["RECORD"].to_numpy() == 0]
+    monatstage = [tag.date() for monat in leere_monate for tag in pd.date_range(monat.to_period("M").to_timestamp(), monat.normalize())]
+    jahre = stand.df_daily["RECORD"].groupby(stand.df_daily.index.year).sum()
+    return {
+        "tage": [tag.date() for tag in leere_tage],
+        "monatstage": monatstage,
+        "jahre": [int(jahr) for jahr in jahre.index[jahre.to_numpy() == 0]],
+        "version": stand.version
+    }
+
+def jahresOptionen(von, bis, leere_jahre):
+    return [
+        {"label": str(y), "value": str(y), "disabled": y in leere_jahre}
+        for y in range(von, bis + 1)
+    ]
+
+def erstelleLayout():
+    erster, letzter = eckdaten()
+    # leere Tage erst sperren, wenn die Daten eingelesen sind (sonst per Callback)
+    leere = leereZeitraeume(aktueller_datenstand) if aktueller_datenstand is not None else {"tage": [], "monatstage": [], "jahre": [], "version": None}
+
+    return html.Div(
+        style={
+            "display": "flex",
+            "flexDirection": "column",
+            "height": "100vh",
+            "overflow": "hidden"
+        },
+        children=[
+            # Hauptbereich mit 3 Spalten
+            html.Div(
+                style={
+                    "flex": "1",
+                    "display": "flex", 
+                    "justifyContent": "center",
+                    "alignItems": "stretch",
+                    #"height": "98vh",
+                    "overflow": "hidden",
+                    "gap": "0.4rem",
+                    "padding": "1rem",
+                    "boxSizing": "border-box",
+                    "flexDirection": "row", 
+                    #"marginBottom": "1.875rem",
+                    },
+                children=[
+
+                    # Linke Spalte (flex 3)
+                    html.Div(
+                        style={"flex": "2", "display": "flex", "flexDirection": "column"},
+                        children=[
+                            # Datums-Auswahl Dropdown
+                            html.Div(
+                                id="kachel_date",
+                                children=[
+                                    html.H2("Zeitraum", 
+                                            style={
+                                                "textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600"
+                                                }
+                                            ),
+                                    dcc.Dropdown(
+                                        id="Auswahl-Dropdown",
+                                        options=[
+                                            {"label": "Tag", "value": "D"},
+                                            {"label": "Monat", "value": "M"},
+                                            {"label": "Jahr", "value": "Y"},
+                                        ],
+                                        value="D",
+                                        clearable=False,
                                         style={
-                                            "textAlign": "center",
+                                            "marginTop": "0.3rem",
                                             "marginBottom": "0.3rem",
-                                            "fontSize": "0.9rem",
-                                            "fontWeight": "600"
+                                            "width": "80%", 
+                                            "fontSize": "0.75rem",     
+                                            "height": "28px",          
+                                            "padding": "0 2px",        
+                                            "lineHeight": "1.2",   
+                                            "display": "block",     
+                                            "textAlign": "center",
+                                            }
+                                    ),
+                                    
+                                    dcc.DatePickerSingle(
+                                        id="Day",
+                                        min_date_allowed= erster.date(),
+                                        max_date_allowed= letzter["TIMESTAMP"].date(),
+                                        disabled_days=leere["tage"],
+                                        date=letzter["TIMESTAMP"].date(),
+                                        display_format="YYYY-MM-DD",
+                                        style={
+                                            "width": "75%",
+                                            "transform": "scale(0.75)",
+                                            "display": "block"
+                                            },
+                                    ),
+                                    dcc.DatePickerSingle(
+                                        id="Month",
+                                        min_date_allowed= erster.date(),
+                                        max_date_allowed= letzter["TIMESTAMP"].date(),
+                                        disabled_days=leere["monatstage"],
+                                        date=erster.date(),
+                                        display_format="YYYY-MM",
+                                        style={
+                                            "width": "100%",
+                                            "display": "none"
+                                            }
+                                    ),
+                                    dcc.Dropdown(
+                                        id="Year",
+                                        options=jahresOptionen(erster.year, letzter["TIMESTAMP"].year, leere["jahre"]),
+                                        value = str(erster.year),
+                                        clearable=False,
+                                        style={
+                                            "width": "80%",
+                                            "display": "none"
                                             }
-                                        ),
-                                dcc.Dropdown(
-                                    id="Auswahl-Dropdown",
-                                    options=[
-                                        {"label": "Tag", "value": "D"},
-                                        {"label": "Monat", "value": "M"},
-                                        {"label": "Jahr", "value": "Y"},
-                                    ],
-                                    value="D",
-                                    clearable=False,
-                                    style={
-                                        "marginTop": "0.3rem",
-                                        "marginBottom": "0.3rem",
-                                        "width": "80%", 
-                                        "fontSize": "0.75rem",     
-                                        "height": "28px",          
-                                        "padding": "0 2px",        
-                                        "lineHeight": "1.2",   
-                                        "display": "block",     
-                                        "textAlign": "center",
+                                    ),
+                                    # Vollständigkeit des gewählten Zeitraums
+                                    html.Div(
+                                        id="abdeckung_text",
+                                        style={"fontSize": "0.7rem", "color": "#555", "marginTop": "0.2rem"}
+                                    ),
+                                    dcc.Store(id="abdeckung_version", data=leere["version"]),
+                                    # Download der Rohdaten des gewählten Zeitraums
+                                    dcc.Dropdown(
+                                        id="export_variablen",
+                                        options=[
+                                            {"label": spalte["name"], "value": spalte["id"]}
+                                            for spalte in table_columns if spalte["id"] != "TIMESTAMP"
+                                        ] + [
+                                            {"label": f"{variable['name']} ({variable['einheit']})", "value": name}
+                                            for name, variable in abgeleitete_variablen.items() if variable["mindestens"] == "roh"
+                                        ],
+                                        multi=True,
+                                        placeholder="Alle Variablen",
+                                        style={
+                                            "marginTop": "0.3rem",
+                                            "width": "80%",
+                                            "fontSize": "0.7rem"
+                                            }
+                                    ),
+                                    dcc.RadioItems(
+                                        id="export_format",
+                                        options=[{"label": "CSV", "value": "csv"}]
+                                            + ([{"label": "Parquet", "value": "parquet"}] if pa is not None else []),
+                                        value="csv",
+                                        inline=True,
+                                        style={"fontSize": "0.7rem"}
+                                    ),
+                                    html.A(
+                                        "⬇ Daten herunterladen",
+                                        id="export_link",
+                                        href="",
+                                        style={"fontSize": "0.75rem"}
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "2"
+                                },
+                            ),
+                        
+                            # Relative Luftfeuchtigkeit
+                            html.Div(
+                                id="kachel_RH",
+                                children=[
+                                    html.H2("Relative Luftfeuchtigkeit", 
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600",
+                                                "flex": "0 0  1px"
+                                    }),
+                                    dcc.Store(id="gerendert_RH"),
+                                    dcc.Store(id="anfrage_RH"),
+                                    dcc.Store(id="sitzung_RH", storage_type="session"),
+                                    html.Div(
+                                        "💡",
+                                        id="info_icon_RH",
+                                        style= {
+                                            "position": "absolute",
+                                            "top": "3px",
+                                            "right": "6px",
+                                            "cursor": "pointer",
+                                            "fontSize": "1.1rem",
+                                            "zIndex": "10",
                                         }
-                                ),
-                                
-                                dcc.DatePickerSingle(
-                                    id="Day",
-                                    min_date_allowed= df.index.min().date(),
-                                    max_date_allowed= df.index.max().date(),
-                                    date=df.index.max().date(),
-                                    display_format="YYYY-MM-DD",
-                                    style={
-                                        "width": "75%",
-                                        "transform": "scale(0.75)",
-                                        "display": "block"
-                                        },
-                                ),
-                                dcc.DatePickerSingle(
-                                    id="Month",
-                                    min_date_allowed= df.index.min().date(),
-                                    max_date_allowed= df.index.max().date(),
-                                    date=df.index.min().date(),
-                                    display_format="YYYY-MM",
-                                    style={
-                                        "width": "100%",
-                                        "display": "none"
+                                    ),
+                                    dcc.Markdown(
+                                        """
+                                        **Relative Luftfeuchtigkeit**
+                                        In dieser Kachel wird der minimale und maximale Wert (des Tages, Monats, Jahres) der relativen Luftfeuchtigkeit dargestellt. Fahren Sie mit der Maus über einen Balken um genauere Werte zu erhalten. 
+                                        """,
+                                        id="info_box_RH",
+                                        style={
+                                            "display": "none",
+                                            "position": "relative",
+                                            "top": "0",
+                                            "right": "0",
+                                            "left": "0",
+                                            "bottom": "0",
+                                            "padding": "1rem",
+                                            "backgroundColor": "#f4edae8e",
+                                            "zIndex": "9",
+                                            "overflowY": "auto",
+                                            "borderRadius": "15px"
                                         }
-                                ),
-                                dcc.Dropdown(
-                                    id="Year",
-                                    options=[
-                                        {"label": str(y), "value": str(y)}
-                                        for y in range (df.index.min().year, df.index.max().year + 1 )
-                                    ],
-                                    value = str(df.index.min().year),
-                                    clearable=False,
-                                    style={
-                                        "width": "80%",
-                                        "display": "none"
+                                    ),
+                                    dcc.Graph(
+                                        id="R_Humidity",
+                                        responsive=True,
+                                        style={"height": "100%", "width": "100%", "flex": "1"}
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "5",
+                                    "display": "flex",
+                                    "flexDirection": "column",
+                                    "position": "relative"
+                                },
+                            ),
+
+                            # Klimastation
+                            html.Div(
+                                id="kachel_card",
+                                children=[
+                                    html.H2("Klimastation" + " "+ "(" + str(letzter["TIMESTAMP"].date()) + ")",
+                                            id="titel_card",
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600",
+                                                "flex": "0 0 1px"
+                                                }
+                                    ),
+                                    html.Div(
+                                        "💡",
+                                        id="info_icon",
+                                        style= {
+                                            "position": "absolute",
+                                            "top": "3px",
+                                            "right": "6px",
+                                            "cursor": "pointer",
+                                            "fontSize": "1.1rem",
+                                            "zIndex": "10",
                                         }
-                                )
-                            ],
-                            style={
-                                **kachel_layout,
-                                "flex": "2"
-                            },
-                        ),
-                    
-                        # Relative Luftfeuchtigkeit
-                        html.Div(
-                            id="kachel_RH",
-                            children=[
-                                html.H2("Relative Luftfeuchtigkeit", 
-                                        style={"textAlign": "center",
-                                            "marginBottom": "0.3rem",
-                                            "fontSize": "0.9rem",
-                                            "fontWeight": "600",
-                                            "flex": "0 0  1px"
-                                }),
-                                html.Div(
-                                    "💡",
-                                    id="info_icon_RH",
-                                    style= {
-                                        "position": "absolute",
-                                        "top": "3px",
-                                        "right": "6px",
-                                        "cursor": "pointer",
-                                        "fontSize": "1.1rem",
-                                        "zIndex": "10",
-                                    }
-                                ),
-                                dcc.Markdown(
-                                    """
-                                    **Relative Luftfeuchtigkeit**
-                                    In dieser Kachel wird der minimale und maximale Wert (des Tages, Monats, Jahres) der relativen Luftfeuchtigkeit dargestellt. Fahren Sie mit der Maus über einen Balken um genauere Werte zu erhalten. 
-                                    """,
-                                    id="info_box_RH",
-                                    style={
-                                        "display": "none",
-                                        "position": "relative",
-                                        "top": "0",
-                                        "right": "0",
-                                        "left": "0",
-                                        "bottom": "0",
-                                        "padding": "1rem",
-                                        "backgroundColor": "#f4edae8e",
-                                        "zIndex": "9",
-                                        "overflowY": "auto",
-                                        "borderRadius": "15px"
-                                    }
-                                ),
-                                dcc.Graph(
-                                    id="R_Humidity",
-                                    responsive=True,
-                                    style={"height": "100%", "width": "100%", "flex": "1"}
-                                )
-                            ],
-                            style={
-                                **kachel_layout,
-                                "flex": "5",
-                                "display": "flex",
-                                "flexDirection": "column",
-                                "position": "relative"
-                            },
-                        ),
-
-                        # Klimastation
-                        html.Div(
-                            id="kachel_card",
-                            children=[
-                                html.H2("Klimastation" + " "+ "(" + str(df.index.max().date()) + ")", 
-                                        style={"textAlign": "center",
-                                            "marginBottom": "0.3rem",
-                                            "fontSize": "0.9rem",
-                                            "fontWeight": "600",
-                                            "flex": "0 0 1px"
-                                            }
-                                ),
-                                html.Div(
-                                    "💡",
-                                    id="info_icon",
-                                    style= {
-                                        "position": "absolute",
-                                        "top": "3px",
-                                        "right": "6px",
-                                        "cursor": "pointer",
-                                        "fontSize": "1.1rem",
-                                        "zIndex": "10",
-                                    }
-                                ),
-                                dcc.Markdown(
-                                    """
-                                    **Klimastation**
-                                    In dieser Kachel wird der Standort der Klimastation auf der Karte (orangener Punkt) verortet.
-                                    Zusätzlich werden die aktuelle **Temperatur** (oben links), die aktuelle ** Relative Luftfeuchtigkeit** (oben rechts) und der aktuelle **Luftdruck** (unten links) angegeben. 
-                                    """,
-                                    id="info_box",
-                                    style={
-                                        "display": "none",
-                                        "position": "relative",
-                                        "top": "0",
-                                        "right": "0",
-                                        "left": "0",
-                                        "bottom": "0",
-                                        "padding": "1rem",
-                                        "backgroundColor": "#f4edae8e",
-                                        "zIndex": "9",
-                                        "overflowY": "auto",
-                                        "borderRadius": "15px"
-                                    }
-                                ),
-                                dcc.Graph(
-                                    id="map",
-                                    figure=map,
-                                    responsive=True,
-                                    style={"height": "120px", "width": "100%", "flex": "1"},
-                                    config={"displayModeBar": False,
-                                            "scrollZoom": True,
-                                            "responsive": True}
-                                )
-                            ],
-                            style={
-                                **kachel_layout,
-                                "flex": "3",
-                                "position": "relative"
-                            },
-                        )
-                    ]
-                ),
-
-                # Mittlere Spalte
-                html.Div(
-                    style={
-                        "flex": "6", 
-                        "display": "flex", 
-                        "flexDirection": "column", 
-                        "minWidth": "600px", 
-                        "maxWidth": "none", 
-                        "height": "auto"
-                        },
-                    children=[
-                        html.Div(
-                            children=[
-                                html.H1(
-                                    "Klimastation Tübingen",
-                                    style={"textAlign": "center", "marginBottom": "1rem", "flex": "6"},
-                                ),
-                            ],
-                            style={
-                                **kachel_layout,
-                                "flex": "1.5",
-                                #"flexDirection": "column",
-                                "justifyContent": "flex-start",
-                                "alignItems": "scretch",
-                                "textAlign": "center",
-                                "display": "flex", 
-                                "flexDirection": "row"
-                            },
-                        ),
-                        html.Div(
-                            children=[
-                                html.Div(
-                                    "💡",
-                                    id="info_icon_CL",
-                                    style= {
-                                        "position": "absolute",
-                                        "top": "3px",
-                                        "right": "6px",
-                                        "cursor": "pointer",
-                                        "fontSize": "1.1rem",
-                                        "zIndex": "10",
-                                    }
-                                ),
-                                dcc.Markdown(
-                                    """
-                                    **Auswahl Klimavarialen:**
-                                    In dieser Kachel können Sie die Klimavariabeln, welche sie betrachten wollen selektieren.
-                                     
-                                    """,
-                                    id="info_box_CL",
-                                    style={
-                                        "display": "none",
-                                        "position": "relative",
-                                        "top": "0",
-                                        "right": "0",
-                                        "left": "0",
-                                        "bottom": "0",
-                                        "padding": "1rem",
-                                        "backgroundColor": "#f4edae8e",
-                                        "zIndex": "9",
-                                        "overflowY": "auto",
-                                        "borderRadius": "15px"
-                                    }
-                                ),
-                                 # Klimaelemente
-                                dcc.Checklist(
-                                    id="checklist_variables",
-                                    options=[
-                                        {"label": "Temperatur und Niederschlag ", "value":"temp_ns"},
-                                        {"label": "Relative Luftfeuchtigkeit ", "value":"RH"},
-                                        {"label": "Karte ", "value":"card"},
-                                        {"label": "Wind ", "value":"wind"},
-                                        {"label": "Solare Einstrahlung ", "value":"SR"},
-                                        #{"label": "Datum ", "value":"date"},
-                                    ],
-                                    value=["temp_ns", "RH", "card", "wind", "SR", "date"],
-                                    inline=True,
-                                    style={"width": "100%", "textAlign": "center", "flex": "4"}
-                                ),
-                            ],
-                            style={
-                                **kachel_layout,
-                                "flex": "0.5",
-                                #"flexDirection": "column",
-                                "justifyContent": "flex-start",
-                                "alignItems": "scretch",
-                                "textAlign": "center",
-                                "display": "flex", 
-                                "flexDirection": "row",
-                                "position": "relative"
-                            },
-                        ),
-                        
-                        # Lufttemperatur & Niederschlag
-                        html.Div(
-                            id="kachel_temp_ns",
-                            children=[
-                                html.H2("Lufttemperatur und Niederschlag", 
-                                        style={"textAlign": "center",
-                                            "marginBottom": "0.3rem",
-                                            "fontSize": "0.9rem",
-                                            "fontWeight": "600",
-                                            "flex": "0 0 1px"
-                                }),
-                                html.Div(
-                                    "💡",
-                                    id="info_icon_TN",
-                                    style= {
-                                        "position": "absolute",
-                                        "top": "3px",
-                                        "right": "6px",
-                                        "cursor": "pointer",
-                                        "fontSize": "1.1rem",
-                                        "zIndex": "10",
-                                    }
-                                ),
-                                dcc.Markdown(
-                                    """
-                                    **Lufttemperatur und Niederschlag:**
-                                    In dieser Kachel werden Lufttemperatur und Niederschlag visualisiert.
-                                    **Wichtig**: die Niederschlagssummen stellen nicht den tatsächlichen Wert dar, da die Sensorik des Messinstruments defekt ist.
-                                    Eine **Lücke** in der Temperaturkurve bedeutet bspw., dass hier keine Messung stattgefunden hat.
-
-                                    """,
-                                    id="info_box_TN",
-                                    style={
-                                        "display": "none",
-                                        "position": "relative",
-                                        "top": "0",
-                                        "right": "0",
-                                        "left": "0",
-                                        "bottom": "0",
-                                        "padding": "1rem",
-                                        "backgroundColor": "#f4edae8e",
-                                        "zIndex": "9",
-                                        "overflowY": "auto",
-                                        "borderRadius": "15px"
-                                    }
-                                ),
-                                dcc.Graph(
-                                    id="temperature-graph",
-                                    #figure=kachel1,
-                                    responsive = True,
-                                    style={
-                                        "height": "100%", 
-                                        "width": "100%",
-                                        "padding": "0",
-                                        "flex": "1"
-                                        }  
-                                )
-                            ],
-                            style={
-                                **kachel_layout,
-                                "flex": "8.5",
-                                "display": "flex",
-                                "flexDirection": "column", 
-                                "position": "relative"
-                            },
-                        ),
-                    ]
-                ),
-
-
-                # Rechte Spalte (flex 1, flex column)
-                html.Div(
-                    style={"flex": "3", "display": "flex", "flexDirection": "column"},
-                    children=[
-                        # Windrose oben
-                        html.Div(
-                            id="kachel_wind",
-                            children=[
-                                html.H2("Windrose", 
-                                        style={"textAlign": "center",
-                                            "marginBottom": "0.1rem",
-                                            "fontSize": "0.9rem",
-                                            "fontWeight": "600",
-                                            "flex": "0 0 1px"
-                                }),
-                                html.Div(
-                                    "💡",
-                                    id="info_icon_W",
-                                    style= {
-                                        "position": "absolute",
-                                        "top": "3px",
-                                        "right": "6px",
-                                        "cursor": "pointer",
-                                        "fontSize": "1.1rem",
-                                        "zIndex": "10",
-                                    }
-                                ),
-                                dcc.Markdown(
-                                    """
-                                    **Wind:**
-                                    In dieser Kachel wird die Windrichtung und die Windgeschwindigkeit visualisiert.
-                                    Umso häufiger eine Windrichtung vorkommt, desto weiter nach Außen in der Windrose geht der Balken.
-                                    Die Windgeschwindigkeit wird farblich dargestellt. 
-                                    Die Windrichtungen wurden hier stündlich gemittelt und gezählt wie oft eine Windrichtung vorkam. Fährt man mit dem 
-                                    Mauszeiger über die Visualisierung, so erhält man unter dem Wert "r:" die Verteilung wie oft der Wind aus der entsprechenden Richtung kommt
-                                    und die Verteilung wie oft mit welcher Geschwindigkeit.
-                                    
-                                     
-                                    """,
-                                    id="info_box_W",
-                                    style={
-                                        "display": "none",
-                                        "position": "relative",
-                                        "top": "0",
-                                        "right": "0",
-                                        "left": "0",
-                                        "bottom": "0",
-                                        "padding": "1rem",
-                                        "backgroundColor": "#f4edae8e",
-                                        "zIndex": "9",
-                                        "overflowY": "auto",
-                                        "borderRadius": "15px"
-                                    }
-                                ),
-                                dcc.Graph(
-                                    id="Windrose",
-                                    responsive = True,
-                                    style={"height": "100%", "width": "100%", "flex": "1"}
-                                )
-                            ],
-                            style={
-                                **kachel_layout,
-                                "flex": "6",
-                                "display": "flex",
-                                "flexDirection": "column",
-                                "position": "relative"
-                            },
-                        ),
-
-                # Solare Einstrahlung
-                html.Div(
-                    style={"flex": "6", "display": "flex", "flexDirection": "column"},
-                    children=[
-                        html.Div(
-                            id="kachel_SR",
-                            children=[
-                                html.H2("Solare Einstrahlung", 
-                                        style={"textAlign": "center",
-                                            "marginBottom": "0.3rem",
-                                            "fontSize": "0.9rem",
-                                            "fontWeight": "600"
-                                }),
-                                html.Div(
-                                    "💡",
-                                    id="info_icon_SE",
-                                    style= {
-                                        "position": "absolute",
-                                        "top": "3px",
-                                        "right": "6px",
-                                        "cursor": "pointer",
-                                        "fontSize": "1.1rem",
-                                        "zIndex": "10",
-                                    }
-                                ),
-                                dcc.Markdown(
-                                    """
-                                    **Solare Einstrahlung:**
-                                    Diese Visualisierung zeigt wie viel kW/qm zum jeweiligen Zeitpunkt von der Klimastation erfasst wurden.
-                                    Weiße Stellen in der Darstellung zeigen Lücken in der Datenerhebung
-                                    **Achtung** 0kW/qm wird hier in hellgelb dargestellt!
-                                    
+                                    ),
+                                    dcc.Markdown(
+                                        """
+                                        **Klimastation**
+                                        In dieser Kachel wird der Standort der Klimastation auf der Karte (orangener Punkt) verortet.
+                                        Zusätzlich werden die aktuelle **Temperatur** (oben links), die aktuelle ** Relative Luftfeuchtigkeit** (oben rechts) und der aktuelle **Luftdruck** (unten links) angegeben. 
+                                        """,
+                                        id="info_box",
+                                        style={
+                                            "display": "none",
+                                            "position": "relative",
+                                            "top": "0",
+                                            "right": "0",
+                                            "left": "0",
+                                            "bottom": "0",
+                                            "padding": "1rem",
+                                            "backgroundColor": "#f4edae8e",
+                                            "zIndex": "9",
+                                            "overflowY": "auto",
+                                            "borderRadius": "15px"
+                                        }
+                                    ),
+                                    dcc.Interval(id="aktuell_intervall", interval=konfiguration["aktualisierung_sekunden"] * 1000),
+                                    dcc.Store(id="aktuell_zeitstempel", data=str(letzter["TIMESTAMP"])),
+                                    dcc.Graph(
+                                        id="map",
+                                        figure=erstelleKarte(letzter),
+                                        responsive=True,
+                                        style={"height": "120px", "width": "100%", "flex": "1"},
+                                        config={"displayModeBar": False,
+                                                "scrollZoom": True,
+                                                "responsive": True}
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "3",
+                                    "position": "relative"
+                                },
+                            )
+                        ]
+                    ),
 
-                                    """,
-                                    id="info_box_SE",
-                                    style={
-                                        "display": "none",
-                                        "position": "relative",
-                                        "top": "0",
-                                        "right": "0",
-                                        "left": "0",
-                                        "bottom": "0",
-                                        "padding": "1rem",
-                                        "backgroundColor": "#f4edae8e",
-                                        "zIndex": "9",
-                                        "overflowY": "auto",
-                                        "borderRadius": "15px"
-                                    }
-                                ),
-                                dcc.Graph(
-                                    id="HM-solar",
-                                    figure=fig_solar,
-                                    responsive=True,
-                                    style={"height": "90%", "width": "100%"}
-                                )
-                            ],
-                            style={
-                                **kachel_layout,
-                                "flex": "4",
-                                "position": "relative"
+                    # Mittlere Spalte
+                    html.Div(
+                        style={
+                            "flex": "6", 
+                            "display": "flex", 
+                            "flexDirection": "column", 
+                            "minWidth": "600px", 
+                            "maxWidth": "none", 
+                            "height": "auto"
                             },
-                        )
-                    ]
-                ),
-                    ]
-                )
-            ]
-        ),
-    ])
+                        children=[
+                            html.Div(
+                                children=[
+                                    html.H1(
+                                        "Klimastation Tübingen",
+                                        style={"textAlign": "center", "marginBottom": "1rem", "flex": "6"},
+                                    ),
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "1.5",
+                                    #"flexDirection": "column",
+                                    "justifyContent": "flex-start",
+                                    "alignItems": "scretch",
+                                    "textAlign": "center",
+                                    "display": "flex", 
+                                    "flexDirection": "row"
+                                },
+                            ),
+                            html.Div(
+                                children=[
+                                    html.Div(
+                                        "💡",
+                                        id="info_icon_CL",
+                                        style= {
+                                            "position": "absolute",
+                                            "top": "3px",
+                                            "right": "6px",
+                                            "cursor": "pointer",
+                                            "fontSize": "1.1rem",
+                                            "zIndex": "10",
+                                        }
+                                    ),
+                                    dcc.Markdown(
+                                        """
+                                        **Auswahl Klimavarialen:**
+                                        In dieser Kachel können Sie die Klimavariabeln, welche sie betrachten wollen selektieren.
+                                         
+                                        """,
+                                        id="info_box_CL",
+                                        style={
+                                            "display": "none",
+                                            "position": "relative",
+                                            "top": "0",
+                                            "right": "0",
+                                            "left": "0",
+                                            "bottom": "0",
+                                            "padding": "1rem",
+                                            "backgroundColor": "#f4edae8e",
+                                            "zIndex": "9",
+                                            "overflowY": "auto",
+                                            "borderRadius": "15px"
+                                        }
+                                    ),
+                                     # Klimaelemente
+                                    dcc.Checklist(
+                                        id="checklist_variables",
+                                        options=[
+                                            {"label": "Temperatur und Niederschlag ", "value":"temp_ns"},
+                                            {"label": "Relative Luftfeuchtigkeit ", "value":"RH"},
+                                            {"label": "Karte ", "value":"card"},
+                                            {"label": "Wind ", "value":"wind"},
+                                            {"label": "Solare Einstrahlung ", "value":"SR"},
+                                            {"label": "Tabelle ", "value":"table"},
+                                            {"label": "Abgeleitete Größen ", "value":"abgeleitet"},
+                                            {"label": "Vergleich ", "value":"vergleich"},
+                                            {"label": "Verteilung ", "value":"verteilung"},
+                                            {"label": "Raster ", "value":"raster"},
+                                            #{"label": "Datum ", "value":"date"},
+                                        ],
+                                        value=["temp_ns", "RH", "card", "wind", "SR", "date"],
+                                        inline=True,
+                                        style={"width": "100%", "textAlign": "center", "flex": "4"}
+                                    ),
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "0.5",
+                                    #"flexDirection": "column",
+                                    "justifyContent": "flex-start",
+                                    "alignItems": "scretch",
+                                    "textAlign": "center",
+                                    "display": "flex", 
+                                    "flexDirection": "row",
+                                    "position": "relative"
+                                },
+                            ),
+                            
+                            # Lufttemperatur & Niederschlag
+                            html.Div(
+                                id="kachel_temp_ns",
+                                children=[
+                                    html.H2("Lufttemperatur und Niederschlag", 
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600",
+                                                "flex": "0 0 1px"
+                                    }),
+                                    html.Progress(id="fortschritt_TN", style=fortschritt_versteckt),
+                                    dcc.Store(id="auftrag_TN"),
+                                    dcc.Store(id="gerendert_TN"),
+                                    dcc.Store(id="anfrage_TN"),
+                                    dcc.Store(id="sitzung_TN", storage_type="session"),
+                                    html.Div(
+                                        "💡",
+                                        id="info_icon_TN",
+                                        style= {
+                                            "position": "absolute",
+                                            "top": "3px",
+                                            "right": "6px",
+                                            "cursor": "pointer",
+                                            "fontSize": "1.1rem",
+                                            "zIndex": "10",
+                                        }
+                                    ),
+                                    dcc.Markdown(
+                                        """
+                                        **Lufttemperatur und Niederschlag:**
+                                        In dieser Kachel werden Lufttemperatur und Niederschlag visualisiert.
+                                        **Wichtig**: die Niederschlagssummen stellen nicht den tatsächlichen Wert dar, da die Sensorik des Messinstruments defekt ist.
+                                        Eine **Lücke** in der Temperaturkurve bedeutet bspw., dass hier keine Messung stattgefunden hat.
 
-# Callback Checkliste für Klimavariablen
+                                        """,
+                                        id="info_box_TN",
+                                        style={
+                                            "display": "none",
+                                            "position": "relative",
+                                            "top": "0",
+                                            "right": "0",
+                                            "left": "0",
+                                            "bottom": "0",
+                                            "padding": "1rem",
+                                            "backgroundColor": "#f4edae8e",
+                                            "zIndex": "9",
+                                            "overflowY": "auto",
+                                            "borderRadius": "15px"
+                                        }
+                                    ),
+                                    dcc.Graph(
+                                        id="temperature-graph",
+                                        #figure=kachel1,
+                                        responsive = True,
+                                        style={
+                                            "height": "100%", 
+                                            "width": "100%",
+                                            "padding": "0",
+                                            "flex": "1"
+                                            }  
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "8.5",
+                                    "display": "flex",
+                                    "flexDirection": "column", 
+                                    "position": "relative"
+                                },
+                            ),
 
-@app.callback(
-        [
-            Output("kachel_temp_ns", "style"),
-            Output("kachel_RH", "style"),
-            Output("kachel_card", "style"),
-            Output("kachel_wind", "style"),
-            Output("kachel_SR", "style"),
-            Output("kachel_date", "style")
-        ], 
+                            # Rohdaten-Tabelle (Blättern, Sortieren und Filtern auf dem Server)
+                            html.Div(
+                                id="kachel_table",
+                                children=[
+                                    html.H2("Rohdaten", 
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600",
+                                                "flex": "0 0 1px"
+                                    }),
+                                    dash_table.DataTable(
+                                        id="rohdaten_tabelle",
+                                        columns=[
+                                            dict(spalte, type="datetime" if spalte["id"] == "TIMESTAMP" else "numeric")
+                                            for spalte in table_columns
+                                        ],
+                                        page_current=0,
+                                        page_size=tabelle_seitengroesse,
+                                        page_action="custom",
+                                        sort_action="custom",
+                                        sort_mode="multi",
+                                        sort_by=[],
+                                        filter_action="custom",
+                                        filter_query="",
+                                        style_table={"overflowX": "auto", "overflowY": "auto"},
+                                        style_cell={"fontSize": "0.7rem", "padding": "2px 6px"},
+                                        style_header={"fontWeight": "600"}
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "6",
+                                    "display": "none",
+                                    "flexDirection": "column",
+                                    "overflow": "auto",
+                                    "position": "relative"
+                                },
+                            ),
+
+                            # Abgeleitete Größen (Taupunkt, Hitzeindex, ...)
+                            html.Div(
+                                id="kachel_abgeleitet",
+                                children=[
+                                    html.H2("Abgeleitete Größen", 
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600",
+                                                "flex": "0 0 1px"
+                                    }),
+                                    dcc.Dropdown(
+                                        id="abgeleitet_variable",
+                                        options=[
+                                            {"label": f"{variable['name']} ({variable['einheit']})", "value": name}
+                                            for name, variable in abgeleitete_variablen.items()
+                                        ],
+                                        value="Taupunkt",
+                                        clearable=False,
+                                        style={"width": "60%", "fontSize": "0.75rem"}
+                                    ),
+                                    dcc.Graph(
+                                        id="abgeleitet_graph",
+                                        responsive = True,
+                                        style={
+                                            "height": "100%", 
+                                            "width": "100%",
+                                            "padding": "0",
+                                            "flex": "1"
+                                            }  
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "6",
+                                    "display": "none",
+                                    "flexDirection": "column",
+                                    "position": "relative"
+                                },
+                            ),
+
+                            # Vergleich mehrerer Jahre oder Monate
+                            html.Div(
+                                id="kachel_vergleich",
+                                children=[
+                                    html.H2("Vergleich Temperatur und Niederschlag", 
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600",
+                                                "flex": "0 0 1px"
+                                    }),
+                                    html.Div(
+                                        children=[
+                                            dcc.RadioItems(
+                                                id="vergleich_modus",
+                                                options=[
+                                                    {"label": "Jahre (Tage) ", "value": "jahr_tag"},
+                                                    {"label": "Jahre (Monate) ", "value": "jahr_monat"},
+                                                    {"label": "Monate ", "value": "monat_tag"}
+                                                ],
+                                                value="jahr_tag",
+                                                inline=True,
+                                                style={"fontSize": "0.75rem"}
+                                            ),
+                                            dcc.Dropdown(
+                                                id="vergleich_auswahl",
+                                                multi=True,
+                                                style={"flex": "1", "fontSize": "0.75rem"}
+                                            )
+                                        ],
+                                        style={"display": "flex", "gap": "0.5rem", "alignItems": "center"}
+                                    ),
+                                    dcc.Graph(
+                                        id="vergleich_graph",
+                                        responsive = True,
+                                        style={
+                                            "height": "100%", 
+                                            "width": "100%",
+                                            "padding": "0",
+                                            "flex": "1"
+                                            }  
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "6",
+                                    "display": "none",
+                                    "flexDirection": "column",
+                                    "position": "relative"
+                                },
+                            ),
+
+                            # Verteilung (Boxplots aus den Quantil-Skizzen)
+                            html.Div(
+                                id="kachel_verteilung",
+                                children=[
+                                    html.H2("Verteilung", 
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600",
+                                                "flex": "0 0 1px"
+                                    }),
+                                    dcc.Dropdown(
+                                        id="verteilung_variable",
+                                        options=[
+                                            {"label": spalte["name"], "value": spalte["id"]}
+                                            for spalte in table_columns if spalte["id"] in skizzen_variablen
+                                        ],
+                                        value="AirTC_Avg",
+                                        clearable=False,
+                                        style={"width": "60%", "fontSize": "0.75rem"}
+                                    ),
+                                    dcc.Graph(
+                                        id="verteilung_graph",
+                                        responsive = True,
+                                        style={
+                                            "height": "100%", 
+                                            "width": "100%",
+                                            "padding": "0",
+                                            "flex": "1"
+                                            }  
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "6",
+                                    "display": "none",
+                                    "flexDirection": "column",
+                                    "position": "relative"
+                                },
+                            ),
+
+                            # Rasterdarstellung dichter Rohdaten (Bild statt Einzelpunkte)
+                            html.Div(
+                                id="kachel_raster",
+                                children=[
+                                    html.H2("Rasterdarstellung", 
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600",
+                                                "flex": "0 0 1px"
+                                    }),
+                                    html.Div(
+                                        children=[
+                                            dcc.Dropdown(
+                                                id="raster_ansicht",
+                                                options=[{"label": ansicht["name"], "value": schluessel} for schluessel, ansicht in raster_ansichten.items()],
+                                                value="temperatur_zeit",
+                                                clearable=False,
+                                                style={"flex": "1", "fontSize": "0.75rem"}
+                                            ),
+                                            dcc.RadioItems(
+                                                id="raster_aggregation",
+                                                options=[{"label": name + " ", "value": schluessel} for schluessel, name in raster_aggregationen.items()],
+                                                value="anzahl",
+                                                inline=True,
+                                                style={"fontSize": "0.75rem"}
+                                            ),
+                                            dcc.Dropdown(
+                                                id="raster_wert",
+                                                options=[
+                                                    {"label": spalte["name"], "value": spalte["id"]}
+                                                    for spalte in table_columns if spalte["id"] in raster_werte
+                                                ],
+                                                value="AirTC_Avg",
+                                                clearable=False,
+                                                style={"flex": "1", "fontSize": "0.75rem"}
+                                            )
+                                        ],
+                                        style={"display": "flex", "gap": "0.5rem", "alignItems": "center"}
+                                    ),
+                                    dcc.Store(id="raster_groesse"),
+                                    dcc.Graph(
+                                        id="raster_graph",
+                                        responsive = True,
+                                        style={
+                                            "height": "100%", 
+                                            "width": "100%",
+                                            "padding": "0",
+                                            "flex": "1"
+                                            }  
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "6",
+                                    "display": "none",
+                                    "flexDirection": "column",
+                                    "position": "relative"
+                                },
+                            ),
+                        ]
+                    ),
+
+
+                    # Rechte Spalte (flex 1, flex column)
+                    html.Div(
+                        style={"flex": "3", "display": "flex", "flexDirection": "column"},
+                        children=[
+                            # Windrose oben
+                            html.Div(
+                                id="kachel_wind",
+                                children=[
+                                    html.H2("Windrose", 
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.1rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600",
+                                                "flex": "0 0 1px"
+                                    }),
+                                    html.Progress(id="fortschritt_W", style=fortschritt_versteckt),
+                                    dcc.Store(id="auftrag_W"),
+                                    dcc.Store(id="gerendert_W"),
+                                    dcc.Store(id="anfrage_W"),
+                                    dcc.Store(id="sitzung_W", storage_type="session"),
+                                    html.Div(
+                                        "💡",
+                                        id="info_icon_W",
+                                        style= {
+                                            "position": "absolute",
+                                            "top": "3px",
+                                            "right": "6px",
+                                            "cursor": "pointer",
+                                            "fontSize": "1.1rem",
+                                            "zIndex": "10",
+                                        }
+                                    ),
+                                    dcc.Markdown(
+                                        """
+                                        **Wind:**
+                                        In dieser Kachel wird die Windrichtung und die Windgeschwindigkeit visualisiert.
+                                        Umso häufiger eine Windrichtung vorkommt, desto weiter nach Außen in der Windrose geht der Balken.
+                                        Die Windgeschwindigkeit wird farblich dargestellt. 
+                                        Die Windrichtungen wurden hier stündlich gemittelt und gezählt wie oft eine Windrichtung vorkam. Fährt man mit dem 
+                                        Mauszeiger über die Visualisierung, so erhält man unter dem Wert "r:" die Verteilung wie oft der Wind aus der entsprechenden Richtung kommt
+                                        und die Verteilung wie oft mit welcher Geschwindigkeit.
+                                        
+                                         
+                                        """,
+                                        id="info_box_W",
+                                        style={
+                                            "display": "none",
+                                            "position": "relative",
+                                            "top": "0",
+                                            "right": "0",
+                                            "left": "0",
+                                            "bottom": "0",
+                                            "padding": "1rem",
+                                            "backgroundColor": "#f4edae8e",
+                                            "zIndex": "9",
+                                            "overflowY": "auto",
+                                            "borderRadius": "15px"
+                                        }
+                                    ),
+                                    dcc.Graph(
+                                        id="Windrose",
+                                        responsive = True,
+                                        style={"height": "100%", "width": "100%", "flex": "1"}
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "6",
+                                    "display": "flex",
+                                    "flexDirection": "column",
+                                    "position": "relative"
+                                },
+                            ),
+
+                    # Solare Einstrahlung
+                    html.Div(
+                        style={"flex": "6", "display": "flex", "flexDirection": "column"},
+                        children=[
+                            html.Div(
+                                id="kachel_SR",
+                                children=[
+                                    html.H2("Solare Einstrahlung", 
+                                            style={"textAlign": "center",
+                                                "marginBottom": "0.3rem",
+                                                "fontSize": "0.9rem",
+                                                "fontWeight": "600"
+                                    }),
+                                    html.Progress(id="fortschritt_SE", style=fortschritt_versteckt),
+                                    dcc.Store(id="auftrag_SE"),
+                                    dcc.Store(id="gerendert_SE"),
+                                    dcc.Store(id="anfrage_SE"),
+                                    dcc.Store(id="sitzung_SE", storage_type="session"),
+                                    html.Div(
+                                        "💡",
+                                        id="info_icon_SE",
+                                        style= {
+                                            "position": "absolute",
+                                            "top": "3px",
+                                            "right": "6px",
+                                            "cursor": "pointer",
+                                            "fontSize": "1.1rem",
+                                            "zIndex": "10",
+                                        }
+                                    ),
+                                    dcc.Markdown(
+                                        """
+                                        **Solare Einstrahlung:**
+                                        Diese Visualisierung zeigt wie viel kW/qm zum jeweiligen Zeitpunkt von der Klimastation erfasst wurden.
+                                        Weiße Stellen in der Darstellung zeigen Lücken in der Datenerhebung
+                                        **Achtung** 0kW/qm wird hier in hellgelb dargestellt!
+                                        
+
+                                        """,
+                                        id="info_box_SE",
+                                        style={
+                                            "display": "none",
+                                            "position": "relative",
+                                            "top": "0",
+                                            "right": "0",
+                                            "left": "0",
+                                            "bottom": "0",
+                                            "padding": "1rem",
+                                            "backgroundColor": "#f4edae8e",
+                                            "zIndex": "9",
+                                            "overflowY": "auto",
+                                            "borderRadius": "15px"
+                                        }
+                                    ),
+                                    dcc.Graph(
+                                        id="HM-solar",
+                                        figure=leereSolarkarte(),
+                                        responsive=True,
+                                        style={"height": "90%", "width": "100%"}
+                                    )
+                                ],
+                                style={
+                                    **kachel_layout,
+                                    "flex": "4",
+                                    "position": "relative"
+                                },
+                            )
+                        ]
+                    ),
+                        ]
+                    )
+                ]
+            ),
+        ])
+
+# Callbacks und Server-Routen werden hier nur gesammelt und erst in create_app()
+# an die App gehängt. So hat der Import des Moduls keine Seiteneffekte und jede App
+# (z.B. mit anderer Konfiguration) bekommt alle Callbacks.
+app_callbacks = []
+server_routen = []
+
+def appCallback(*args, **kwargs):
+    def registriere(funktion):
+        app_callbacks.append((args, kwargs, funktion))
+        return funktion
+    return registriere
+
+def serverRoute(regel, **optionen):
+    def registriere(funktion):
+        server_routen.append((regel, funktion, optionen))
+        return funktion
+    return registriere
+
+# Zeitraum-Auswahl, von der alle Diagramm-Kacheln abhängen
+zeitraum_inputs = [
+    Input("Auswahl-Dropdown", "value"),
+    Input("Day", "date"),
+    Input("Month", "date"),
+    Input("Year", "value")
+]
+
+# Zeitfenster [start, ende) für den gewählten Zeitraum (None, wenn kein Datum gewählt ist)
+def zeitfenster(time, Day, Month, Year):
+    if time == 'D' and Day is not None:
+        start = pd.to_datetime(Day).normalize()
+        return start, start + pd.DateOffset(days=1)
+    elif time == 'M' and Month is not None:
+        start = pd.to_datetime(Month).to_period("M").to_timestamp()
+        return start, start + pd.DateOffset(months=1)
+    elif time == 'Y' and Year is not None:
+        start = pd.Timestamp(year=pd.to_datetime(Year).year, month=1, day=1)
+        return start, start + pd.DateOffset(years=1)
+    return None
+
+# Zeilen im Zeitfenster per Binärsuche auf dem sortierten Zeitstempel ausschneiden
+# (statt jede Zeile des gesamten Datensatzes zu vergleichen)
+def ausschnitt(data, start, ende):
+    zeiten = data.index if isinstance(data.index, pd.DatetimeIndex) else data["TIMESTAMP"]
+    links, rechts = zeiten.searchsorted([start, ende])
+    return data.iloc[links:rechts]
+
+# Ausschnitt aus einem Rollup; leere Intervalle am Rand werden wie beim Resampling
+# eines Rohdaten-Ausschnitts weggelassen
+def rollupAusschnitt(rollup, start, ende):
+    teil = ausschnitt(rollup, start, ende)
+    belegt = np.flatnonzero(teil["RECORD"].to_numpy() > 0)
+    if len(belegt) == 0:
+        return teil.iloc[0:0]
+    return teil.iloc[belegt[0]:belegt[-1] + 1]
+
+# Eindeutiger Schlüssel für den gewählten Zeitraum, z.B. "D|2024-03-01", "M|2024-03", "Y|2024"
+def zeitraumSchluessel(time, Day, Month, Year):
+    if time == 'D':
+        return "D|" + str(pd.to_datetime(Day).date())
+    elif time == 'M':
+        return "M|" + pd.to_datetime(Month).strftime("%Y-%m")
+    return "Y|" + str(Year)
+
+# Single-Flight für Diagramme
+# Kommen gleichzeitig mehrere Anfragen für dieselbe Figur, denselben Zeitraum und denselben
+# Datenstand, rechnet nur die erste. Alle anderen warten auf deren Ergebnis.
+laufende_figuren = {}
+laufende_figuren_lock = threading.Lock()
+
+def berechneFigur(methode, time, Day, Month, Year, fortschritt=None):
+    schluessel = (methode.__name__, zeitraumSchluessel(time, Day, Month, Year), datenstand().version)
+
+    with laufende_figuren_lock:
+        berechnung = laufende_figuren.get(schluessel)
+        erster = berechnung is None
+        if erster:
+            berechnung = laufende_figuren[schluessel] = {"fertig": threading.Event()}
+
+    metriken.zaehle("klimastation_cache_zugriffe_total", {"cache": "figur_singleflight", "ergebnis": "fehlgriff" if erster else "treffer"})
+    if not erster:
+        berechnung["fertig"].wait()
+        if "fehler" in berechnung:
+            raise berechnung["fehler"]
+        return berechnung["figur"]
+
+    try:
+        messung_lokal.marken = [perf_counter()]
+        berechnung["figur"] = methode(time, Day, Month, Year, fortschritt=fortschritt)
+        erfassePhasen(messung_lokal.marken + [perf_counter()])
+        return berechnung["figur"]
+    except Exception as fehler:
+        berechnung["fehler"] = fehler
+        raise
+    finally:
+        with laufende_figuren_lock:
+            del laufende_figuren[schluessel]
+        berechnung["fertig"].set()
+
+# Fortschritt eines Hintergrund-Callbacks melden (Schritt x von 3: filtern, aggregieren, Diagramm)
+# und den Zeitpunkt für die Phasen-Metriken merken
+def meldeFortschritt(fortschritt, schritt, schritte=3):
+    marken = getattr(messung_lokal, "marken", None)
+    if marken is not None:
+        marken.append(perf_counter())
+    if fortschritt is not None:
+        fortschritt((str(schritt), str(schritte)))
+
+figur_phasen = ["filtern", "aggregieren", "diagramm"]
+
+def erfassePhasen(marken):
+    callback = getattr(messung_lokal, "callback", None)
+    messung_lokal.marken = None
+    if callback is None or len(marken) != len(figur_phasen) + 1:
+        return
+    for phase, start, ende in zip(figur_phasen, marken, marken[1:]):
+        metriken.beobachte("klimastation_callback_phase_sekunden", {"callback": callback, "phase": phase}, ende - start)
+
+# Callback mit Metriken (Aufrufe, Laufzeit) umhüllen
+def gemessen(name):
+    profilierung.callbacks.add(name)
+
+    def umhuellen(funktion):
+        @wraps(funktion)
+        def messen(*args, **kwargs):
+            messung_lokal.callback = name
+            ergebnis = "fehler"
+            profil = profilierung.beanspruche(name) if profilierung.offen else None
+            if profil is not None:
+                abtaster = Abtaster(threading.get_ident(), sys._getframe(), profil[1])
+                abtaster.start()
+            start = perf_counter()
+            try:
+                with festerDatenstand():
+                    rueckgabe = funktion(*args, **kwargs)
+                if rueckgabe is no_update or (isinstance(rueckgabe, (list, tuple)) and all(r is no_update for r in rueckgabe)):
+                    ergebnis = "kein_update"
+                else:
+                    ergebnis = "ok"
+                return rueckgabe
+            except PreventUpdate:
+                ergebnis = "kein_update"
+                raise
+            finally:
+                dauer = perf_counter() - start
+                messung_lokal.callback = None
+                if profil is not None:
+                    stapel = abtaster.beende()
+                    if ergebnis == "kein_update" or not stapel:
+                        profilierung.freigeben(profil[0])
+                    else:
+                        profilierung.speichere(profil[0], name, dauer, stapel)
+                metriken.zaehle("klimastation_callback_aufrufe_total", {"callback": name, "ergebnis": ergebnis})
+                metriken.beobachte("klimastation_callback_sekunden", {"callback": name}, dauer)
+                if has_request_context():
+                    g.metrik_callback = name
+                    g.metrik_callback_sekunden = dauer
+        return messen
+    return umhuellen
+
+# Callback Checkliste für Klimavariablen
+
+@appCallback(
+        [
+            Output("kachel_temp_ns", "style"),
+            Output("kachel_RH", "style"),
+            Output("kachel_card", "style"),
+            Output("kachel_wind", "style"),
+            Output("kachel_SR", "style"),
+            Output("kachel_date", "style")
+        ], 
         Input("checklist_variables", "value"),
         [
             State("kachel_temp_ns", "style"),
@@ -771,8 +2858,23 @@ def updateVariables(selected, temp_ns_style, RH_style, card_style, wind_style, S
         apply(date_style, "date")
     ]
 
+# Callback Tabelle ein-/ausblenden
+# Die Tabelle ist standardmäßig ausgeblendet und belegt dann keinen Platz
+@appCallback(
+    Output("kachel_table", "style"),
+    Input("checklist_variables", "value"),
+    State("kachel_table", "style")
+)
+
+# Methode für Tabelle ein-/ausblenden
+
+def updateTabelleSichtbar(selected, style):
+    style = dict(style or {})
+    style["display"] = "flex" if "table" in (selected or []) else "none"
+    return style
+
 # Callback Dropdown Datumsauswahl
-@app.callback(
+@appCallback(
         Output("Day", "style"),
         Output("Month", "style"),
         Output("Year", "style"),
@@ -791,43 +2893,78 @@ def calender(zeitraum):
     else:
         return hidden, hidden, visible
 
-# Callback Dropdown Diagramm
+# Methode für Klima-Überlagerung im Temperaturdiagramm
+# Tagesansicht gegen die Stundenklimatologie, Monatsansicht gegen die Tages- und Jahresansicht gegen
+# die Monatsklimatologie. Die Spuren sind zunächst nur in der Legende sichtbar. Normalwerte und
+# Abweichung werden in der Auflösung der Klimatologie gezeichnet (Tagesansicht: 24 Stundenwerte statt
+# eines Punkts je Messwert), damit die ausgeblendeten Spuren die Abbildung kaum vergrößern.
+klima_ebene = {"D": "h", "M": "D", "Y": "M"}
+klima_abweichung_farben = [[0, "#1E88E5"], [0.5, "#EEEEEE"], [1, "#E53935"]]
 
-@app.callback(
-        Output("temperature-graph", "figure"),
-        Input("Auswahl-Dropdown", "value"),
-        Input("Day", "date"),
-        Input("Month", "date"),
-        Input("Year", "value")
-)
-# Methode für Temperatur und Niederschlag
+def klimaUeberlagerung(fig, klima, data):
+    perioden = periodenBeginn(pd.DatetimeIndex(data["TIMESTAMP"]), klima.freq)
+    temperatur = data["AirTC_Avg"].groupby(perioden).mean()
+    if len(temperatur) == 0:
+        return
+    werte = klima.nachschlagen("AirTC_Avg", temperatur.index)
+    if np.isnan(werte["mittel"]).all():
+        return
+    abweichung = temperatur.to_numpy(dtype=float) - werte["mittel"]
+    # Hundertstel Grad reichen für die Anzeige und halbieren die Länge der Zahlen im JSON
+    werte = {name: np.round(feld, 2) for name, feld in werte.items()}
+    abweichung = np.round(abweichung, 2)
+    # Mehrere Messwerte je Periode: Klimawerte in die Mitte der Periode setzen
+    zeiten = temperatur.index
+    if len(temperatur) < len(data):
+        zeiten = zeiten + ((zeiten.to_period(klima.freq) + 1).to_timestamp() - zeiten) / 2
+    # Ganze Tage als Datum ohne Uhrzeit übertragen
+    if (zeiten == zeiten.normalize()).all():
+        zeiten = zeiten.strftime("%Y-%m-%d")
 
-def updateGraph(agg, Day, Month, Year):
-    if agg == 'D':
-        df_new = df[df.index.date == pd.to_datetime(Day).date()]
-    elif agg == 'M':
-        year = pd.to_datetime(Month).year
-        month = pd.to_datetime(Month).month
-        df_new = df[(df.index.year == year) & (df.index.month == month)]
-    elif agg == 'Y':
-        year = int(Year)
-        df_new = df[df.index.year == year]
+    fig.add_trace(go.Scatter(
+        x=zeiten, y=werte["p10"],
+        line=dict(width=0), hoverinfo="skip", showlegend=False,
+        legendgroup="klima", visible="legendonly", yaxis="y"
+    ))
+    fig.add_trace(go.Scatter(
+        x=zeiten, y=werte["p90"],
+        name="Normalbereich (10.-90. Perzentil)",
+        line=dict(width=0), fill="tonexty", fillcolor="rgba(120,120,120,0.2)", hoverinfo="skip",
+        legendgroup="klima", visible="legendonly", yaxis="y"
+    ))
+    fig.add_trace(go.Scatter(
+        x=zeiten, y=werte["mittel"],
+        name="Klimamittel (°C)",
+        customdata=np.stack([werte["n"], werte["std"]], axis=-1),
+        hovertemplate="%{y:.1f} °C ± %{customdata[1]:.1f} (%{customdata[0]} Jahre)<extra>Klimamittel</extra>",
+        line=dict(color="#616161", width=2, dash="dash"),
+        legendgroup="klima", visible="legendonly", yaxis="y"
+    ))
+    fig.add_trace(go.Bar(
+        x=zeiten, y=abweichung,
+        name="Abweichung vom Klimamittel (K)",
+        marker=dict(color=np.round(abweichung, 1), colorscale=klima_abweichung_farben, cmid=0),
+        opacity=0.6,
+        visible="legendonly", yaxis="y"
+    ))
 
-    # zweite if-Anweisung für Monatliche und jährlich Aggregation
+# Methode für Temperatur und Niederschlag
+# (wird unten über registriereKachel() als Callback angemeldet)
+
+def updateGraph(agg, Day, Month, Year, fortschritt=None):
+    d = datenstand()
+    fenster = zeitfenster(agg, Day, Month, Year)
 
+    # Tagesansicht aus den Rohdaten, Monats- und Jahresansicht aus den täglichen bzw. monatlichen Rollups
     if agg == 'M':
-        df_new = df_new.resample('D').agg({
-            'AirTC_Avg': 'mean',
-            'Rain_mm_Avg': 'sum'
-        })
+        df_new = rollupAusschnitt(d.df_daily, *fenster)[['AirTC_Avg', 'Rain_mm_Avg']]
     elif agg == 'Y':
-        df_new = df_new.resample('M').agg({
-            'AirTC_Avg': 'mean',
-            'Rain_mm_Avg': 'sum'
-        })
+        df_new = rollupAusschnitt(d.df_monthly, *fenster)[['AirTC_Avg', 'Rain_mm_Avg']]
     elif agg == 'D':
-        df_new = df_new
+        df_new = d.roh.ausschnitt(*fenster)
+    meldeFortschritt(fortschritt, 1)
     df_new = df_new.reset_index()
+    meldeFortschritt(fortschritt, 2)
 
     fig_new = go.Figure()
 
@@ -854,6 +2991,9 @@ def updateGraph(agg, Day, Month, Year):
             yaxis="y2"
         ))
 
+    # Klimamittel, Normalbereich und Abweichung (über die Legende einblendbar)
+    klimaUeberlagerung(fig_new, d.klima[klima_ebene[agg]], df_new)
+
     # Layout Täglich
     if agg == 'D':
         fig_new.update_layout(
@@ -924,41 +3064,25 @@ def updateGraph(agg, Day, Month, Year):
 
     return kachel1_new
 
-# callback Wind
-@app.callback(
-    Output("Windrose", "figure"),
-    [
-        Input("Auswahl-Dropdown", "value"),
-        Input("Day", "date"),
-        Input("Month", "date"),
-        Input("Year", "value")
-    ]
-)
-
 # Methode für Windrose
 
-def updateRose(time, Day, Month, Year):
-    data = df_hourly.copy()
-    data["TIMESTAMP"]= pd.to_datetime(data['TIMESTAMP'])
+def updateRose(time, Day, Month, Year, fortschritt=None):
+    data = datenstand().df_hourly
 
     max_Wind_v= data["WS_ms_Avg"].max()
     #print("Wind: ")
     #print(max_Wind_v)
 
     # Filter nach Zeitraum
-    if time == 'D' and Day is not None:
-        Day_t = pd.to_datetime(Day)
-        data = data.loc[data['TIMESTAMP'].dt.date == Day_t.date()]
-    elif time == 'M' and Month is not None:
-        Month_t = pd.to_datetime(Month)
-        data = data.loc[(data['TIMESTAMP'].dt.year == Month_t.year) &
-                        (data['TIMESTAMP'].dt.month == Month_t.month)]
-    elif time == 'Y' and Month is not None:
-        year = pd.to_datetime(Year)
-        data = data.loc[data['TIMESTAMP'].dt.year == year.year]
+    fenster = zeitfenster(time, Day, Month, Year)
+    if fenster is not None:
+        data = ausschnitt(data, *fenster)
+    data = data.copy()
+    meldeFortschritt(fortschritt, 1)
 
     if data.empty:
         # Wenn keine Daten vorhanden, leere Windrose zurückgeben
+        import plotly.express as px
         return px.bar_polar(
             r=[0],
             theta=[0],
@@ -978,217 +3102,1252 @@ def updateRose(time, Day, Month, Year):
     data["Wind_v_bins"] = pd.cut(data["WS_ms_Avg"], bins=v_bins, labels=v_labels, right=False, include_lowest=True)
     speed=(data.groupby(["WindDir_bins", "Wind_v_bins"]).size().reset_index(name="count"))
 
-    # Richtige Ausrichtung der Windrose
-    counts["dir"] = pd.Categorical(counts["dir"], categories=labels, ordered=True)
-    counts = counts.sort_values("dir")
+    # Richtige Ausrichtung der Windrose
+    counts["dir"] = pd.Categorical(counts["dir"], categories=labels, ordered=True)
+    counts = counts.sort_values("dir")
+    meldeFortschritt(fortschritt, 2)
+
+    fig_wind = go.Figure()
+
+    wind_colors= ["#ccecff", "#66b2ff", "#1f78b4", "#08306b"]
+
+    for label, color in zip(v_labels, wind_colors):
+        sub = speed[speed["Wind_v_bins"] == label]
+
+        fig_wind.add_trace(go.Barpolar(
+            r=sub["count"],
+            theta=sub["WindDir_bins"],
+            name=label,
+            marker=dict(color=color),
+            opacity=0.9
+        ))
+    
+    fig_wind.update_layout(
+        template="plotly_white",
+        legend=dict(font=dict(size=8),orientation="h", y=-0.15, x=0.5, xanchor="center"),
+        margin=dict(l=0,r=0,t=0,b=30),
+        polar=dict(
+            angularaxis=dict(direction="clockwise", tickmode="array", tickvals=["N", "NO", "O", "SO", "S", "SW", "W", "NW"], ticks="", ticktext=["N", "NO", "O", "SO", "S", "SW", "W", "NW"] ,tickfont=dict(size=10)),
+            radialaxis=dict(showticklabels=False, ticks="")
+        )
+    )
+
+    return fig_wind
+
+# Methode für Solare Einstrahlung
+
+def updateSolarMap(time, Day, Month, Year, fortschritt=None):
+    import plotly.express as px
+
+    d = datenstand()
+    data = d.df_hourly
+
+    # Minimal und Maximalwert berechnen
+    min = data["SlrkW_Avg"].dropna().min()
+    max = data["SlrkW_Avg"].dropna().max()
+    
+    fenster = zeitfenster(time, Day, Month, Year)
+    if fenster is not None:
+        data = ausschnitt(data, *fenster)
+    data = data.copy()
+    meldeFortschritt(fortschritt, 1)
+
+    if data.empty or data["SlrkW_Avg"].dropna().empty:
+        return px.imshow(
+            [[np.nan]],
+            labels=dict(x="Zeit", y="Stunde", color="Solare Einstrahlung in kW/m^2"),
+            aspect="auto",
+            color_continuous_scale="YlOrRd",
+            template="plotly_white"
+        )
+
+    data["hour"]= data["TIMESTAMP"].dt.hour
+    data["day"]= data["TIMESTAMP"].dt.day
+    data["month"]= data["TIMESTAMP"].dt.month
+    # Abweichung jeder Stunde vom Klimamittel derselben Stunde am selben Tag im Jahr
+    data["abweichung"] = data["SlrkW_Avg"] - d.klima["h"].nachschlagen("SlrkW_Avg", data["TIMESTAMP"])["mittel"]
+
+    # Zeitebene für y-Achse bauen
+    if time == 'Y':
+        pivo_elem = data.pivot_table(values="SlrkW_Avg", index="hour", columns="month", aggfunc="mean")
+        pivo_abweichung = data.pivot_table(values="abweichung", index="hour", columns="month", aggfunc="mean", dropna=False)
+        x_label = "Monat"
+    else:
+        pivo_elem=data.pivot_table(values="SlrkW_Avg", index="hour", columns="day", aggfunc="mean")
+        pivo_abweichung = data.pivot_table(values="abweichung", index="hour", columns="day", aggfunc="mean", dropna=False)
+        x_label="Tag"
+    if time == 'D':
+        full_hours = pd.Index(range(24), name="hour")
+        pivo_elem = pivo_elem.reindex(full_hours)
+    pivo_abweichung = pivo_abweichung.reindex(index=pivo_elem.index, columns=pivo_elem.columns)
+    meldeFortschritt(fortschritt, 2)
+
+
+    colorscale = [
+        [0.0, "white"],
+        [0.05, "#fff8cc"],
+        [0.1, "#ffec99"],
+        [0.2, "#ffe066"],
+        [0.3, "#ffd43b"],
+        [0.4, "#ffb347"],
+        [0.5, "#ffa94d"],
+        [0.6, "#ff922b"],
+        [0.7, "#ff6b08"],
+        [0.8, "#fa4d0f"],
+        [0.9, "#e03131"]
+         
+    ]
+
+    fig_new = px.imshow(
+        pivo_elem,
+        labels=dict(x=x_label, y="Stunde", color="kW/m²"),
+        color_continuous_scale="YlOrRd",
+        zmin = min,
+        zmax = max,
+        template="plotly_white",
+        aspect="auto"
+    )
+    #fig_new.update_traces(nancolor="lightgrey")
+
+    fig_new.update_layout(
+        #title="Solare Einstrahlung",
+        #legend=dict(font=dict(size=8),orientation="h", y=-0.15, x=0.5, xanchor="center"),
+        xaxis=dict(showticklabels=True, tickfont=dict(size=10), ticks="outside", automargin=True),
+        yaxis=dict(title=dict(text="Stunden des Tages", font=dict(size=12)), tickfont=dict(size=11)),
+        margin=dict(l=0, r=15, t=10, b=0),
+        coloraxis_showscale=True,
+        #autosize=True
+    )
+    fig_new.update_xaxes(
+        tickmode="array",
+        tickvals=list(range(len(pivo_elem.columns))),
+        ticktext=[str(c) for c in pivo_elem.columns]
+    )
+
+    # Abweichung vom Klimamittel als zweite Heatmap, im Browser per Schalter umschaltbar
+    grenze = np.nanmax(np.abs(pivo_abweichung.to_numpy())) if pivo_abweichung.notna().any().any() else 0
+    fig_new.add_trace(go.Heatmap(
+        x=pivo_abweichung.columns, y=pivo_abweichung.index, z=pivo_abweichung.to_numpy(),
+        coloraxis="coloraxis2",
+        hovertemplate=x_label + ": %{x}<br>Stunde: %{y}<br>Abweichung: %{z:.3f} kW/m²<extra></extra>",
+        visible=False
+    ))
+    fig_new.update_layout(
+        coloraxis2=dict(colorscale="RdBu_r", cmin=-grenze, cmax=grenze, showscale=False,
+                        colorbar=dict(title="kW/m²")),
+        margin=dict(t=30),
+        updatemenus=[dict(
+            type="buttons", direction="right", showactive=True,
+            x=0, y=1.02, xanchor="left", yanchor="bottom", pad=dict(t=0, r=0),
+            font=dict(size=10),
+            buttons=[
+                dict(label="Messwerte", method="update",
+                     args=[{"visible": [True, False]}, {"coloraxis.showscale": True, "coloraxis2.showscale": False}]),
+                dict(label="Abweichung vom Klimamittel", method="update",
+                     args=[{"visible": [False, True]}, {"coloraxis.showscale": False, "coloraxis2.showscale": True}])
+            ]
+        )]
+    )
+
+    return fig_new
+
+# Methode für Relative Luftfeuchtigkeit
+
+def displayHumidity(time, Day, Month, Year, fortschritt=None):
+    data = datenstand().df_hourly
+    
+    fenster = zeitfenster(time, Day, Month, Year)
+    if fenster is not None:
+        data = ausschnitt(data, *fenster)
+    data = data.copy()
+    meldeFortschritt(fortschritt, 1)
+
+    if data.empty:
+        return keineDaten()
+    
+    min_RH= data["RH_Avg"].min()
+    max_RH= data["RH_Avg"].max()
+    meldeFortschritt(fortschritt, 2)
+
+    fig_RH = go.Figure()
+    fig_RH.add_bar(
+        x=["Min", "Max"],
+        y=[100, 100],
+        marker_color="rgba(200,200,200,0.3)",
+        marker_line_color="black",
+        marker_line_width=1.5,
+        width=0.5,
+        hoverinfo="skip",
+    )
+    
+    fig_RH.add_bar(
+        x=["Min", "Max"],
+        y=[min_RH, max_RH],
+        marker= dict(
+            color=["rgba(30,144,255,0.8)", "rgba(30,144,255,0.8)"],
+            line=dict(color="black", width=2)
+        ),
+        width=0.5,
+        hovertemplate="%{x}: %{y:.1f}%<extra></extra>"
+    )
+
+    # layout
+    fig_RH.update_layout(
+        #title="",
+        yaxis=dict(range=[0,100], title=dict(text="Relative<br>Luftfeuchtigkeit [%]", font=dict(size=12)), tickfont=dict(size=11)),
+        xaxis=dict(title=""),
+        barmode="overlay",
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        bargap=0.3,
+        margin=dict(r=0, l=0, t=20, b=20),
+        showlegend=False
+    )
+
+    return fig_RH
+
+# Callbacks für die Diagramm-Kacheln
+# Tagesansichten werden direkt im Request berechnet. Monats- und Jahresansichten laufen
+# (sofern ein Hintergrund-Manager verfügbar ist) als Auftrag in einem eigenen Prozess,
+# so dass langsame Jahresabfragen keine Worker für schnelle Tagesabfragen blockieren.
+# Wählt der Nutzer einen neuen Zeitraum, beendet Dash den noch laufenden Auftrag (oldJob).
+# Abgewählte Kacheln (checklist_variables) werden nicht berechnet, sondern erst beim
+# erneuten Einblenden. Welcher Zeitraum gerade angezeigt wird, steht in "gerendert_<kürzel>".
+#
+# Sitzungs-Cache: Jede Figur, die eine Kachel anzeigt, legt der Browser in "sitzung_<kürzel>"
+# (sessionStorage) ab, Schlüssel ist der Zeitraum, gültig nur für einen Datenstand. Wechselt der
+# Nutzer zurück auf einen schon gesehenen Zeitraum, zeichnet ein clientseitiger Callback die Figur
+# ohne Anfrage an den Server. Sonst (oder bei neuem Datenstand) schreibt er den Zeitraum in
+# "anfrage_<kürzel>" und der Server-Callback rechnet wie bisher.
+sitzung_max_perioden = 50
+sitzung_max_zeichen = 500000
+
+sitzung_kachel_js = """
+function(time, Day, Month, Year, selected, version, sitzung, gerendert, auftrag) {
+    const nichts = window.dash_clientside.no_update;
+    const antwort = (figur, schluessel, anfrage, auftragNeu) => HINTERGRUND
+        ? [figur, schluessel, anfrage, auftragNeu]
+        : [figur, schluessel, anfrage];
+    if (!(selected || []).includes(KACHEL)) {
+        return antwort(nichts, nichts, nichts, nichts);
+    }
+    let zeitraum;
+    if (time === 'D') {
+        zeitraum = 'D|' + String(Day).slice(0, 10);
+    } else if (time === 'M') {
+        zeitraum = 'M|' + String(Month).slice(0, 7);
+    } else {
+        zeitraum = 'Y|' + String(Year);
+    }
+    const schluessel = version + '|' + zeitraum;
+    if (schluessel === gerendert) {
+        return antwort(nichts, nichts, nichts, nichts);
+    }
+
+    const eintrag = sitzung && sitzung.version === version ? sitzung.figuren[zeitraum] : undefined;
+    if (eintrag !== undefined) {
+        const figur = JSON.parse(eintrag);
+        if (typeof figur.layout.template === 'string') {
+            figur.layout.template = JSON.parse(sitzung.vorlagen[figur.layout.template]);
+        }
+        // laufenden Hintergrund-Auftrag abbrechen, sonst überschreibt er die Figur
+        return antwort(figur, schluessel, nichts, auftrag ? null : nichts);
+    }
+    // nur den relevanten Zeitraum übergeben, damit gleiche Anfragen denselben Cache-Schlüssel haben
+    return antwort(nichts, nichts, {
+        time: time,
+        Day: time === 'D' ? Day : null,
+        Month: time === 'M' ? Month : null,
+        Year: time === 'Y' ? Year : null,
+        version: version
+    }, nichts);
+}
+"""
+
+sitzung_speichern_js = """
+function(figur, gerendert, sitzung) {
+    const nichts = window.dash_clientside.no_update;
+    if (!figur || !figur.layout || !gerendert) {
+        return nichts;
+    }
+    const trenner = gerendert.indexOf('|');
+    const version = gerendert.slice(0, trenner);
+    const zeitraum = gerendert.slice(trenner + 1);
+    if (sitzung && sitzung.version === version && sitzung.figuren[zeitraum] !== undefined) {
+        return nichts;
+    }
+    const neu = sitzung && sitzung.version === version
+        ? {version: version, figuren: Object.assign({}, sitzung.figuren), reihenfolge: sitzung.reihenfolge.slice(),
+           vorlagen: Object.assign({}, sitzung.vorlagen), zeichen: sitzung.zeichen}
+        : {version: version, figuren: {}, reihenfolge: [], vorlagen: {}, zeichen: 0};
+
+    let text;
+    try {
+        // Vorlage (meist der größte Teil der Figur) nur einmal je Kachel speichern
+        const kopie = Object.assign({}, figur, {layout: Object.assign({}, figur.layout)});
+        if (kopie.layout.template && typeof kopie.layout.template === 'object') {
+            const vorlage = JSON.stringify(kopie.layout.template);
+            let pruefsumme = 0;
+            for (let i = 0; i < vorlage.length; i++) {
+                pruefsumme = (pruefsumme * 31 + vorlage.charCodeAt(i)) | 0;
+            }
+            const kennung = 'v' + (pruefsumme >>> 0).toString(36) + '-' + vorlage.length;
+            if (neu.vorlagen[kennung] === undefined) {
+                neu.vorlagen[kennung] = vorlage;
+                neu.zeichen += vorlage.length;
+            }
+            kopie.layout.template = kennung;
+        }
+        text = JSON.stringify(kopie);
+    } catch (fehler) {
+        return nichts;
+    }
+    if (text.length > MAX_ZEICHEN) {
+        return nichts;
+    }
+    neu.figuren[zeitraum] = text;
+    neu.reihenfolge.push(zeitraum);
+    neu.zeichen += text.length;
+    // älteste Zeiträume verwerfen
+    while (neu.reihenfolge.length > MAX_PERIODEN || neu.zeichen > MAX_ZEICHEN) {
+        const alt = neu.reihenfolge.shift();
+        neu.zeichen -= neu.figuren[alt].length;
+        delete neu.figuren[alt];
+    }
+    return neu;
+}
+"""
+
+def registriereKachel(app, graph_id, kuerzel, kachel, methode, hintergrund=False):
+    outputs = [
+        Output(graph_id, "figure", allow_duplicate=True),
+        Output("gerendert_" + kuerzel, "data", allow_duplicate=True)
+    ]
+    states = [State("gerendert_" + kuerzel, "data")]
+    if hintergrund:
+        outputs.append(Output("auftrag_" + kuerzel, "data", allow_duplicate=True))
+        states.append(State("auftrag_" + kuerzel, "data"))
+
+    app.clientside_callback(
+        sitzung_kachel_js
+            .replace("KACHEL", json.dumps(kachel))
+            .replace("HINTERGRUND", json.dumps(hintergrund)),
+        *outputs[:2],
+        Output("anfrage_" + kuerzel, "data"),
+        *outputs[2:],
+        *zeitraum_inputs,
+        Input("checklist_variables", "value"),
+        State("abdeckung_version", "data"),
+        State("sitzung_" + kuerzel, "data"),
+        *states,
+        prevent_initial_call="initial_duplicate"
+    )
+    app.clientside_callback(
+        sitzung_speichern_js
+            .replace("MAX_PERIODEN", str(sitzung_max_perioden))
+            .replace("MAX_ZEICHEN", str(sitzung_max_zeichen)),
+        Output("sitzung_" + kuerzel, "data"),
+        Input(graph_id, "figure"),
+        State("gerendert_" + kuerzel, "data"),
+        State("sitzung_" + kuerzel, "data"),
+        prevent_initial_call=True
+    )
+
+    @app.callback(
+        *outputs,
+        Input("anfrage_" + kuerzel, "data"),
+        *states,
+        prevent_initial_call=True
+    )
+    @gemessen(methode.__name__)
+    def kachelDirekt(anfrage, gerendert, auftrag=None):
+        # Zeitraum bereits angezeigt -> nichts berechnen
+        if anfrage is None:
+            return [no_update] * len(outputs)
+        time, Day, Month, Year = anfrage["time"], anfrage["Day"], anfrage["Month"], anfrage["Year"]
+        d = datenstand()
+        schluessel = d.version + "|" + zeitraumSchluessel(time, Day, Month, Year)
+        if schluessel == gerendert:
+            return [no_update] * len(outputs)
+
+        # Zeitraum ohne Messwerte: ohne Filtern und ohne Hintergrund-Auftrag antworten
+        fenster = zeitfenster(time, Day, Month, Year)
+        if fenster is not None and d.abdeckung.anzahl(*fenster) == 0:
+            leer = [keineDaten(), schluessel]
+            if hintergrund:
+                leer.append(None if auftrag is not None else no_update)
+            return leer
+
+        if not hintergrund:
+            return berechneFigur(methode, time, Day, Month, Year), schluessel
+        if time == 'D':
+            # laufenden Hintergrund-Auftrag nur abbrechen, wenn es einen gibt
+            return berechneFigur(methode, time, Day, Month, Year), schluessel, (None if auftrag is not None else no_update)
+        return no_update, schluessel, {
+            "figur": graph_id,
+            "time": time,
+            "Day": None,
+            "Month": Month if time == 'M' else None,
+            "Year": Year if time == 'Y' else None
+        }
+
+    if not hintergrund:
+        return
+
+    @app.callback(
+        Output(graph_id, "figure", allow_duplicate=True),
+        Input("auftrag_" + kuerzel, "data"),
+        background=True,
+        interval=500,
+        progress=[Output("fortschritt_" + kuerzel, "value"), Output("fortschritt_" + kuerzel, "max")],
+        running=[(Output("fortschritt_" + kuerzel, "style"), fortschritt_sichtbar, fortschritt_versteckt)],
+        prevent_initial_call=True
+    )
+    @gemessen(methode.__name__ + "_hintergrund")
+    def kachelHintergrund(set_progress, auftrag):
+        if auftrag is None:
+            return no_update
+        return berechneFigur(methode, auftrag["time"], auftrag["Day"], auftrag["Month"], auftrag["Year"], fortschritt=set_progress)
+
+# Statischer Modus: Diagramme werden nicht berechnet, sondern als vorgerenderte JSON-Dateien
+# (siehe exportiereStatisch) direkt im Browser geladen, z.B. von einem CDN oder lokalen Dateiserver.
+# Aktiv, wenn konfiguration["statischer_export_url"] oder ["statischer_export_dir"] gesetzt ist.
+
+statische_kachel_js = """
+function(time, Day, Month, Year, selected, gerendert) {
+    const nichts = [window.dash_clientside.no_update, window.dash_clientside.no_update];
+    if (!(selected || []).includes(KACHEL)) {
+        return nichts;
+    }
+    let schluessel;
+    if (time === 'D') {
+        schluessel = 'D|' + String(Day).slice(0, 10);
+    } else if (time === 'M') {
+        schluessel = 'M|' + String(Month).slice(0, 7);
+    } else {
+        schluessel = 'Y|' + String(Year);
+    }
+    if (schluessel === gerendert) {
+        return nichts;
+    }
+
+    const basis = BASIS_URL;
+    const cache = window.statischerExport = window.statischerExport || {vorlagen: {}};
+    if (!cache.manifest) {
+        cache.manifest = fetch(basis + '/manifest.json').then(r => r.json());
+    }
+    return cache.manifest.then(manifest => {
+        const eintrag = manifest.perioden[schluessel];
+        if (!eintrag || !eintrag[GRAPH_ID]) {
+            return [{
+                data: [],
+                layout: {
+                    annotations: [{text: 'Keine Daten verfügbar', showarrow: false, xref: 'paper', yref: 'paper', x: 0.5, y: 0.5}],
+                    xaxis: {visible: false},
+                    yaxis: {visible: false}
+                }
+            }, schluessel];
+        }
+        return fetch(basis + '/' + eintrag[GRAPH_ID]).then(r => r.json()).then(figur => {
+            const vorlage = figur.vorlage;
+            delete figur.vorlage;
+            if (!cache.vorlagen[vorlage]) {
+                cache.vorlagen[vorlage] = fetch(basis + '/vorlagen/' + vorlage + '.json').then(r => r.json());
+            }
+            return cache.vorlagen[vorlage].then(t => {
+                figur.layout.template = t;
+                return [figur, schluessel];
+            });
+        });
+    });
+}
+"""
+
+def registriereStatischeKachel(app, basis_url, graph_id, kuerzel, kachel):
+    app.clientside_callback(
+        statische_kachel_js
+            .replace("KACHEL", json.dumps(kachel))
+            .replace("GRAPH_ID", json.dumps(graph_id))
+            .replace("BASIS_URL", json.dumps(basis_url.rstrip("/"))),
+        Output(graph_id, "figure"),
+        Output("gerendert_" + kuerzel, "data"),
+        *zeitraum_inputs,
+        Input("checklist_variables", "value"),
+        State("gerendert_" + kuerzel, "data")
+    )
+
+# Diagramm-Kacheln: (Graph-ID, Kürzel, Checklisten-Wert, Methode, Hintergrund)
+diagramm_kacheln = [
+    ("temperature-graph", "TN", "temp_ns", updateGraph, True),
+    ("Windrose", "W", "wind", updateRose, True),
+    ("HM-solar", "SE", "SR", updateSolarMap, True),
+    ("R_Humidity", "RH", "RH", displayHumidity, False),
+]
+
+def statischeDatei(pfad):
+    return send_from_directory(os.path.abspath(konfiguration["statischer_export_dir"]), pfad, max_age=3600)
+
+# Rohdaten-Tabelle
+# Blättern, Sortieren und Filtern laufen auf dem Server gegen den sortierten Zeitindex.
+# Zum Browser wird immer nur die sichtbare Seite geschickt. Das Zeitfenster wird per
+# Binärsuche bestimmt, Filter werden vektorisiert ausgewertet und die Sortier-Reihenfolge
+# wird zwischengespeichert, damit das Blättern in sortierten Daten nicht jedes Mal neu sortiert.
+filter_operatoren = [
+    ["ge ", ">="],
+    ["le ", "<="],
+    ["lt ", "<"],
+    ["gt ", ">"],
+    ["ne ", "!="],
+    ["eq ", "="],
+    ["contains "],
+    ["datestartswith "]
+]
+
+# Einen Teil der filter_query ("{AirTC_Avg} > 20") in Spalte, Operator und Wert zerlegen
+def zerlegeFilter(filter_teil):
+    for operator_typ in filter_operatoren:
+        for operator in operator_typ:
+            if operator not in filter_teil:
+                continue
+            name_teil, wert_teil = filter_teil.split(operator, 1)
+            name = name_teil[name_teil.find("{") + 1: name_teil.rfind("}")]
+            wert_teil = wert_teil.strip()
+            if wert_teil and wert_teil[0] == wert_teil[-1] and wert_teil[0] in ("'", '"', "`"):
+                wert = wert_teil[1:-1].replace("\\" + wert_teil[0], wert_teil[0])
+            else:
+                try:
+                    wert = float(wert_teil)
+                except ValueError:
+                    wert = wert_teil
+            return name, operator_typ[0].strip(), wert
+    return None, None, None
+
+# "2024-03" -> [2024-03-01, 2024-04-01)
+def praefixZeitfenster(praefix):
+    praefix = str(praefix).strip()
+    start = pd.Timestamp(praefix)
+    schritte = {4: pd.DateOffset(years=1), 7: pd.DateOffset(months=1), 10: pd.DateOffset(days=1), 13: pd.DateOffset(hours=1), 16: pd.DateOffset(minutes=1)}
+    return start, start + schritte.get(len(praefix), pd.DateOffset(seconds=1))
+
+# Maske für einen Filterteil, None wenn der Wert nicht zum Typ der Spalte passt
+# ("{AirTC_Avg} > abc", "{TIMESTAMP} > xyz"): solche Teile werden wie in der Tabelle ignoriert
+def filterMaske(teil, name, operator, wert):
+    if name == "TIMESTAMP":
+        zeiten = teil.index
+        try:
+            if operator == "datestartswith" or operator == "contains":
+                start, ende = praefixZeitfenster(wert)
+            else:
+                start = ende = wert = pd.Timestamp(str(wert))
+        except (TypeError, ValueError, OverflowError):
+            return None
+        if start is pd.NaT or ende is pd.NaT:
+            return None
+        if operator == "datestartswith" or operator == "contains":
+            return (zeiten >= start) & (zeiten < ende)
+        spalte = zeiten
+    else:
+        spalte = teil[name].to_numpy()
+        if operator == "contains" or operator == "datestartswith":
+            return teil[name].astype(str).str.contains(str(wert), regex=False).to_numpy()
+        if pd.api.types.is_numeric_dtype(spalte.dtype):
+            try:
+                wert = float(wert)
+            except (TypeError, ValueError):
+                return None
+    if operator == "eq":
+        return spalte == wert
+    elif operator == "ne":
+        return spalte != wert
+    elif operator == "lt":
+        return spalte < wert
+    elif operator == "le":
+        return spalte <= wert
+    elif operator == "gt":
+        return spalte > wert
+    return spalte >= wert
+
+@lru_cache(maxsize=16)
+def tabellenReihenfolge(version, start, ende, sortierung, filter_query):
+    teil = datenstand().roh.ausschnitt(start, ende)
+    positionen = np.arange(len(teil))
+
+    if filter_query:
+        maske = np.ones(len(teil), dtype=bool)
+        for filter_teil in filter_query.split(" && "):
+            name, operator, wert = zerlegeFilter(filter_teil)
+            if name == "TIMESTAMP" or name in teil.columns:
+                teil_maske = filterMaske(teil, name, operator, wert)
+                if teil_maske is not None:
+                    maske &= np.asarray(teil_maske, dtype=bool)
+        positionen = positionen[maske]
+
+    if sortierung:
+        # np.lexsort sortiert nach dem letzten Schlüssel zuerst
+        schluessel = []
+        for spalte, richtung in reversed(sortierung):
+            werte = teil.index.to_numpy() if spalte == "TIMESTAMP" else teil[spalte].to_numpy()
+            werte = werte[positionen]
+            if richtung == "desc":
+                werte = -werte.astype("int64") if spalte == "TIMESTAMP" else -werte
+            schluessel.append(werte)
+        positionen = positionen[np.lexsort(schluessel)]
+    return positionen
+
+@appCallback(
+    Output("rohdaten_tabelle", "data"),
+    Output("rohdaten_tabelle", "page_count"),
+    *zeitraum_inputs,
+    Input("rohdaten_tabelle", "page_current"),
+    Input("rohdaten_tabelle", "page_size"),
+    Input("rohdaten_tabelle", "sort_by"),
+    Input("rohdaten_tabelle", "filter_query"),
+    Input("checklist_variables", "value")
+)
+
+# Methode für Rohdaten-Tabelle
+
+def updateTabelle(time, Day, Month, Year, page_current, page_size, sort_by, filter_query, selected):
+    fenster = zeitfenster(time, Day, Month, Year)
+    if "table" not in (selected or []) or fenster is None:
+        return no_update, no_update
+
+    d = datenstand()
+    sortierung = tuple((s["column_id"], s["direction"]) for s in (sort_by or []))
+    page_current = page_current or 0
+    page_size = page_size or tabelle_seitengroesse
+
+    if not sortierung and not filter_query:
+        # ohne Sortierung und Filter reicht ein Slice des Zeitfensters
+        links, rechts = d.roh.grenzen(*fenster)
+        anzahl = rechts - links
+        seite = d.roh.zeilen(links + page_current * page_size, min(links + (page_current + 1) * page_size, rechts))
+    else:
+        positionen = tabellenReihenfolge(d.version, fenster[0], fenster[1], sortierung, filter_query)
+        anzahl = len(positionen)
+        links = d.roh.grenzen(*fenster)[0]
+        seite = d.roh.auswahl(links + positionen[page_current * page_size:(page_current + 1) * page_size])
+
+    seite = seite.reset_index()
+    seite["TIMESTAMP"] = seite["TIMESTAMP"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return seite.to_dict("records"), max(1, -(-anzahl // page_size))
+
+# Abgeleitete Größe für Zeitfenster und Auflösung, je Datenstand zwischengespeichert
+# (die ältesten Einträge werden verworfen)
+@lru_cache(maxsize=64)
+def abgeleiteteReihe(version, name, aufloesung, start, ende):
+    d = datenstand()
+    if aufloesung == "roh":
+        data = d.roh.ausschnitt(start, ende)
+    else:
+        data = rollupAusschnitt(apiRollup(aufloesung), start, ende)
+        if "TIMESTAMP" in data.columns:
+            data = data.set_index("TIMESTAMP")
+    return pd.Series(berechneAbgeleitet(name, data), index=data.index, name=name)
+
+# Auflösung der Kachel je Zeitraum (mindestens die der Größe)
+abgeleitet_aufloesung = {"D": "roh", "M": "stunde", "Y": "tag"}
+
+# Callback Kachel abgeleitete Größen ein-/ausblenden
+@appCallback(
+    Output("kachel_abgeleitet", "style"),
+    Input("checklist_variables", "value"),
+    State("kachel_abgeleitet", "style")
+)
+
+# Methode für Kachel ein-/ausblenden
+
+def updateAbgeleitetSichtbar(selected, style):
+    style = dict(style or {})
+    style["display"] = "flex" if "abgeleitet" in (selected or []) else "none"
+    return style
+
+# Callback abgeleitete Größen
+@appCallback(
+    Output("abgeleitet_graph", "figure"),
+    *zeitraum_inputs,
+    Input("abgeleitet_variable", "value"),
+    Input("checklist_variables", "value")
+)
+
+# Methode für abgeleitete Größen
+
+def updateAbgeleitet(time, Day, Month, Year, name, selected):
+    fenster = zeitfenster(time, Day, Month, Year)
+    if "abgeleitet" not in (selected or []) or fenster is None or name not in abgeleitete_variablen:
+        return no_update
+    d = datenstand()
+    if d.abdeckung.anzahl(*fenster) == 0:
+        return keineDaten()
+
+    variable = abgeleitete_variablen[name]
+    aufloesung = abgeleitet_aufloesung[time]
+    if not abgeleitetVerfuegbar(name, aufloesung):
+        aufloesung = variable["mindestens"]
+    reihe = abgeleiteteReihe(d.version, name, aufloesung, fenster[0], fenster[1])
+
+    fig = go.Figure()
+    if variable.get("art") == "balken":
+        fig.add_bar(x=reihe.index, y=reihe.to_numpy(), name=variable["name"], marker_color="#FB8C00")
+    else:
+        fig.add_scatter(x=reihe.index, y=reihe.to_numpy(), mode="lines", name=variable["name"], line=dict(color="#FB8C00", width=2))
+    fig.update_layout(
+        xaxis_title="Datum / Uhrzeit",
+        yaxis=dict(title=f"{variable['name']} ({variable['einheit']})"),
+        margin=dict(l=0, r=0, t=20, b=0),
+        template="plotly_white"
+    )
+    return fig
+
+# Vergleichsmodus
+# Mehrere Jahre oder Monate werden auf einer gemeinsamen Achse (Tag im Jahr, Monat bzw. Tag im Monat)
+# übereinandergelegt. Alle Perioden kommen in einem Zugriff aus dem Tages- bzw. Monats-Rollup:
+# Zeilenpositionen per Binärsuche, dann eine Matrix Perioden x Achsenpunkte.
+vergleich_modi = {
+    # Modus: Rollup, Periodenlänge, Anzahl Achsenpunkte
+    "jahr_tag": ("D", "YS", 366),
+    "jahr_monat": ("M", "YS", 12),
+    "monat_tag": ("D", "MS", 31)
+}
+vergleich_farben = ["#FB8C00", "#1E88E5", "#43A047", "#E53935", "#8E24AA", "#00ACC1", "#6D4C41", "#FDD835", "#546E7A", "#D81B60"]
+
+def vergleichsMatrix(d, modus, perioden, spalten):
+    freq, laenge, punkte = vergleich_modi[modus]
+    rollup = d.df_daily if freq == "D" else d.df_monthly
+    starts = pd.DatetimeIndex(perioden)
+    # Monats-Rollup ist mit dem Monatsende beschriftet
+    links = rollup.index.searchsorted(starts)
+    rechts = rollup.index.searchsorted(starts + pd.tseries.frequencies.to_offset(laenge))
+    anzahl = rechts - links
+
+    # Positionen aller Zeilen aller Perioden ohne Schleife
+    position = np.arange(anzahl.sum()) + np.repeat(links - np.concatenate([[0], np.cumsum(anzahl)[:-1]]), anzahl)
+    periode = np.repeat(np.arange(len(starts)), anzahl)
+    zeiten = rollup.index[position]
+    if modus == "jahr_tag":
+        punkt = tagImJahr(zeiten)
+    elif modus == "jahr_monat":
+        punkt = zeiten.month.to_numpy() - 1
+    else:
+        punkt = zeiten.day.to_numpy() - 1
+
+    # Tage bzw. Monate ohne Messwerte bleiben leer (Regensumme wäre sonst 0)
+    mit_daten = rollup["RECORD"].to_numpy()[position] > 0
+    matrizen = {}
+    for spalte in spalten:
+        matrix = np.full((len(starts), punkte), np.nan)
+        matrix[periode[mit_daten], punkt[mit_daten]] = rollup[spalte].to_numpy(dtype=float)[position[mit_daten]]
+        matrizen[spalte] = matrix
+    return matrizen
+
+def vergleichsOptionen(d, modus):
+    if modus == "monat_tag":
+        monate = pd.period_range(d.roh.von, d.roh.bis, freq="M")
+        return [{"label": m.strftime("%m/%Y"), "value": str(m.start_time.date())} for m in monate[::-1]]
+    return [{"label": str(jahr), "value": f"{jahr}-01-01"} for jahr in range(d.roh.bis.year, d.roh.von.year - 1, -1)]
+
+# Callback Kachel Vergleich ein-/ausblenden
+@appCallback(
+    Output("kachel_vergleich", "style"),
+    Input("checklist_variables", "value"),
+    State("kachel_vergleich", "style")
+)
+
+# Methode für Kachel ein-/ausblenden
+
+def updateVergleichSichtbar(selected, style):
+    style = dict(style or {})
+    style["display"] = "flex" if "vergleich" in (selected or []) else "none"
+    return style
+
+# Callback Auswahl im Vergleich (bei Moduswechsel und neuen Daten)
+@appCallback(
+    Output("vergleich_auswahl", "options"),
+    Output("vergleich_auswahl", "value"),
+    Input("vergleich_modus", "value"),
+    Input("abdeckung_version", "data"),
+    State("vergleich_auswahl", "value")
+)
+
+# Methode für Auswahl im Vergleich
+
+def updateVergleichOptionen(modus, version, auswahl):
+    optionen = vergleichsOptionen(datenstand(), modus)
+    werte = [option["value"] for option in optionen]
+    auswahl = [wert for wert in (auswahl or []) if wert in werte]
+    # beim Moduswechsel die letzten beiden Perioden vorauswählen
+    if not auswahl:
+        auswahl = werte[:2]
+    return optionen, auswahl
+
+# Callback Vergleich
+@appCallback(
+    Output("vergleich_graph", "figure"),
+    Input("vergleich_modus", "value"),
+    Input("vergleich_auswahl", "value"),
+    Input("checklist_variables", "value")
+)
+
+# Methode für Vergleich
+
+def updateVergleich(modus, auswahl, selected):
+    if "vergleich" not in (selected or []) or modus not in vergleich_modi:
+        return no_update
+    if not auswahl:
+        return keineDaten()
+    try:
+        perioden = sorted(pd.Timestamp(wert) for wert in auswahl)
+    except ValueError:
+        return keineDaten()
+    d = datenstand()
+    matrizen = vergleichsMatrix(d, modus, perioden, ["AirTC_Avg", "Rain_mm_Avg"])
+
+    # gemeinsame Achse
+    if modus == "jahr_tag":
+        achse = pd.date_range("2000-01-01", periods=366)
+        achse_titel, tickformat = "Tag im Jahr", "%d.%m."
+    elif modus == "jahr_monat":
+        achse = ["Jan", "Feb", "Mär", "Apr", "Mai", "Jun", "Jul", "Aug", "Sep", "Okt", "Nov", "Dez"]
+        achse_titel, tickformat = "Monat", None
+    else:
+        achse = np.arange(1, 32)
+        achse_titel, tickformat = "Tag im Monat", None
+
+    # Niederschlag aufsummiert, damit sich die Perioden vergleichen lassen
+    regen = matrizen["Rain_mm_Avg"]
+    regen_summe = np.nancumsum(regen, axis=1)
+    regen_summe[np.isnan(regen)] = np.nan
+
+    fig = go.Figure()
+    for i, periode in enumerate(perioden):
+        name = str(periode.year) if modus != "monat_tag" else f"{periode:%m/%Y}"
+        farbe = vergleich_farben[i % len(vergleich_farben)]
+        fig.add_trace(go.Scatter(
+            x=achse, y=matrizen["AirTC_Avg"][i],
+            name=name, legendgroup=name,
+            line=dict(color=farbe, width=2),
+            connectgaps=False,
+            yaxis="y"
+        ))
+        fig.add_trace(go.Scatter(
+            x=achse, y=regen_summe[i],
+            name=name + " Niederschlag", legendgroup=name, showlegend=False,
+            line=dict(color=farbe, width=1, dash="dot"),
+            connectgaps=True,
+            yaxis="y2"
+        ))
+    fig.update_layout(
+        xaxis=dict(title=achse_titel, tickformat=tickformat),
+        yaxis=dict(title="Temperatur (°C)", side="left"),
+        yaxis2=dict(title="Niederschlag aufsummiert (mm)", overlaying="y", side="right", rangemode="tozero"),
+        legend=dict(x=0.01, y=0.99),
+        margin=dict(l=0, r=0, t=20, b=0),
+        template="plotly_white"
+    )
+    return fig
+
+# Verteilung
+# Tagesansicht je Stunde, Monatsansicht je Tag, Jahresansicht je Monat ein Boxplot (Minimum, Quartile,
+# Median, Maximum) direkt aus den Skizzen der Periode, dazu die Perzentile des ganzen Zeitraums.
+verteilung_ebene = {"D": "h", "M": "D", "Y": "M"}
+
+# Callback Kachel Verteilung ein-/ausblenden
+@appCallback(
+    Output("kachel_verteilung", "style"),
+    Input("checklist_variables", "value"),
+    State("kachel_verteilung", "style")
+)
+
+# Methode für Kachel ein-/ausblenden
+
+def updateVerteilungSichtbar(selected, style):
+    style = dict(style or {})
+    style["display"] = "flex" if "verteilung" in (selected or []) else "none"
+    return style
+
+# Callback Verteilung
+@appCallback(
+    Output("verteilung_graph", "figure"),
+    *zeitraum_inputs,
+    Input("verteilung_variable", "value"),
+    Input("checklist_variables", "value")
+)
+
+# Methode für Verteilung
+
+def updateVerteilung(time, Day, Month, Year, variable, selected):
+    fenster = zeitfenster(time, Day, Month, Year)
+    if "verteilung" not in (selected or []) or fenster is None or variable not in skizzen_variablen:
+        return no_update
+    d = datenstand()
+    if d.abdeckung.anzahl(*fenster) == 0:
+        return keineDaten()
+
+    ebene = d.skizzen[verteilung_ebene[time]]
+    links, rechts = ebene.index.searchsorted(fenster[0]), ebene.index.searchsorted(fenster[1])
+    felder = ebene.ausschnitt(links, rechts)[variable]
+    minimum, q1, median, q3, maximum = skizzenQuantile(felder, [0, 0.25, 0.5, 0.75, 1]).T
+    p5, p50, p95 = skizzenQuantile(fensterSkizzen(d.skizzen, variable, *fenster), [0.05, 0.5, 0.95], gesamt=True)[0]
+    name = next(spalte["name"] for spalte in table_columns if spalte["id"] == variable)
+
+    fig = go.Figure()
+    fig.add_trace(go.Box(
+        x=ebene.index[links:rechts],
+        lowerfence=minimum, q1=q1, median=median, q3=q3, upperfence=maximum,
+        name=name,
+        marker_color="#FB8C00",
+        hovertemplate="%{x}<extra></extra>"
+    ))
+    # Perzentile des ganzen Zeitraums als Band
+    fig.add_hrect(y0=p5, y1=p95, fillcolor="rgba(120,120,120,0.12)", line_width=0)
+    fig.add_hline(y=p50, line=dict(color="#616161", width=1, dash="dash"))
+    fig.update_layout(
+        xaxis_title="Datum / Uhrzeit",
+        yaxis=dict(title=name),
+        title=dict(text=f"Zeitraum: Median {p50:.1f}, 5.-95. Perzentil {p5:.1f} bis {p95:.1f}", font=dict(size=11), x=0.5),
+        showlegend=False,
+        margin=dict(l=0, r=0, t=30, b=0),
+        template="plotly_white"
+    )
+    return fig
+
+# Rasterdarstellung
+# Dichte Rohdatenansichten (z.B. jede Minute eines Jahres) werden serverseitig in ein Pixelraster
+# einsortiert (Anzahl, Mittelwert oder Maximum je Pixel) und als PNG an eine Bild-Spur übergeben.
+# Rechenzeit und Antwortgröße hängen damit von der Diagrammgröße ab, nicht von der Zahl der Datensätze.
+raster_ansichten = {
+    # Ansicht: Name, x-Spalte, y-Spalte, feste Grenzen
+    "temperatur_zeit": {"name": "Temperatur über Zeit", "x": "TIMESTAMP", "y": "AirTC_Avg"},
+    "feuchte_zeit": {"name": "Luftfeuchtigkeit über Zeit", "x": "TIMESTAMP", "y": "RH_Avg"},
+    "wind_richtung": {"name": "Windgeschwindigkeit über Windrichtung", "x": "WindDir", "y": "WS_ms_Avg", "x_grenzen": (0, 360)},
+    "feuchte_temperatur": {"name": "Luftfeuchtigkeit über Temperatur", "x": "AirTC_Avg", "y": "RH_Avg"},
+}
+raster_aggregationen = {"anzahl": "Anzahl", "mittel": "Mittelwert", "maximum": "Maximum"}
+# Spalten, die je Pixel gemittelt oder maximiert werden können
+raster_werte = [spalte["id"] for spalte in table_columns if spalte["id"] not in ("TIMESTAMP", "RECORD")]
+# Pixel ohne Messung des Browsers, Obergrenze je Achse und Ränder des Diagramms (Achsen, Farbskala)
+raster_standardgroesse = (800, 400)
+raster_max_pixel = 2000
+raster_rand = dict(l=50, r=80, t=30, b=40)
+raster_farbskala = "Viridis"
+raster_farben = np.array([hex_to_rgb(farbe) for farbe in sequential.Viridis], dtype=float)
+
+# Zeichenfläche in Pixeln aus der im Browser gemessenen Diagrammgröße
+def rasterPixel(groesse):
+    breite, hoehe = raster_standardgroesse
+    if groesse:
+        breite = int(groesse.get("breite") or breite)
+        hoehe = int(groesse.get("hoehe") or hoehe)
+    breite = min(max(breite - raster_rand["l"] - raster_rand["r"], 10), raster_max_pixel)
+    hoehe = min(max(hoehe - raster_rand["t"] - raster_rand["b"], 10), raster_max_pixel)
+    return breite, hoehe
+
+# Zoombereich einer Achse aus relayoutData (None ohne Zoom, nach Doppelklick oder wenn die
+# Grenzen nicht zur Achse passen, z.B. Datumswerte einer anderen Ansicht)
+def rasterZoom(relayout, achse, zeitachse=False):
+    relayout = relayout or {}
+    if f"{achse}.range[0]" in relayout and f"{achse}.range[1]" in relayout:
+        grenzen = relayout[f"{achse}.range[0]"], relayout[f"{achse}.range[1]"]
+    elif isinstance(relayout.get(f"{achse}.range"), list) and len(relayout[f"{achse}.range"]) == 2:
+        grenzen = relayout[f"{achse}.range"]
+    else:
+        return None
+    try:
+        grenzen = tuple(pd.Timestamp(grenze) if zeitachse else float(grenze) for grenze in grenzen)
+    except (TypeError, ValueError):
+        return None
+    # NaT und NaN fallen hier ebenfalls heraus
+    if not grenzen[0] < grenzen[1]:
+        return None
+    return grenzen
+
+# Punkte (x, y) auf ein Raster hoehe x breite zählen; Zeile 0 ist der kleinste y-Wert.
+# Leere Pixel sind NaN.
+def rastere(x, y, werte, x_bereich, y_bereich, breite, hoehe, aggregation):
+    gueltig = np.isfinite(x) & np.isfinite(y)
+    gueltig &= (x >= x_bereich[0]) & (x <= x_bereich[1]) & (y >= y_bereich[0]) & (y <= y_bereich[1])
+    if aggregation != "anzahl":
+        gueltig &= np.isfinite(werte)
+        werte = werte[gueltig]
+    x, y = x[gueltig], y[gueltig]
+    spalte = ((x - x_bereich[0]) * (breite / (x_bereich[1] - x_bereich[0]))).astype(np.int64)
+    zeile = ((y - y_bereich[0]) * (hoehe / (y_bereich[1] - y_bereich[0]))).astype(np.int64)
+    pixel = np.minimum(zeile, hoehe - 1) * breite + np.minimum(spalte, breite - 1)
+
+    anzahl = np.bincount(pixel, minlength=breite * hoehe)
+    if aggregation == "anzahl":
+        raster = anzahl.astype(float)
+    elif aggregation == "mittel":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            raster = np.bincount(pixel, weights=werte, minlength=breite * hoehe) / anzahl
+    else:
+        raster = np.full(breite * hoehe, -np.inf)
+        np.maximum.at(raster, pixel, werte)
+    raster[anzahl == 0] = np.nan
+    return raster.reshape(hoehe, breite)
+
+# Raster einfärben (leere Pixel transparent) und als PNG-Daten-URI kodieren
+def rasterPng(raster, minimum, maximum):
+    hoehe, breite = raster.shape
+    anteil = np.clip((raster - minimum) / (maximum - minimum), 0, 1) if maximum > minimum else np.full(raster.shape, 0.5)
+    stuetzstellen = np.linspace(0, 1, len(raster_farben))
+    rgba = np.zeros((hoehe, breite, 4), dtype=np.uint8)
+    for kanal in range(3):
+        rgba[..., kanal] = np.interp(np.nan_to_num(anteil), stuetzstellen, raster_farben[:, kanal]).round()
+    rgba[..., 3] = np.where(np.isfinite(raster), 255, 0)
 
-    fig_wind = go.Figure()
+    def abschnitt(typ, daten):
+        return struct.pack(">I", len(daten)) + typ + daten + struct.pack(">I", zlib.crc32(typ + daten))
 
-    wind_colors= ["#ccecff", "#66b2ff", "#1f78b4", "#08306b"]
+    # Filtertyp 0 vor jeder Zeile, 8 Bit RGBA
+    zeilen = np.hstack([np.zeros((hoehe, 1), dtype=np.uint8), rgba.reshape(hoehe, -1)])
+    png = (b"\x89PNG\r\n\x1a\n"
+           + abschnitt(b"IHDR", struct.pack(">IIBBBBB", breite, hoehe, 8, 6, 0, 0, 0))
+           + abschnitt(b"IDAT", zlib.compress(zeilen.tobytes(), 6))
+           + abschnitt(b"IEND", b""))
+    return "data:image/png;base64," + base64.b64encode(png).decode("ascii")
 
-    for label, color in zip(v_labels, wind_colors):
-        sub = speed[speed["Wind_v_bins"] == label]
+# Achsenbereich einer Spalte: Zoom, feste Grenzen oder Wertebereich der Daten
+def rasterBereich(werte, zoom, grenzen=None):
+    if zoom is not None:
+        return zoom
+    if grenzen is not None:
+        return grenzen
+    if not np.isfinite(werte).any():
+        return 0.0, 1.0
+    minimum, maximum = float(np.nanmin(werte)), float(np.nanmax(werte))
+    if minimum == maximum:
+        return minimum - 0.5, maximum + 0.5
+    return minimum, maximum
 
-        fig_wind.add_trace(go.Barpolar(
-            r=sub["count"],
-            theta=sub["WindDir_bins"],
-            name=label,
-            marker=dict(color=color),
-            opacity=0.9
-        ))
-    
-    fig_wind.update_layout(
-        template="plotly_white",
-        legend=dict(font=dict(size=8),orientation="h", y=-0.15, x=0.5, xanchor="center"),
-        margin=dict(l=0,r=0,t=0,b=30),
-        polar=dict(
-            angularaxis=dict(direction="clockwise", tickmode="array", tickvals=["N", "NO", "O", "SO", "S", "SW", "W", "NW"], ticks="", ticktext=["N", "NO", "O", "SO", "S", "SW", "W", "NW"] ,tickfont=dict(size=10)),
-            radialaxis=dict(showticklabels=False, ticks="")
-        )
-    )
+# Gerastertes Bild für Zeitfenster, Ansicht und Zeichenfläche, je Datenstand zwischengespeichert
+@lru_cache(maxsize=32)
+def rasterBild(version, ansicht, aggregation, wert, start, ende, x_zoom, y_zoom, breite, hoehe):
+    achsen = raster_ansichten[ansicht]
+    teil = datenstand().roh.ausschnitt(start, ende)
+    if achsen["x"] == "TIMESTAMP":
+        # Zeitachse in Millisekunden, wie Plotly sie für Datumsachsen verwendet
+        x = teil.index.asi8 / 10**6
+        if x_zoom is not None:
+            x_zoom = tuple(grenze.value / 10**6 for grenze in x_zoom)
+        x_bereich = rasterBereich(x, x_zoom, (start.value / 10**6, ende.value / 10**6))
+    else:
+        x = teil[achsen["x"]].to_numpy(dtype=float)
+        x_bereich = rasterBereich(x, x_zoom, achsen.get("x_grenzen"))
+    y = teil[achsen["y"]].to_numpy(dtype=float)
+    y_bereich = rasterBereich(y, y_zoom)
+    werte = teil[wert].to_numpy(dtype=float) if aggregation != "anzahl" else None
 
-    return fig_wind
+    raster = rastere(x, y, werte, x_bereich, y_bereich, breite, hoehe, aggregation)
+    if np.isfinite(raster).any():
+        minimum, maximum = float(np.nanmin(raster)), float(np.nanmax(raster))
+    else:
+        minimum, maximum = 0.0, 1.0
+    return rasterPng(raster, minimum, maximum), x_bereich, y_bereich, minimum, maximum, len(teil)
 
-# callback Solare Einstrahlung
-@app.callback(
-        Output("HM-solar", "figure"),
-        [
-            Input("Auswahl-Dropdown", "value"),
-            Input("Day", "date"),
-            Input("Month", "date"),
-            Input("Year", "value")
-        ]  
-)
-# Methode für Solare Einstrahlung
+# Größe des Raster-Diagramms im Browser messen (beim Einblenden und nach jeder Größenänderung),
+# damit der Server genau so viele Pixel berechnet wie angezeigt werden
+raster_groesse_js = """
+function(style, relayout, bisher) {
+    const graph = document.getElementById('raster_graph');
+    if (!graph || !style || style.display === 'none') {
+        return window.dash_clientside.no_update;
+    }
+    const rahmen = graph.getBoundingClientRect();
+    const faktor = Math.min(window.devicePixelRatio || 1, 2);
+    const groesse = {breite: Math.round(rahmen.width * faktor), hoehe: Math.round(rahmen.height * faktor)};
+    if (!groesse.breite || !groesse.hoehe || (bisher && bisher.breite === groesse.breite && bisher.hoehe === groesse.hoehe)) {
+        return window.dash_clientside.no_update;
+    }
+    return groesse;
+}
+"""
 
-def updateSolarMap(time, Day, Month, Year):
-    data = df_hourly.copy()
-    data["TIMESTAMP"] = pd.to_datetime(data["TIMESTAMP"])
+def registriereRasterGroesse(app):
+    app.clientside_callback(
+        raster_groesse_js,
+        Output("raster_groesse", "data"),
+        Input("kachel_raster", "style"),
+        Input("raster_graph", "relayoutData"),
+        State("raster_groesse", "data")
+    )
 
-    # Minimal und Maximalwert berechnen
-    min = data["SlrkW_Avg"].dropna().min()
-    max = data["SlrkW_Avg"].dropna().max()
-    
-    if time == 'D' and Day is not None:
-        Day_t = pd.to_datetime(Day)
-        data = data.loc[data['TIMESTAMP'].dt.date == Day_t.date()]
+# Callback Kachel Raster ein-/ausblenden
+@appCallback(
+    Output("kachel_raster", "style"),
+    Input("checklist_variables", "value"),
+    State("kachel_raster", "style")
+)
 
-    elif time == 'M' and Month is not None:
-        Month_t = pd.to_datetime(Month)
-        data = data.loc[(data['TIMESTAMP'].dt.year == Month_t.year) &
-                        (data['TIMESTAMP'].dt.month == Month_t.month)]
-    elif time == 'Y' and Month is not None:
-        year = pd.to_datetime(Year)
-        data = data.loc[data['TIMESTAMP'].dt.year == year.year]
+# Methode für Kachel ein-/ausblenden
 
-    if data.empty or data["SlrkW_Avg"].dropna().empty:
-        return px.imshow(
-            [[np.nan]],
-            labels=dict(x="Zeit", y="Stunde", color="Solare Einstrahlung in kW/m^2"),
-            aspect="auto",
-            color_continous_scale="YlOrRd",
-            template="plotly_white"
-        )
+def updateRasterSichtbar(selected, style):
+    style = dict(style or {})
+    style["display"] = "flex" if "raster" in (selected or []) else "none"
+    return style
 
-    data["hour"]= data["TIMESTAMP"].dt.hour
-    data["day"]= data["TIMESTAMP"].dt.day
-    data["month"]= data["TIMESTAMP"].dt.month
+# Callback Raster
+@appCallback(
+    Output("raster_graph", "figure"),
+    Output("raster_graph", "relayoutData"),
+    *zeitraum_inputs,
+    Input("raster_ansicht", "value"),
+    Input("raster_aggregation", "value"),
+    Input("raster_wert", "value"),
+    Input("raster_groesse", "data"),
+    Input("raster_graph", "relayoutData"),
+    Input("checklist_variables", "value")
+)
 
-    # Zeitebene für y-Achse bauen
-    if time == 'Y':
-        pivo_elem = data.pivot_table(values="SlrkW_Avg", index="hour", columns="month", aggfunc="mean")
-        x_label = "Monat"
-    else:
-        pivo_elem=data.pivot_table(values="SlrkW_Avg", index="hour", columns="day", aggfunc="mean")
-        x_label="Tag"
-    if time == 'D':
-        full_hours = pd.Index(range(24), name="hour")
-        pivo_elem = pivo_elem.reindex(full_hours)
+# Methode für Raster
 
+def updateRaster(time, Day, Month, Year, ansicht, aggregation, wert, groesse, relayout, selected):
+    fenster = zeitfenster(time, Day, Month, Year)
+    if ("raster" not in (selected or []) or fenster is None or ansicht not in raster_ansichten
+            or aggregation not in raster_aggregationen or wert not in raster_werte):
+        return no_update, no_update
+    # relayoutData bleibt beim Wechsel der Ansicht stehen: Zoom verwerfen und zurücksetzen,
+    # sonst gilt er bei der nächsten Änderung wieder
+    zuruecksetzen = ctx.triggered_id == "raster_ansicht" and relayout is not None
+    if ctx.triggered_id == "raster_ansicht":
+        relayout = None
+    d = datenstand()
+    if d.abdeckung.anzahl(*fenster) == 0:
+        return keineDaten(), (None if zuruecksetzen else no_update)
 
-    colorscale = [
-        [0.0, "white"],
-        [0.05, "#fff8cc"],
-        [0.1, "#ffec99"],
-        [0.2, "#ffe066"],
-        [0.3, "#ffd43b"],
-        [0.4, "#ffb347"],
-        [0.5, "#ffa94d"],
-        [0.6, "#ff922b"],
-        [0.7, "#ff6b08"],
-        [0.8, "#fa4d0f"],
-        [0.9, "#e03131"]
-         
-    ]
+    achsen = raster_ansichten[ansicht]
+    zeitachse = achsen["x"] == "TIMESTAMP"
+    breite, hoehe = rasterPixel(groesse)
+    x_zoom, y_zoom = rasterZoom(relayout, "xaxis", zeitachse), rasterZoom(relayout, "yaxis")
+    # Zoom aus einem anderen Zeitraum (relayoutData bleibt beim Wechsel stehen) nicht übernehmen
+    if zeitachse and x_zoom is not None:
+        if x_zoom[1] <= fenster[0] or x_zoom[0] >= fenster[1]:
+            x_zoom = y_zoom = None
+    bild, x_bereich, y_bereich, minimum, maximum, anzahl = rasterBild(
+        d.version, ansicht, aggregation, wert, fenster[0], fenster[1], x_zoom, y_zoom, breite, hoehe)
 
-    fig_new = px.imshow(
-        pivo_elem,
-        labels=dict(x=x_label, y="Stunde", color="kW/m²"),
-        color_continuous_scale="YlOrRd",
-        zmin = min,
-        zmax = max,
-        template="plotly_white",
-        aspect="auto"
+    namen = {spalte["id"]: spalte["name"] for spalte in table_columns}
+    dx = (x_bereich[1] - x_bereich[0]) / breite
+    dy = (y_bereich[1] - y_bereich[0]) / hoehe
+    x0 = x_bereich[0] + dx / 2
+    fig = go.Figure()
+    # Bild-Spur: x0/y0 ist die Mitte des ersten Pixels, Zeile 0 liegt unten
+    fig.add_trace(go.Image(
+        source=bild,
+        x0=pd.Timestamp(x0, unit="ms") if zeitachse else x0, dx=dx,
+        y0=y_bereich[0] + dy / 2, dy=dy,
+        hoverinfo="x+y",
+        name=achsen["name"]
+    ))
+    # Unsichtbare Spur nur für die Farbskala
+    titel = "Anzahl" if aggregation == "anzahl" else f"{raster_aggregationen[aggregation]}<br>{namen[wert]}"
+    fig.add_trace(go.Scatter(
+        x=[None], y=[None], mode="markers", hoverinfo="skip", showlegend=False,
+        marker=dict(colorscale=raster_farbskala, cmin=minimum, cmax=maximum, color=[minimum], showscale=True,
+                    colorbar=dict(title=dict(text=titel, font=dict(size=10)), thickness=12))
+    ))
+    x_grenzen = [pd.Timestamp(grenze, unit="ms") for grenze in x_bereich] if zeitachse else list(x_bereich)
+    fig.update_layout(
+        xaxis=dict(title=namen[achsen["x"]], range=x_grenzen, type="date" if zeitachse else "linear", showgrid=False),
+        yaxis=dict(title=namen[achsen["y"]], range=list(y_bereich), autorange=False, showgrid=False),
+        title=dict(text=f"{anzahl} Datensätze, {breite} x {hoehe} Pixel", font=dict(size=11), x=0.5),
+        margin=raster_rand,
+        template="plotly_white"
     )
-    #fig_new.update_traces(nancolor="lightgrey")
+    return fig, (None if zuruecksetzen else no_update)
 
-    fig_new.update_layout(
-        #title="Solare Einstrahlung",
-        #legend=dict(font=dict(size=8),orientation="h", y=-0.15, x=0.5, xanchor="center"),
-        xaxis=dict(showticklabels=True, tickfont=dict(size=10), ticks="outside", automargin=True),
-        yaxis=dict(title=dict(text="Stunden des Tages", font=dict(size=12)), tickfont=dict(size=11)),
-        margin=dict(l=0, r=15, t=10, b=0),
-        coloraxis_showscale=True,
-        #autosize=True
-    )
-    fig_new.update_xaxes(
-        tickmode="array",
-        tickvals=list(range(len(pivo_elem.columns))),
-        ticktext=[str(c) for c in pivo_elem.columns]
-    )
+# Callback Download-Link
+@appCallback(
+    Output("export_link", "href"),
+    *zeitraum_inputs,
+    Input("export_variablen", "value"),
+    Input("export_format", "value")
+)
 
-    return fig_new
+# Methode für Download-Link
 
-# callback für Relative Luftfeuchtigkeit
-@app.callback(
-        Output("R_Humidity", "figure"),
-        [
-            Input("Auswahl-Dropdown", "value"),
-            Input("Day", "date"),
-            Input("Month", "date"),
-            Input("Year", "value")
-        ]  
+def updateExportLink(time, Day, Month, Year, variablen, format):
+    fenster = zeitfenster(time, Day, Month, Year)
+    if fenster is None:
+        return no_update
+    parameter = {"start": str(fenster[0]), "ende": str(fenster[1]), "format": format}
+    if variablen:
+        parameter["variablen"] = ",".join(variablen)
+    return "/export/daten?" + urlencode(parameter)
+
+# Callback aktuelle Werte
+# Es werden nur die Texte der drei Karten-Annotationen und die Überschrift ersetzt (Patch),
+# die Karte selbst wird nicht neu erzeugt.
+@appCallback(
+    Output("map", "figure"),
+    Output("titel_card", "children"),
+    Output("aktuell_zeitstempel", "data"),
+    Input("aktuell_intervall", "n_intervals"),
+    State("aktuell_zeitstempel", "data"),
+    prevent_initial_call=True
 )
 
-# Methode für Relative Luftfeuchtigkeit
+# Methode für aktuelle Werte
 
-def displayHumidity(time, Day, Month, Year):
-    data = df_hourly.copy()
-    data["TIMESTAMP"] = pd.to_datetime(data["TIMESTAMP"])
-    
-    if time == 'D' and Day is not None:
-        Day_t = pd.to_datetime(Day)
-        data = data.loc[data['TIMESTAMP'].dt.date == Day_t.date()]
-    elif time == 'M' and Month is not None:
-        Month_t = pd.to_datetime(Month)
-        data = data.loc[(data['TIMESTAMP'].dt.year == Month_t.year) &
-                        (data['TIMESTAMP'].dt.month == Month_t.month)]
-    elif time == 'Y' and Year is not None:
-        year = pd.to_datetime(Year)
-        data = data.loc[data['TIMESTAMP'].dt.year == year.year]
+def aktualisiereAktuelleWerte(n_intervals, zeitstempel):
+    eintrag = neuesterDatensatz(konfiguration["daten_pfad"])
+    if eintrag is None or str(eintrag["TIMESTAMP"]) == zeitstempel:
+        return no_update, no_update, no_update
 
-    if data.empty:
-        fig = go.Figure()
-        fig.add_annotation(
-            text="Keine Daten verfügbar",
-            x=0.5, y=0.5, showarrow=False, font=dict(size=14),
-            xref="paper", yref="paper"
-        )
-        return fig_RH
-    
-    min_RH= data["RH_Avg"].min()
-    max_RH= data["RH_Avg"].max()
+    karte = Patch()
+    karte["layout"]["annotations"][0]["text"] = f"{eintrag['AirTC_Avg']:.0f} °C"
+    karte["layout"]["annotations"][1]["text"] = f"{eintrag['RH_Avg']:.0f} %"
+    karte["layout"]["annotations"][2]["text"] = f"{eintrag['BP_mbar_Avg']:.0f} mbar"
+    titel = "Klimastation" + " " + "(" + str(eintrag["TIMESTAMP"].date()) + ")"
+    return karte, titel, str(eintrag["TIMESTAMP"])
 
-    fig_RH = go.Figure()
-    fig_RH.add_bar(
-        x=["Min", "Max"],
-        y=[100, 100],
-        marker_color="rgba(200,200,200,0.3)",
-        marker_line_color="black",
-        marker_line_width=1.5,
-        width=0.5,
-        hoverinfo="skip",
-    )
-    
-    fig_RH.add_bar(
-        x=["Min", "Max"],
-        y=[min_RH, max_RH],
-        marker= dict(
-            color=["rgba(30,144,255,0.8)", "rgba(30,144,255,0.8)"],
-            line=dict(color="black", width=2)
-        ),
-        width=0.5,
-        hovertemplate="%{x}: %{y:.1f}%<extra></extra>"
-    )
+# Callback Kalender: leere Tage sperren (nach dem Einlesen und bei neuen Daten)
+@appCallback(
+    Output("Day", "disabled_days"),
+    Output("Day", "max_date_allowed"),
+    Output("Month", "disabled_days"),
+    Output("Month", "max_date_allowed"),
+    Output("Year", "options"),
+    Output("abdeckung_version", "data"),
+    Input("aktuell_intervall", "n_intervals"),
+    State("abdeckung_version", "data")
+)
 
-    # layout
-    fig_RH.update_layout(
-        #title="",
-        yaxis=dict(range=[0,100], title=dict(text="Relative<br>Luftfeuchtigkeit [%]", font=dict(size=12)), tickfont=dict(size=11)),
-        xaxis=dict(title=""),
-        barmode="overlay",
-        plot_bgcolor="white",
-        paper_bgcolor="white",
-        bargap=0.3,
-        margin=dict(r=0, l=0, t=20, b=20),
-        showlegend=False
-    )
+# Methode für leere Tage
 
-    return fig_RH
+def updateLeereTage(n_intervals, version):
+    d = datenstand()
+    if d.version == version:
+        raise PreventUpdate
+    leere = leereZeitraeume(d)
+    letzter = d.roh.bis.date()
+    return leere["tage"], letzter, leere["monatstage"], letzter, jahresOptionen(d.roh.von.year, d.roh.bis.year, leere["jahre"]), d.version
+
+# Callback Datenabdeckung des gewählten Zeitraums
+@appCallback(
+    Output("abdeckung_text", "children"),
+    *zeitraum_inputs
+)
+
+# Methode für Datenabdeckung
+
+def updateAbdeckung(time, Day, Month, Year):
+    fenster = zeitfenster(time, Day, Month, Year)
+    if fenster is None:
+        return ""
+    abdeckung = datenstand().abdeckung
+    anteil = abdeckung.vollstaendigkeit(*fenster)
+    if anteil is None:
+        return "Keine Daten im gewählten Zeitraum"
+    text = f"Datenabdeckung {anteil * 100:.1f} % ({abdeckung.anzahl(*fenster)} von {abdeckung.erwartet(*fenster)} Messwerten)"
+    leere_stunden = abdeckung.stundenOhneDaten(*fenster)
+    if leere_stunden:
+        text += f", {leere_stunden} Stunden ohne Daten"
+    return text
 
 # Infobox Relative Luftfeuchtigkeit
 
-@app.callback(
+@appCallback(
     Output("info_box_RH", "style"),
     Input("info_icon_RH", "n_clicks"),
     State("info_box_RH", "style"),
@@ -1205,7 +4364,7 @@ def displayInfoBox_RH(n_clicks, style):
 
 
 # Infobox Klimastation
-@app.callback(
+@appCallback(
     Output("info_box", "style"),
     Input("info_icon", "n_clicks"),
     State("info_box", "style"),
@@ -1222,7 +4381,7 @@ def displayInfoBox_CL(n_clicks, style):
     return style
 
 # Infobox Checkbox
-@app.callback(
+@appCallback(
     Output("info_box_CL", "style"),
     Input("info_icon_CL", "n_clicks"),
     State("info_box_CL", "style"),
@@ -1239,7 +4398,7 @@ def displayInfoBox(n_clicks, style):
     return style
 
 # Infobox Temperatur und Niederschlag
-@app.callback(
+@appCallback(
     Output("info_box_TN", "style"),
     Input("info_icon_TN", "n_clicks"),
     State("info_box_TN", "style"),
@@ -1256,7 +4415,7 @@ def displayInfoBox_TN(n_clicks, style):
     return style
 
 # Infobox Wind
-@app.callback(
+@appCallback(
     Output("info_box_W", "style"),
     Input("info_icon_W", "n_clicks"),
     State("info_box_W", "style"),
@@ -1273,7 +4432,7 @@ def displayInfoBox_W(n_clicks, style):
     return style
 
 # Infobox Solare EInstrahlung
-@app.callback(
+@appCallback(
     Output("info_box_SE", "style"),
     Input("info_icon_SE", "n_clicks"),
     State("info_box_SE", "style"),
@@ -1290,9 +4449,719 @@ def displayInfoBox_SE(n_clicks, style):
     return style
 
 
-# App 
-if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=8080, debug=False,
+# JSON-API
+# Aggregierte Zeitreihen für andere Werkzeuge (Auswertungsskripte, weitere Dashboards).
+# Die Daten kommen aus denselben Rollups und werden mit denselben Funktionen ausgeschnitten
+# (zeitfenster, ausschnitt, rollupAusschnitt) wie im Dashboard, die Werte stimmen also überein.
+#   /api/v1/stationen
+#   /api/v1/reihen?station=tuebingen&variablen=AirTC_Avg,Rain_mm_Avg&aufloesung=tag
+#                 &start=2024-01-01&ende=2024-02-01   (oder &zeitraum=M|2024-01)
+#                 &seite=1&pro_seite=1000
+stationen = {
+    "tuebingen": {
+        "name": "Klimastation Tübingen",
+        "standort": "Kliniken Tal (Innenstadt), Rümelinstraße 23, 72070 Tübingen",
+        "lat": lat,
+        "lon": lon
+    }
+}
+api_aufloesungen = {"stunde": "h", "tag": "D", "monat": "M"}
+api_max_pro_seite = 10000
+
+def apiRollup(aufloesung):
+    d = datenstand()
+    if aufloesung == "stunde":
+        return d.df_hourly
+    elif aufloesung == "tag":
+        return d.df_daily
+    return d.df_monthly
+
+def apiFehler(text, status=400):
+    antwort = jsonify({"fehler": text})
+    antwort.status_code = status
+    return antwort
+
+def apiEtag():
+    return hashlib.sha1((datenstand().version + "|" + request.full_path).encode()).hexdigest()
+
+@serverRoute("/api/v1/stationen")
+def apiStationen():
+    roh = datenstand().roh
+    return jsonify({
+        "stationen": [dict(id=station_id, **station) for station_id, station in stationen.items()],
+        "variablen": [spalte["id"] for spalte in table_columns if spalte["id"] != "TIMESTAMP"],
+        "perzentil_variablen": skizzen_variablen,
+        "abgeleitete_variablen": [
+            {"id": name, "name": variable["name"], "einheit": variable["einheit"], "basis": variable["basis"], "mindestens": variable["mindestens"]}
+            for name, variable in abgeleitete_variablen.items()
+        ],
+        "aufloesungen": list(api_aufloesungen),
+        "daten_von": str(roh.von),
+        "daten_bis": str(roh.bis)
+    })
+
+# Perzentile beliebiger Zeiträume aus den Quantil-Skizzen, z.B.
+# /api/v1/perzentile?start=2024-01-01&ende=2024-07-01&variablen=AirTC_Avg&perzentile=5,50,95
+@serverRoute("/api/v1/perzentile")
+def apiPerzentile():
+    station = request.args.get("station", "tuebingen")
+    if station not in stationen:
+        return apiFehler("unbekannte Station: " + station, 404)
+    stand = datenstand()
+    roh = stand.roh
+
+    variablen = [v for v in request.args.get("variablen", "").split(",") if v] or skizzen_variablen
+    unbekannt = [v for v in variablen if v not in skizzen_variablen]
+    if unbekannt:
+        return apiFehler("keine Perzentile für: " + ", ".join(unbekannt) + " (verfügbar: " + ", ".join(skizzen_variablen) + ")")
+    try:
+        if "zeitraum" in request.args:
+            fenster = zeitfenster(*zeitraumAusSchluessel(request.args["zeitraum"]))
+        else:
+            fenster = (
+                pd.Timestamp(request.args.get("start", str(roh.von))),
+                pd.Timestamp(request.args.get("ende", str(roh.bis + pd.Timedelta(seconds=1))))
+            )
+        perzentile = [float(p) for p in request.args.get("perzentile", "5,25,50,75,95").split(",")]
+    except (ValueError, TypeError):
+        return apiFehler("ungültiger Zeitraum oder ungültige Perzentile")
+    if fenster is None or not all(0 <= p <= 100 for p in perzentile):
+        return apiFehler("ungültiger Zeitraum oder ungültige Perzentile")
+
+    etag = apiEtag()
+    if request.if_none_match.contains_weak(etag):
+        antwort = Response(status=304)
+        antwort.set_etag(etag)
+        return antwort
+
+    daten = {}
+    for variable in variablen:
+        felder = fensterSkizzen(stand.skizzen, variable, *fenster)
+        werte = skizzenQuantile(felder, np.array(perzentile) / 100, gesamt=True)[0]
+        daten[variable] = {
+            "anzahl": int(felder["n"].sum()),
+            "perzentile": {f"{p:g}": None if np.isnan(w) else float(w) for p, w in zip(perzentile, werte)}
+        }
+
+    antwort = jsonify({
+        "station": station,
+        "start": str(fenster[0]),
+        "ende": str(fenster[1]),
+        "daten_version": stand.version,
+        "daten": daten
+    })
+    antwort.set_etag(etag)
+    antwort.headers["Cache-Control"] = "public, max-age=86400" if fenster[1] <= roh.bis else "no-cache"
+    return antwort
+
+@serverRoute("/api/v1/reihen")
+def apiReihen():
+    station = request.args.get("station", "tuebingen")
+    if station not in stationen:
+        return apiFehler("unbekannte Station: " + station, 404)
+    stand = datenstand()
+    roh = stand.roh
+
+    aufloesung = request.args.get("aufloesung", "tag")
+    if aufloesung not in api_aufloesungen:
+        return apiFehler("aufloesung muss einer von " + ", ".join(api_aufloesungen) + " sein")
+
+    rollup = apiRollup(aufloesung)
+    variablen = [v for v in request.args.get("variablen", "").split(",") if v]
+    if not variablen:
+        variablen = [v for v in rollup.columns if v != "TIMESTAMP"]
+    unbekannt = [v for v in variablen if v not in rollup.columns and v not in abgeleitete_variablen]
+    if unbekannt:
+        return apiFehler("unbekannte Variablen: " + ", ".join(unbekannt))
+    nicht_verfuegbar = [v for v in variablen if v in abgeleitete_variablen and not abgeleitetVerfuegbar(v, aufloesung)]
+    if nicht_verfuegbar:
+        return apiFehler("in dieser Auflösung nicht verfügbar: " + ", ".join(nicht_verfuegbar))
+
+    try:
+        if "zeitraum" in request.args:
+            fenster = zeitfenster(*zeitraumAusSchluessel(request.args["zeitraum"]))
+        else:
+            fenster = (
+                pd.Timestamp(request.args.get("start", str(roh.von))),
+                pd.Timestamp(request.args.get("ende", str(roh.bis + pd.Timedelta(seconds=1))))
             )
+        seite = int(request.args.get("seite", "1"))
+        pro_seite = min(int(request.args.get("pro_seite", "1000")), api_max_pro_seite)
+    except (ValueError, TypeError):
+        return apiFehler("ungültiger Zeitraum oder ungültige Seitenangabe")
+    if fenster is None or seite < 1 or pro_seite < 1:
+        return apiFehler("ungültiger Zeitraum oder ungültige Seitenangabe")
+
+    etag = apiEtag()
+    if request.if_none_match.contains_weak(etag):
+        antwort = Response(status=304)
+        antwort.set_etag(etag)
+        return antwort
+
+    teil = rollupAusschnitt(rollup, *fenster)
+    gesamt = len(teil)
+    teil = teil.iloc[(seite - 1) * pro_seite:seite * pro_seite]
+    if "TIMESTAMP" in teil.columns:
+        teil = teil.set_index("TIMESTAMP")
+
+    daten = {"TIMESTAMP": [str(t) for t in teil.index]}
+    for variable in variablen:
+        if variable in abgeleitete_variablen:
+            reihe = abgeleiteteReihe(stand.version, variable, aufloesung, fenster[0], fenster[1])
+            werte = reihe.to_numpy()[(seite - 1) * pro_seite:seite * pro_seite]
+        else:
+            werte = teil[variable].to_numpy(dtype=float)
+        daten[variable] = [None if np.isnan(w) else w for w in werte.tolist()]
+
+    naechste_seite = None
+    if seite * pro_seite < gesamt:
+        parameter = request.args.to_dict()
+        parameter["seite"] = str(seite + 1)
+        naechste_seite = request.path + "?" + urlencode(parameter)
+
+    antwort = jsonify({
+        "station": station,
+        "aufloesung": aufloesung,
+        "variablen": variablen,
+        "start": str(fenster[0]),
+        "ende": str(fenster[1]),
+        "seite": seite,
+        "pro_seite": pro_seite,
+        "gesamt": gesamt,
+        "naechste_seite": naechste_seite,
+        "daten_version": stand.version,
+        "daten": daten
+    })
+    antwort.set_etag(etag)
+    antwort.headers["Cache-Control"] = "public, max-age=86400" if fenster[1] <= roh.bis else "no-cache"
+    return antwort
+
+# Daten-Export
+# Rohdaten oder Rollups eines Zeitraums werden blockweise als CSV oder Parquet gestreamt.
+# Es wird immer nur ein Block (export_blockgroesse Zeilen) gleichzeitig umgewandelt,
+# der Speicherbedarf hängt also nicht von der Länge des Zeitraums ab.
+#   /export/daten?start=2024-01-01&ende=2025-01-01&variablen=AirTC_Avg,RH_Avg&format=csv&aufloesung=roh
+export_blockgroesse = 50000
+export_aufloesungen = {"roh": None, "stunde": "stunde", "tag": "tag", "monat": "monat"}
+
+# Zeilen eines Zeitfensters in Blöcken liefern (Binärsuche auf dem Zeitindex, dann Index-Slices)
+def datenBloecke(data, start, ende, spalten, blockgroesse=export_blockgroesse):
+    if isinstance(data, Rohdaten):
+        links, rechts = data.grenzen(start, ende)
+        zeilen = data.zeilen
+    else:
+        zeiten = data.index if isinstance(data.index, pd.DatetimeIndex) else data["TIMESTAMP"]
+        links, rechts = zeiten.searchsorted([start, ende])
+        zeilen = lambda von, bis: data.iloc[von:bis]
+    for i in range(links, rechts, blockgroesse):
+        block = zeilen(i, min(i + blockgroesse, rechts))
+        if "TIMESTAMP" in block.columns:
+            block = block.set_index("TIMESTAMP")
+        if any(spalte in abgeleitete_variablen for spalte in spalten):
+            # abgeleitete Größen blockweise berechnen
+            yield pd.DataFrame({
+                spalte: berechneAbgeleitet(spalte, block) if spalte in abgeleitete_variablen else block[spalte]
+                for spalte in spalten
+            }, index=block.index)
+        else:
+            yield block[spalten]
+
+def csvStrom(bloecke):
+    kopf = True
+    for block in bloecke:
+        yield block.to_csv(header=kopf, date_format="%Y-%m-%d %H:%M:%S").encode("utf-8")
+        kopf = False
+
+# Ausgabeziel für den Parquet-Writer, das geschriebene Bytes zum Weiterreichen sammelt
+class ParquetSenke:
+    def __init__(self):
+        self.teile = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, daten):
+        self.teile.append(bytes(daten))
+        self.position += len(daten)
+        return len(daten)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def abholen(self):
+        daten = b"".join(self.teile)
+        self.teile = []
+        return daten
+
+def parquetStrom(bloecke):
+    senke = ParquetSenke()
+    writer = None
+    for block in bloecke:
+        tabelle = pa.Table.from_pandas(block.reset_index(), preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(senke, tabelle.schema, compression="snappy")
+        writer.write_table(tabelle)
+        yield senke.abholen()
+    if writer is not None:
+        writer.close()
+        yield senke.abholen()
+
+@serverRoute("/export/daten")
+def exportDaten():
+    format = request.args.get("format", "csv")
+    if format not in ("csv", "parquet"):
+        return apiFehler("format muss csv oder parquet sein")
+    if format == "parquet" and pa is None:
+        return apiFehler("Parquet-Export benötigt pyarrow", 501)
+
+    aufloesung = request.args.get("aufloesung", "roh")
+    if aufloesung not in export_aufloesungen:
+        return apiFehler("aufloesung muss einer von " + ", ".join(export_aufloesungen) + " sein")
+    roh = datenstand().roh
+    data = roh if aufloesung == "roh" else apiRollup(aufloesung)
+
+    spalten = [v for v in request.args.get("variablen", "").split(",") if v]
+    if not spalten:
+        spalten = [v for v in data.columns if v != "TIMESTAMP"]
+    unbekannt = [v for v in spalten if (v not in data.columns and v not in abgeleitete_variablen) or v == "TIMESTAMP"]
+    if unbekannt:
+        return apiFehler("unbekannte Variablen: " + ", ".join(unbekannt))
+    nicht_verfuegbar = [v for v in spalten if v in abgeleitete_variablen and not abgeleitetVerfuegbar(v, aufloesung)]
+    if nicht_verfuegbar:
+        return apiFehler("in dieser Auflösung nicht verfügbar: " + ", ".join(nicht_verfuegbar))
+
+    # Leere Angaben (?start=) ergeben NaT
+    try:
+        start = pd.Timestamp(request.args.get("start", str(roh.von)))
+        ende = pd.Timestamp(request.args.get("ende", str(roh.bis + pd.Timedelta(seconds=1))))
+        if pd.isna(start) or pd.isna(ende) or start >= ende:
+            raise ValueError
+    except ValueError:
+        return apiFehler("ungültiger Zeitraum")
+
+    bloecke = datenBloecke(data, start, ende, spalten)
+    dateiname = f"klimastation_{start:%Y%m%d}_{ende:%Y%m%d}_{aufloesung}.{format}"
+    if format == "csv":
+        strom, mimetype = csvStrom(bloecke), "text/csv"
+    else:
+        strom, mimetype = parquetStrom(bloecke), "application/vnd.apache.parquet"
+    return Response(
+        stream_with_context(strom),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={dateiname}"}
+    )
+
+# HTTP-Komprimierung und Cache-Header
+# Antworten ab einer Mindestgröße werden mit Brotli (falls installiert) oder gzip komprimiert.
+# Callback-Antworten bekommen ein ETag aus Datenstand und Anfrage. Stimmt es mit dem
+# If-None-Match der Anfrage überein, wird ohne Berechnung mit 304 geantwortet.
+# Abgeschlossene Zeiträume (vollständig vor dem letzten Messwert) dürfen zwischengespeichert werden.
+komprimierbare_typen = ("application/json", "text/html", "text/css", "application/javascript", "text/javascript", "text/plain")
+
+# Zeitraum (time, Day, Month, Year) aus dem Body einer Callback-Anfrage lesen
+def zeitraumAusAnfrage(body):
+    werte = {}
+    for eingabe in body.get("inputs", []):
+        if isinstance(eingabe, dict):
+            werte[eingabe.get("id")] = eingabe.get("value")
+    for wert in werte.values():
+        # Hintergrund-Auftrag enthält den Zeitraum bereits
+        if isinstance(wert, dict) and "time" in wert:
+            return wert["time"], wert["Day"], wert["Month"], wert["Year"]
+    if "Auswahl-Dropdown" not in werte:
+        return None
+    return werte["Auswahl-Dropdown"], werte.get("Day"), werte.get("Month"), werte.get("Year")
+
+# Liegt der Zeitraum vollständig vor dem letzten Messwert, ändert er sich nicht mehr
+def zeitraumAbgeschlossen(time, Day, Month, Year):
+    fenster = zeitfenster(time, Day, Month, Year)
+    return fenster is not None and fenster[1] <= datenstand().roh.bis
+
+def callbackEtag():
+    inhalt = datenstand().version.encode() + b"|" + request.get_data(cache=True)
+    return hashlib.sha1(inhalt).hexdigest()
+
+# Nur direkte Callback-Antworten sind cachebar, nicht die Abfragen laufender Hintergrund-Aufträge
+def cachebareCallbackAnfrage():
+    return (request.method == "POST"
+            and request.path.endswith("/_dash-update-component")
+            and "job" not in request.args
+            and "cacheKey" not in request.args)
+
+def pruefeEtag():
+    if not cachebareCallbackAnfrage():
+        return None
+    treffer = request.if_none_match.contains_weak(callbackEtag())
+    metriken.zaehle("klimastation_cache_zugriffe_total", {"cache": "etag", "ergebnis": "treffer" if treffer else "fehlgriff"})
+    if treffer:
+        antwort = Response(status=304)
+        antwort.set_etag(callbackEtag())
+        return antwort
+
+# Metriken je Callback-Anfrage: Antwortgröße und die Zeit nach dem Callback
+# (Serialisieren der Antwort durch Dash)
+def starteMessung():
+    g.metrik_start = perf_counter()
+
+def erfasseAntwort(antwort):
+    name = g.get("metrik_callback")
+    if name is None and request.path.endswith("/_dash-update-component") and "cacheKey" in request.args:
+        name = "hintergrund_abfrage"
+    if name is None or antwort.direct_passthrough or antwort.is_streamed:
+        return antwort
+    metriken.beobachte("klimastation_antwort_bytes", {"callback": name}, len(antwort.get_data()))
+    if "metrik_callback_sekunden" in g:
+        gesamt = perf_counter() - g.metrik_start
+        metriken.beobachte("klimastation_callback_phase_sekunden", {"callback": name, "phase": "serialisieren"},
+                           max(0.0, gesamt - g.metrik_callback_sekunden))
+    return antwort
+
+# Werte, die erst beim Abfragen von /metrics gelesen werden
+def sammleCacheMetriken():
+    proben = []
+    info = tabellenReihenfolge.cache_info()
+    for ergebnis, wert in [("treffer", info.hits), ("fehlgriff", info.misses)]:
+        proben.append(("klimastation_cache_zugriffe_total", (("cache", "tabellen_reihenfolge"), ("ergebnis", ergebnis)), wert))
+    info = abgeleiteteReihe.cache_info()
+    for ergebnis, wert in [("treffer", info.hits), ("fehlgriff", info.misses)]:
+        proben.append(("klimastation_cache_zugriffe_total", (("cache", "abgeleitete_groessen"), ("ergebnis", ergebnis)), wert))
+    info = rasterBild.cache_info()
+    for ergebnis, wert in [("treffer", info.hits), ("fehlgriff", info.misses)]:
+        proben.append(("klimastation_cache_zugriffe_total", (("cache", "raster"), ("ergebnis", ergebnis)), wert))
+    if aktueller_datenstand is not None:
+        proben.append(("klimastation_daten_zeilen", (), len(aktueller_datenstand.roh)))
+        bericht = aktueller_datenstand.speicherbericht()
+        for bereich in ["rollups", "klimatologie", "skizzen", "roh_ram", "roh_datei", "roh_datei_resident"]:
+            if bericht[bereich + "_bytes"] is not None:
+                proben.append(("klimastation_speicher_bytes", (("bereich", bereich),), bericht[bereich + "_bytes"]))
+        if bericht["budget_bytes"] is not None:
+            proben.append(("klimastation_speicher_budget_bytes", (), bericht["budget_bytes"]))
+    return proben
+
+metriken.sammler.append(sammleCacheMetriken)
+
+# Speicherbedarf von Rollups und Rohdaten (im Speicher / ausgelagert) im Vergleich zum Budget
+@serverRoute("/speicher")
+def speicherAbfrage():
+    return jsonify(datenstand().speicherbericht())
+
+@serverRoute("/metrics")
+def metrikenAbfrage():
+    return Response(metriken.text(), mimetype="text/plain", content_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Profiling einzelner Callback-Aufrufe (Token im Header X-Profiling-Token)
+#   POST /profiling/start?callback=updateSolarMap&anzahl=3&intervall_ms=5
+#   GET  /profiling/<id>                  Status und Laufzeit je Aufruf
+#   GET  /profiling/<id>/profil.folded    Stapel im folded-Format für Flamegraphs
+def profilingFehler():
+    token = konfiguration["profiling_token"]
+    if not token:
+        return apiFehler("Profiling ist nicht aktiviert (PROFILING_TOKEN)", 404)
+    if not hmac.compare_digest(request.headers.get("X-Profiling-Token", "").encode(), token.encode()):
+        return apiFehler("ungültiges Token", 403)
+    return None
+
+@serverRoute("/profiling/start", methods=["POST"])
+def profilingStarten():
+    fehler = profilingFehler()
+    if fehler is not None:
+        return fehler
+    callback = request.args.get("callback", "")
+    if callback not in profilierung.callbacks:
+        return apiFehler("unbekannter Callback, möglich sind: " + ", ".join(sorted(profilierung.callbacks)))
+    try:
+        anzahl = int(request.args.get("anzahl", "1"))
+        intervall_ms = float(request.args.get("intervall_ms", "5"))
+    except ValueError:
+        return apiFehler("anzahl und intervall_ms müssen Zahlen sein")
+    if not 1 <= anzahl <= profil_max_aufrufe or not 0.5 <= intervall_ms <= 1000:
+        return apiFehler(f"anzahl muss zwischen 1 und {profil_max_aufrufe}, intervall_ms zwischen 0.5 und 1000 liegen")
+
+    auftrag_id = profilierung.starte(callback, anzahl, intervall_ms / 1000)
+    antwort = jsonify(profilierung.status(auftrag_id))
+    antwort.status_code = 202
+    return antwort
+
+@serverRoute("/profiling/<auftrag_id>")
+def profilingStatus(auftrag_id):
+    fehler = profilingFehler()
+    if fehler is not None:
+        return fehler
+    status = profilierung.status(auftrag_id)
+    if status is None:
+        return apiFehler("unbekannter Auftrag", 404)
+    return jsonify(status)
+
+@serverRoute("/profiling/<auftrag_id>/profil.folded")
+def profilingHerunterladen(auftrag_id):
+    fehler = profilingFehler()
+    if fehler is not None:
+        return fehler
+    inhalt = profilierung.folded(auftrag_id)
+    if inhalt is None:
+        return apiFehler("unbekannter Auftrag", 404)
+    antwort = Response(inhalt, mimetype="text/plain")
+    antwort.headers["Content-Disposition"] = f'attachment; filename="profil_{auftrag_id}.folded"'
+    antwort.headers["Cache-Control"] = "no-store"
+    return antwort
+
+def komprimiereAntwort(antwort):
+    if cachebareCallbackAnfrage() and antwort.status_code == 200:
+        antwort.set_etag(callbackEtag())
+        try:
+            zeitraum = zeitraumAusAnfrage(json.loads(request.get_data(cache=True)))
+        except (ValueError, TypeError, KeyError):
+            zeitraum = None
+        if zeitraum is not None and zeitraumAbgeschlossen(*zeitraum):
+            antwort.headers["Cache-Control"] = "public, max-age=86400"
+        else:
+            antwort.headers["Cache-Control"] = "no-cache"
+
+    if (antwort.status_code != 200
+            or antwort.direct_passthrough
+            or antwort.is_streamed
+            or "Content-Encoding" in antwort.headers
+            or antwort.mimetype not in komprimierbare_typen):
+        return antwort
+
+    daten = antwort.get_data()
+    if len(daten) < konfiguration["komprimierung_min_bytes"]:
+        return antwort
+
+    akzeptiert = request.accept_encodings
+    if brotli is not None and akzeptiert["br"]:
+        antwort.set_data(brotli.compress(daten, quality=5))
+        antwort.headers["Content-Encoding"] = "br"
+    elif akzeptiert["gzip"]:
+        antwort.set_data(gzip.compress(daten, compresslevel=6))
+        antwort.headers["Content-Encoding"] = "gzip"
+    else:
+        return antwort
+    antwort.vary.add("Accept-Encoding")
+    etag, schwach = antwort.get_etag()
+    if etag is not None and not schwach:
+        # komprimierte Variante bekommt ein schwaches ETag
+        antwort.set_etag(etag, weak=True)
+    return antwort
+
+# Statischer Export
+# Rendert alle vier Diagramme für jeden Tag, Monat und jedes Jahr als kompakte JSON-Dateien
+# und schreibt ein Manifest. Über einen Fingerabdruck der Rohdaten je Zeitraum werden bei
+# erneutem Aufruf nur die Zeiträume neu gerendert, deren Daten sich geändert haben.
+# Das Plotly-Template wird nur einmal unter vorlagen/ abgelegt.
+EXPORT_FORMAT = 3
+
+def periodenFingerabdruecke():
+    d = datenstand()
+
+    # Die Farbskala der Solarkarte hängt vom Minimum/Maximum aller Daten ab
+    global_teil = f"{EXPORT_FORMAT}|{d.df_hourly['SlrkW_Avg'].min()}|{d.df_hourly['SlrkW_Avg'].max()}"
+
+    # Anzahl Zeilen und Hash-Summe je Zeitraum; ein Zeitraum kann über mehrere Teile der
+    # Rohdaten verteilt sein (z.B. nachgeladene Zeilen), die Summen werden addiert
+    summen_je_periode = {}
+    for df in d.roh.bloecke():
+        zeilen_hash = pd.util.hash_pandas_object(df, index=True).to_numpy()
+        zeiten = df.index.to_numpy()
+        gueltig = ~np.isnat(zeiten)
+        summiereJePeriode(summen_je_periode, zeiten[gueltig], zeilen_hash[gueltig])
+
+    # Klimamittel und Abweichungen: Hash-Summe der Klimatologie-Fächer, die die Diagramme des
+    # Zeitraums lesen. Das Temperatur-Overlay liest je Stunde (Tagesansicht), je Tag (Monatsansicht)
+    # bzw. je Monat (Jahresansicht), die Solarkarte immer je Stunde. Ein neues Jahr in der
+    # Klimatologie ändert so nur die Zeiträume, die dieselben Fächer zeigen.
+    temperatur = {freq: klimaFachHashes(d.klima[freq], rollup, "AirTC_Avg") for freq, rollup in [("h", d.df_hourly), ("D", d.df_daily), ("M", d.df_monthly)]}
+    solar = klimaFachHashes(d.klima["h"], d.df_hourly, "SlrkW_Avg")
+    stunden = d.df_hourly["TIMESTAMP"].to_numpy()
+    fach = klimaFach(stunden, "h")
+    klima_je_periode = {}
+    summiereJePeriode(klima_je_periode, stunden, temperatur["h"][fach] + solar[fach], ["D"])
+    summiereJePeriode(klima_je_periode, stunden, solar[fach], ["M", "Y"])
+    summiereJePeriode(klima_je_periode, d.df_daily.index.to_numpy(), temperatur["D"][klimaFach(d.df_daily.index, "D")], ["M"])
+    summiereJePeriode(klima_je_periode, d.df_monthly.index.to_numpy(), temperatur["M"][klimaFach(d.df_monthly.index, "M")], ["Y"])
+
+    return {
+        schluessel: f"{global_teil}|{n}|{summe:x}|{klima_je_periode.get(schluessel, (0, 0))[1]:x}"
+        for schluessel, (n, summe) in summen_je_periode.items()
+    }
+
+# Anzahl und Hash-Summe (modulo 2**64) der nach der Zeit sortierten Werte je Tag, Monat und Jahr
+# zu summen addieren
+def summiereJePeriode(summen, zeiten, hashes, ebenen=("D", "M", "Y")):
+    if len(zeiten) == 0:
+        return
+    for time in ebenen:
+        einheit, format = {"D": ("datetime64[D]", "%Y-%m-%d"), "M": ("datetime64[M]", "%Y-%m"), "Y": ("datetime64[Y]", "%Y")}[time]
+        perioden, starts, anzahl = np.unique(zeiten.astype(einheit), return_index=True, return_counts=True)
+        for periode, summe, n in zip(perioden, np.add.reduceat(hashes, starts), anzahl):
+            schluessel = f"{time}|{pd.Timestamp(periode):{format}}"
+            bisher_n, bisher_summe = summen.get(schluessel, (0, 0))
+            summen[schluessel] = (bisher_n + int(n), (bisher_summe + int(summe)) % 2**64)
+
+# Hash je Klimatologie-Fach über die Werte, aus denen es berechnet wurde (Rollup-Zeilen vor klima.bis).
+# Nicht über Mittelwert und Perzentile selbst: Nachgeladen und vollständig berechnet können sie in den
+# letzten Stellen abweichen, die Eingangswerte sind gleich.
+def klimaFachHashes(klima, rollup, variable):
+    summen = np.zeros(klima_faecher[klima.freq], dtype=np.uint64)
+    if klima.bis is None:
+        return summen
+    zeiten = pd.DatetimeIndex(rollup["TIMESTAMP"] if "TIMESTAMP" in rollup.columns else rollup.index)
+    rechts = zeiten.searchsorted(klima.bis)
+    zeilen_hash = pd.util.hash_pandas_object(rollup.iloc[:rechts][["RECORD", variable]], index=False).to_numpy()
+    np.add.at(summen, klimaFach(zeiten[:rechts], klima.freq), zeilen_hash)
+    return summen
+
+def zeitraumAusSchluessel(schluessel):
+    time, wert = schluessel.split("|")
+    if time == 'D':
+        return time, wert, None, None
+    elif time == 'M':
+        return time, None, wert + "-01", None
+    return time, None, None, wert
+
+def schreibeJson(pfad, inhalt):
+    os.makedirs(os.path.dirname(pfad), exist_ok=True)
+    with open(pfad + ".tmp", "w", encoding="utf-8") as datei:
+        json.dump(inhalt, datei, separators=(",", ":"), ensure_ascii=False)
+    os.replace(pfad + ".tmp", pfad)
+
+def exportiereStatisch(verzeichnis):
+    manifest_pfad = os.path.join(verzeichnis, "manifest.json")
+    manifest = {"perioden": {}}
+    if os.path.exists(manifest_pfad):
+        with open(manifest_pfad, encoding="utf-8") as datei:
+            manifest = json.load(datei)
+
+    fingerabdruecke = periodenFingerabdruecke()
+    alt = manifest.get("perioden", {})
+    perioden = {k: v for k, v in alt.items() if k in fingerabdruecke}
+    offen = [k for k, fp in fingerabdruecke.items() if alt.get(k, {}).get("fp") != fp]
+    print(f"Export: {len(offen)} von {len(fingerabdruecke)} Zeiträumen werden neu gerendert")
+
+    def speichereManifest():
+        schreibeJson(manifest_pfad, {
+            "format": EXPORT_FORMAT,
+            "daten_version": datenstand().version,
+            "erstellt": datetime.now().isoformat(timespec="seconds"),
+            "perioden": perioden
+        })
+
+    vorlagen = set()
+    for i, schluessel in enumerate(offen, start=1):
+        time, Day, Month, Year = zeitraumAusSchluessel(schluessel)
+        eintrag = {"fp": fingerabdruecke[schluessel]}
+        for graph_id, kuerzel, kachel, methode, hintergrund in diagramm_kacheln:
+            figur = json.loads(methode(time, Day, Month, Year).to_json())
+            vorlage = figur.get("layout", {}).pop("template", {})
+            vorlage_json = json.dumps(vorlage, sort_keys=True, separators=(",", ":"))
+            figur["vorlage"] = hashlib.sha1(vorlage_json.encode()).hexdigest()[:16]
+            if figur["vorlage"] not in vorlagen:
+                schreibeJson(os.path.join(verzeichnis, "vorlagen", figur["vorlage"] + ".json"), vorlage)
+                vorlagen.add(figur["vorlage"])
+
+            datei = f"{graph_id}/{time}/{schluessel.split('|')[1]}.json"
+            schreibeJson(os.path.join(verzeichnis, datei), figur)
+            eintrag[graph_id] = datei
+        perioden[schluessel] = eintrag
+
+        if i % 100 == 0:
+            print(f"Export: {i}/{len(offen)}")
+            speichereManifest()
+
+    speichereManifest()
+    print("Export abgeschlossen: " + manifest_pfad)
+
+# App
+# create_app() erzeugt die Dash-App mit allen Callbacks und Routen. Beim Import des Moduls
+# passiert nichts weiter: Die Daten werden erst im Hintergrund (vorladen) bzw. beim ersten
+# Zugriff eingelesen, die Seite selbst wird sofort ausgeliefert.
+def create_app(config=None):
+    global konfiguration
+    konfiguration = dict(standardKonfiguration(), **(config or {}))
+    if konfiguration["statischer_export_dir"] and not konfiguration["statischer_export_url"]:
+        konfiguration["statischer_export_url"] = "/statisch"
+
+    manager = erstelleHintergrundManager(konfiguration["hintergrund_cache"])
+    app = Dash(background_callback_manager=manager)
+    app.layout = erstelleLayout
+
+    for args, kwargs, funktion in app_callbacks:
+        app.callback(*args, **kwargs)(gemessen(funktion.__name__)(funktion))
+
+    for graph_id, kuerzel, kachel, methode, hintergrund in diagramm_kacheln:
+        if konfiguration["statischer_export_url"]:
+            registriereStatischeKachel(app, konfiguration["statischer_export_url"], graph_id, kuerzel, kachel)
+        else:
+            registriereKachel(app, graph_id, kuerzel, kachel, methode, hintergrund=hintergrund and manager is not None)
+    registriereRasterGroesse(app)
+
+    for regel, funktion, optionen in server_routen:
+        app.server.add_url_rule(regel, view_func=funktion, **optionen)
+    if konfiguration["statischer_export_dir"]:
+        app.server.add_url_rule("/statisch/<path:pfad>", view_func=statischeDatei)
+    app.server.before_request(halteDatenstandFest)
+    app.server.teardown_request(gibDatenstandFrei)
+    app.server.before_request(starteMessung)
+    app.server.before_request(pruefeEtag)
+    # after_request läuft in umgekehrter Reihenfolge: erst Metriken, dann Komprimierung
+    app.server.after_request(komprimiereAntwort)
+    app.server.after_request(erfasseAntwort)
+    if manager is not None:
+        metriken.warteschlange = manager.handle
+        profilierung.warteschlange = manager.handle
+
+    if konfiguration["vorladen"]:
+        threading.Thread(target=datenstand, daemon=True).start()
+    if konfiguration["nachladen_sekunden"] > 0:
+        threading.Thread(target=nachladenSchleife, args=(konfiguration["nachladen_sekunden"],), daemon=True).start()
+    return app
+
+# WSGI-Einstiegspunkt, z.B. gunicorn "app_BigData:create_server()"
+def create_server(config=None):
+    return create_app(config).server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dashboard Klimastation Tübingen")
+    parser.add_argument("--daten", metavar="PFAD",
+                        help="Datei, Verzeichnis oder Muster (z.B. \"export/*.csv\") mit Dateien des Datenloggers "
+                             "(Standard: DATEN_PFAD oder " + file_path + ")")
+    parser.add_argument("--port", type=int,
+                        help="Port des Webservers (Standard: PORT oder 8080)")
+    parser.add_argument("--export", metavar="VERZEICHNIS",
+                        help="alle Tages-, Monats- und Jahresansichten statisch in VERZEICHNIS exportieren (inkrementell)")
+    parser.add_argument("--archivieren", metavar="DATEI",
+                        help="Rohdaten als komprimiertes Archiv (" + archiv_endung + ") in DATEI schreiben")
+    args = parser.parse_args()
+
+    config = {}
+    if args.daten:
+        config["daten_pfad"] = args.daten
+    if args.port:
+        config["port"] = args.port
+
+    if args.export:
+        konfiguration.update(config)
+        exportiereStatisch(args.export)
+        sys.exit(0)
+
+    if args.archivieren:
+        konfiguration.update(config)
+        dateien = datenDateien(konfiguration["daten_pfad"])
+        df = leseQuellen(dateien)
+        schreibeArchiv(df, args.archivieren)
+        print(f"Archiv geschrieben: {args.archivieren}, {len(df)} Zeilen, "
+              f"{sum(map(os.path.getsize, dateien)) / 2**20:.1f} MB -> {os.path.getsize(args.archivieren) / 2**20:.1f} MB "
+              f"(im Speicher {df.memory_usage(index=True).sum() / 2**20:.1f} MB)")
+        sys.exit(0)
 
+    print("-----------------------------")
+    print("Programm wird gestartet...")
+    print("-----------------------------")
 
+    app = create_app(config)
+    app.run(host=konfiguration["host"], port=konfiguration["port"], debug=konfiguration["debug"])
@@ -0,0 +1,263 @@
+# Benchmark für das Dashboard Klimastation Tübingen
+# Misst Einlesen, Rollups und alle Diagramm-Methoden (Tag, Monat, Jahr) auf synthetischen
+# Minutendaten im CR300-Format (Standard: 1, 5 und 20 Jahre) und schreibt die Ergebnisse
+# als JSON, damit sie zwischen Commits verglichen werden können.
+#   python benchmark_BigData.py --jahre 1 5 20 --ausgabe benchmark.json
+#   python benchmark_BigData.py --vergleich alt.json neu.json
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import app_BigData
+
+# Optional: Speichermessung über die RSS des Prozesses (pip install psutil)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Kopfzeilen einer CR300-Datei (TOA5)
+cr300_kopf = [
+    ["TOA5", "CR300Series", "CR300", "1234", "CR300.Std.10", "CPU:x.CR300", "1", "Table1"],
+    app_BigData.csv_spalten,
+    ["TS", "RN", "Deg", "meters/second", "Deg C", "%", "mbar", "mm", "", "mm", "kW/m^2", "MJ/m^2", ""],
+    ["", "", "Smp", "Avg", "Avg", "Avg", "Avg", "Avg", "Avg", "Tot", "Avg", "Tot", "Avg"]
+]
+
+# Synthetische Messwerte: Tages- und Jahresgang bei Temperatur, Luftfeuchte und Einstrahlung,
+# zufällige Windrichtung/-stärke und vereinzelte Regenereignisse
+def syntheticWerte(zeiten, rng, erster_record):
+    n = len(zeiten)
+    tag = zeiten.dayofyear.to_numpy()
+    stunde = zeiten.hour.to_numpy() + zeiten.minute.to_numpy() / 60
+    temperatur = 10 + 10 * np.sin((tag - 100) / 365 * 2 * np.pi) + 5 * np.sin((stunde - 9) / 24 * 2 * np.pi) + rng.normal(0, 0.5, n)
+    regen = np.where(rng.random(n) < 0.02, rng.gamma(1, 0.3, n), 0)
+    return pd.DataFrame({
+        "TIMESTAMP": zeiten.strftime("%Y-%m-%d %H:%M:%S"),
+        "RECORD": np.arange(erster_record, erster_record + n),
+        "WindDir": rng.uniform(0, 360, n).round(1),
+        "WS_ms_Avg": rng.gamma(1.5, 0.5, n).round(3),
+        "AirTC_Avg": temperatur.round(2),
+        "RH_Avg": np.clip(70 - 2 * (temperatur - 10) + rng.normal(0, 5, n), 5, 100).round(1),
+        "BP_mbar_Avg": (965 + rng.normal(0, 5, n)).round(1),
+        "Rain_mm_Avg": regen.round(2),
+        "HAmount_Avg": 0,
+        "Rain_mm_2_Tot": regen.round(2),
+        "SlrkW_Avg": (np.clip(np.sin((stunde - 6) / 12 * np.pi), 0, None) * 0.8).round(4),
+        "SlrMJ_Tot": 0,
+        "QR_Avg": 0
+    })
+
+# CR300-Datei mit Minutenwerten über mehrere Jahre erzeugen (jahrweise, damit der
+# Speicherbedarf nicht von der Länge abhängt). Pro Jahr fällt der Logger drei Tage aus.
+def erzeugeDaten(pfad, jahre, start="2000-01-01", seed=0):
+    rng = np.random.default_rng(seed)
+    anfang = pd.Timestamp(start)
+    record = 0
+    with open(pfad + ".tmp", "w", newline="", encoding="utf-8") as datei:
+        schreiber = csv.writer(datei, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        schreiber.writerows(cr300_kopf)
+        for jahr in range(jahre):
+            zeiten = pd.date_range(anfang + pd.DateOffset(years=jahr), anfang + pd.DateOffset(years=jahr + 1), freq="min", inclusive="left")
+            luecke = zeiten[0] + pd.Timedelta(days=int(rng.integers(30, 330)))
+            zeiten = zeiten[(zeiten < luecke) | (zeiten >= luecke + pd.Timedelta(days=3))]
+            werte = syntheticWerte(zeiten, rng, record)
+            werte.to_csv(datei, header=False, index=False, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+            record += len(werte)
+    os.replace(pfad + ".tmp", pfad)
+
+# Erzeugte Dateien werden wiederverwendet
+def testdaten(verzeichnis, jahre):
+    os.makedirs(verzeichnis, exist_ok=True)
+    pfad = os.path.join(verzeichnis, f"cr300_{jahre}jahre_1min.csv")
+    if not os.path.exists(pfad):
+        print(f"Erzeuge {pfad} ...")
+        erzeugeDaten(pfad, jahre)
+    return pfad
+
+def rssMb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    import resource
+    # ohne psutil nur der bisherige Höchstwert des Prozesses (Linux: KiB)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# Höchste RSS während einer Messung (Abtastung in einem eigenen Thread)
+class Spitzenspeicher:
+    def __init__(self, intervall=0.01):
+        self.intervall = intervall
+        self.spitze = 0.0
+        self.laeuft = threading.Event()
+
+    def abtasten(self):
+        while not self.laeuft.wait(self.intervall):
+            self.spitze = max(self.spitze, rssMb())
+
+    def __enter__(self):
+        self.vorher = self.spitze = rssMb()
+        self.thread = threading.Thread(target=self.abtasten, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *fehler):
+        self.laeuft.set()
+        self.thread.join()
+        self.spitze = max(self.spitze, rssMb())
+
+# Funktion mehrfach ausführen; Laufzeiten und Spitzenspeicher zurückgeben
+def messe(funktion, wiederholungen=1):
+    zeiten = []
+    with Spitzenspeicher() as speicher:
+        for _ in range(wiederholungen):
+            start = time.perf_counter()
+            ergebnis = funktion()
+            zeiten.append(time.perf_counter() - start)
+    return ergebnis, {
+        "sekunden": zeiten,
+        "min": min(zeiten),
+        "median": float(np.median(zeiten)),
+        "spitze_rss_mb": round(speicher.spitze, 1),
+        "zuwachs_rss_mb": round(speicher.spitze - speicher.vorher, 1)
+    }
+
+# Repräsentative Zeiträume in der Mitte der Daten, im selben Format wie die Hintergrund-Aufträge
+def testzeitraeume(df):
+    mitte = df.index[len(df) // 2]
+    return {
+        "D": ("D", str(mitte.date()), None, None),
+        "M": ("M", None, f"{mitte:%Y-%m}-01", None),
+        "Y": ("Y", None, None, str(mitte.year))
+    }
+
+# Alle Messungen für eine Datengröße (läuft in einem eigenen Prozess, siehe hauptprogramm)
+def benchmarkGroesse(jahre, verzeichnis, wiederholungen):
+    pfad = testdaten(verzeichnis, jahre)
+    ergebnisse = []
+
+    def eintrag(phase, messung, variante=None, **weitere):
+        ergebnisse.append(dict(jahre=jahre, phase=phase, variante=variante, **weitere, **messung))
+        name = phase + (" " + variante if variante else "")
+        print(f"  {jahre:>2} Jahre  {name:<24} {messung['median']:9.4f} s  {messung['spitze_rss_mb']:8.1f} MB")
+
+    df, messung = messe(lambda: app_BigData.leseDaten(pfad))
+    eintrag("einlesen", messung, zeilen=len(df), datei_mb=round(os.path.getsize(pfad) / 2**20, 1))
+
+    for freq, name in [("h", "stunde"), ("D", "tag"), ("M", "monat")]:
+        _, messung = messe(lambda: app_BigData.aggregiere(df, freq))
+        eintrag("rollup", messung, variante=name)
+
+    # Datenstand wie beim Start der App (alle Rollups), danach für die Diagramm-Methoden verwenden
+    stand, messung = messe(lambda: app_BigData.Datenstand(df))
+    eintrag("datenstand", messung)
+    app_BigData.aktueller_datenstand = stand
+
+    for art, zeitraum in testzeitraeume(df).items():
+        for methode in [app_BigData.updateGraph, app_BigData.updateRose, app_BigData.updateSolarMap, app_BigData.displayHumidity]:
+            # erster Aufruf getrennt (lazy Imports, Caches von Plotly)
+            figur, erster = messe(lambda: methode(*zeitraum))
+            _, messung = messe(lambda: methode(*zeitraum), wiederholungen)
+            eintrag(methode.__name__, messung, variante=art, erster_aufruf=erster["min"])
+
+            json_text, messung = messe(lambda: figur.to_json(), wiederholungen)
+            eintrag(methode.__name__ + ".json", messung, variante=art, bytes=len(json_text))
+    return ergebnisse
+
+def gitStand():
+    verzeichnis = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=verzeichnis, capture_output=True, text=True).stdout.strip()
+        geaendert = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=verzeichnis, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None, None
+    return commit or None, bool(geaendert)
+
+def metadaten(wiederholungen):
+    import plotly
+    commit, geaendert = gitStand()
+    return {
+        "commit": commit,
+        "lokal_geaendert": geaendert,
+        "zeitpunkt": datetime.now().isoformat(timespec="seconds"),
+        "wiederholungen": wiederholungen,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plotly": plotly.__version__,
+        "system": platform.platform(),
+        "prozessor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count()
+    }
+
+# Zwei Ergebnisdateien vergleichen (Median); Rückgabe: Anzahl der Verschlechterungen
+def vergleiche(alt_pfad, neu_pfad, schwelle):
+    with open(alt_pfad, encoding="utf-8") as datei:
+        alt = json.load(datei)
+    with open(neu_pfad, encoding="utf-8") as datei:
+        neu = json.load(datei)
+
+    def schluessel(e):
+        return e["jahre"], e["phase"], e["variante"] or ""
+
+    alt_werte = {schluessel(e): e["median"] for e in alt["ergebnisse"]}
+    print(f"{alt['meta'].get('commit')} -> {neu['meta'].get('commit')}")
+    langsamer = 0
+    for e in sorted(neu["ergebnisse"], key=schluessel):
+        vorher = alt_werte.get(schluessel(e))
+        if vorher is None:
+            continue
+        faktor = e["median"] / vorher if vorher > 0 else float("inf")
+        markierung = ""
+        if faktor > schwelle:
+            markierung = "  <- langsamer"
+            langsamer += 1
+        elif faktor < 1 / schwelle:
+            markierung = "  schneller"
+        name = e["phase"] + (" " + e["variante"] if e["variante"] else "")
+        print(f"{e['jahre']:>2} Jahre  {name:<24} {vorher:9.4f} s -> {e['median']:9.4f} s  x{faktor:5.2f}{markierung}")
+    return langsamer
+
+def hauptprogramm():
+    parser = argparse.ArgumentParser(description="Benchmark Dashboard Klimastation Tübingen")
+    parser.add_argument("--jahre", type=int, nargs="+", default=[1, 5, 20],
+                        help="Datengrößen in Jahren Minutenwerte (Standard: 1 5 20)")
+    parser.add_argument("--wiederholungen", type=int, default=5,
+                        help="Wiederholungen je Diagramm-Methode (Standard: 5)")
+    parser.add_argument("--daten", default="benchmark_daten", metavar="VERZEICHNIS",
+                        help="Verzeichnis für die erzeugten Testdaten (werden wiederverwendet)")
+    parser.add_argument("--ausgabe", default="benchmark.json", metavar="DATEI",
+                        help="Ergebnisdatei (JSON)")
+    parser.add_argument("--vergleich", nargs=2, metavar=("ALT", "NEU"),
+                        help="zwei Ergebnisdateien vergleichen statt zu messen")
+    parser.add_argument("--schwelle", type=float, default=1.10,
+                        help="ab diesem Faktor gilt eine Messung als langsamer (Standard: 1.10)")
+    args = parser.parse_args()
+
+    if args.vergleich:
+        sys.exit(1 if vergleiche(*args.vergleich, args.schwelle) else 0)
+
+    ergebnis = {"meta": metadaten(args.wiederholungen), "ergebnisse": []}
+    # jede Größe in einem frischen Prozess, damit sich Speicher und Caches nicht gegenseitig beeinflussen
+    kontext = multiprocessing.get_context("spawn")
+    for jahre in args.jahre:
+        print(f"{jahre} Jahre Minutenwerte:")
+        with kontext.Pool(1) as pool:
+            ergebnis["ergebnisse"] += pool.apply(benchmarkGroesse, (jahre, args.daten, args.wiederholungen))
+
+        # nach jeder Größe speichern, damit Teilergebnisse erhalten bleiben
+        with open(args.ausgabe, "w", encoding="utf-8") as datei:
+            json.dump(ergebnis, datei, indent=1)
+    print("Ergebnisse: " + args.ausgabe)
+
+if __name__ == '__main__':
+    hauptprogramm()
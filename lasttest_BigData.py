@@ -0,0 +1,409 @@
+# Lasttest für das Dashboard Klimastation Tübingen
+# Simuliert gleichzeitige Besucher gegen eine lokal gestartete Instanz. Jeder virtuelle Nutzer
+# ruft die Seite auf und wechselt danach zufällig Zeitraum (Auswahl-Dropdown, Day, Month, Year)
+# und Kacheln (checklist_variables). Die ausgelösten Callbacks werden wie im Browser über
+# /_dash-update-component angefragt, Hintergrund-Callbacks bis zum Ergebnis abgefragt.
+# Die Anzahl gleichzeitiger Nutzer wird stufenweise erhöht; je Stufe werden Durchsatz und
+# p50/p95/p99 der Latenz pro Callback ausgegeben und als JSON gespeichert.
+#   python lasttest_BigData.py --nutzer 1 2 4 8 16 --dauer 30
+#   python lasttest_BigData.py --url http://127.0.0.1:8080 (bereits laufende lokale Instanz)
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode, urlparse
+
+import numpy as np
+import requests
+
+lokale_hosts = ("127.0.0.1", "localhost", "::1")
+
+# Kürzel der Diagramm-Kacheln und ihr Wert in checklist_variables (wie diagramm_kacheln in app_BigData.py)
+kachel_kuerzel = {"TN": "temp_ns", "W": "wind", "SE": "SR", "RH": "RH"}
+
+# Ausgänge eines Callbacks aus dem Output-String von /_dash-dependencies
+# ("id.prop" oder "..id1.prop1...id2.prop2.." bei mehreren Ausgängen, ggf. mit "@hash")
+def zerlegeAusgaben(output):
+    mehrere = output.startswith("..")
+    ausgaben = []
+    for teil in (output[2:-2].split("...") if mehrere else [output]):
+        id, prop = teil.rsplit(".", 1)
+        ausgaben.append({"id": id, "property": prop.split("@")[0]})
+    return ausgaben, mehrere
+
+# Anfangswerte aller Eigenschaften mit id aus dem Layout sammeln
+def sammleWerte(knoten, werte):
+    if isinstance(knoten, list):
+        for kind in knoten:
+            sammleWerte(kind, werte)
+    elif isinstance(knoten, dict) and "props" in knoten:
+        props = knoten["props"]
+        for name, wert in props.items():
+            # Kind-Komponenten sind keine Werte
+            if "id" in props and not (name == "children" and isinstance(wert, (dict, list))):
+                werte[(props["id"], name)] = wert
+        sammleWerte(props.get("children"), werte)
+    return werte
+
+# Statische Beschreibung der App: Callbacks und Anfangswerte aus dem Layout
+class Dashboard:
+    def __init__(self, basis):
+        self.basis = basis.rstrip("/")
+        layout = requests.get(self.basis + "/_dash-layout", timeout=300).json()
+        abhaengigkeiten = requests.get(self.basis + "/_dash-dependencies", timeout=60).json()
+
+        self.startwerte = sammleWerte(layout, {})
+        self.callbacks = []
+        self.sitzungs_caches = []
+        for cb in abhaengigkeiten:
+            # clientseitige Callbacks laufen im Browser, nicht auf dem Server; nachgebildet wird nur
+            # der Sitzungs-Cache der Diagramm-Kacheln, der die Server-Callbacks auslöst
+            if cb.get("clientside_function"):
+                ausgaben, _ = zerlegeAusgaben(cb["output"])
+                anfrage = next((a["id"] for a in ausgaben if a["id"].startswith("anfrage_")), None)
+                if anfrage is not None:
+                    self.sitzungs_caches.append({
+                        "anfrage": anfrage,
+                        "kachel": kachel_kuerzel[anfrage[len("anfrage_"):]],
+                        "eingaenge": {(e["id"], e["property"]) for e in cb["inputs"]}
+                    })
+                continue
+            ausgaben, mehrere = zerlegeAusgaben(cb["output"])
+            # Dash 2 nennt Hintergrund-Callbacks in den Abhängigkeiten "long", Dash 3 "background"
+            hintergrund = cb.get("background") or cb.get("long")
+            cb = dict(cb, ausgaben=ausgaben, mehrere=mehrere, hintergrund=hintergrund)
+            cb["name"] = "+".join(dict.fromkeys(a["id"] for a in ausgaben)) + (" [hintergrund]" if hintergrund else "")
+            cb["eingaenge"] = {(e["id"], e["property"]) for e in cb["inputs"]}
+            self.callbacks.append(cb)
+
+        # Auswahlmöglichkeiten für die Nutzer aus dem Layout
+        self.tag_min = date.fromisoformat(str(self.startwerte[("Day", "min_date_allowed")])[:10])
+        self.tag_max = date.fromisoformat(str(self.startwerte[("Day", "max_date_allowed")])[:10])
+        self.jahre = [o["value"] for o in self.startwerte[("Year", "options")]]
+        self.kacheln = [o["value"] for o in self.startwerte[("checklist_variables", "options")]]
+
+# Latenzen pro Stufe und Callback (thread-sicher)
+class Messung:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stufe = None
+        self.werte = {}
+        self.aktionen = {}
+
+    def erfasse(self, stufe, name, sekunden, status, groesse, abfragen=0):
+        with self.lock:
+            self.werte.setdefault(stufe, {}).setdefault(name, []).append((sekunden, status, groesse, abfragen))
+
+    def aktion(self, stufe):
+        with self.lock:
+            self.aktionen[stufe] = self.aktionen.get(stufe, 0) + 1
+
+# Ein virtueller Nutzer (eigene HTTP-Sitzung und eigener Zustand der Komponenten)
+class Sitzung:
+    def __init__(self, dashboard, messung, rng):
+        self.dashboard = dashboard
+        self.messung = messung
+        self.rng = rng
+        self.http = requests.Session()
+        self.werte = dict(dashboard.startwerte)
+        self.jobs = {}
+        # im Sitzungs-Cache des Browsers liegende Zeiträume (bleibt wie sessionStorage über Seitenaufrufe erhalten)
+        self.gesehen = set()
+
+    def anfrage(self, pfad, payload):
+        antwort = self.http.post(self.dashboard.basis + pfad, json=payload, timeout=300)
+        return antwort, len(antwort.content)
+
+    def payload(self, cb, geaendert):
+        def wert(abhaengigkeit):
+            return dict(abhaengigkeit, value=self.werte.get((abhaengigkeit["id"], abhaengigkeit["property"])))
+        return {
+            "output": cb["output"],
+            "outputs": cb["ausgaben"] if cb["mehrere"] else cb["ausgaben"][0],
+            "inputs": [wert(e) for e in cb["inputs"]],
+            "changedPropIds": [f"{id}.{prop}" for id, prop in geaendert if (id, prop) in cb["eingaenge"]],
+            "state": [wert(s) for s in cb["state"]]
+        }
+
+    # Einen Callback ausführen; Rückgabe: geänderte Eigenschaften
+    def aufrufen(self, cb, geaendert):
+        stufe = self.messung.stufe
+        payload = self.payload(cb, geaendert)
+        start = time.perf_counter()
+        groesse = 0
+        abfragen = 0
+
+        pfad = "/_dash-update-component"
+        if cb["hintergrund"] and cb["output"] in self.jobs:
+            # wie der Browser: noch laufenden Auftrag dieses Callbacks abbrechen lassen
+            pfad += "?" + urlencode({"oldJob": self.jobs.pop(cb["output"])})
+        antwort, n = self.anfrage(pfad, payload)
+        groesse += n
+        daten = antwort.json() if antwort.status_code == 200 else None
+
+        # Hintergrund-Callback: Auftrag abfragen, bis das Ergebnis da ist
+        if daten is not None and "cacheKey" in daten:
+            self.jobs[cb["output"]] = daten["job"]
+            intervall = cb["hintergrund"].get("interval", 1000) / 1000
+            abfrage = "/_dash-update-component?" + urlencode({"cacheKey": daten["cacheKey"], "job": daten["job"]})
+            while True:
+                time.sleep(intervall)
+                abfragen += 1
+                antwort, n = self.anfrage(abfrage, payload)
+                groesse += n
+                daten = antwort.json() if antwort.status_code == 200 else None
+                if daten is None or "response" in daten:
+                    break
+            self.jobs.pop(cb["output"], None)
+
+        self.messung.erfasse(stufe, cb["name"], time.perf_counter() - start, antwort.status_code, groesse, abfragen)
+        if daten is None or "response" not in daten:
+            return set()
+
+        neu = set()
+        for id, props in daten["response"].items():
+            for prop, wert in props.items():
+                self.werte[(id, prop)] = wert
+                neu.add((id, prop))
+        return neu
+
+    # Sitzungs-Cache einer Diagramm-Kachel (sitzung_kachel_js im Browser): ausgeblendete Kacheln und
+    # schon gesehene Zeiträume des Datenstands lösen keine Anfrage aus, sonst wird "anfrage_<kürzel>" gesetzt
+    def sitzungsCache(self, cache):
+        if cache["kachel"] not in (self.werte.get(("checklist_variables", "value")) or []):
+            return set()
+        time = self.werte.get(("Auswahl-Dropdown", "value"))
+        anfrage = {
+            "time": time,
+            "Day": self.werte.get(("Day", "date")) if time == "D" else None,
+            "Month": self.werte.get(("Month", "date")) if time == "M" else None,
+            "Year": self.werte.get(("Year", "value")) if time == "Y" else None,
+            "version": self.werte.get(("abdeckung_version", "data"))
+        }
+        schluessel = (cache["anfrage"], json.dumps(anfrage, sort_keys=True))
+        if schluessel in self.gesehen:
+            return set()
+        self.gesehen.add(schluessel)
+        self.werte[(cache["anfrage"], "data")] = anfrage
+        return {(cache["anfrage"], "data")}
+
+    # Alle von den Änderungen ausgelösten Callbacks ausführen, inkl. Ketten (z.B. Auftrag -> Hintergrund)
+    def ausloesen(self, geaendert, erstaufruf=False):
+        for _ in range(10):
+            if erstaufruf:
+                offen = [cb for cb in self.dashboard.callbacks if not cb.get("prevent_initial_call")]
+                caches = self.dashboard.sitzungs_caches
+                erstaufruf = False
+            else:
+                offen = [cb for cb in self.dashboard.callbacks if cb["eingaenge"] & geaendert]
+                caches = [cache for cache in self.dashboard.sitzungs_caches if cache["eingaenge"] & geaendert]
+            if not offen and not caches:
+                return
+            neu = set()
+            for cache in caches:
+                neu |= self.sitzungsCache(cache)
+            for cb in offen:
+                neu |= self.aufrufen(cb, geaendert)
+            geaendert = neu
+
+    def seitenaufruf(self):
+        stufe = self.messung.stufe
+        start = time.perf_counter()
+        antwort = self.http.get(self.dashboard.basis + "/_dash-layout", timeout=300)
+        self.messung.erfasse(stufe, "_dash-layout", time.perf_counter() - start, antwort.status_code, len(antwort.content))
+        self.werte = dict(self.dashboard.startwerte)
+        self.jobs = {}
+        self.ausloesen(set(), erstaufruf=True)
+
+    def zufallsTag(self):
+        tage = (self.dashboard.tag_max - self.dashboard.tag_min).days
+        return str(self.dashboard.tag_min + timedelta(days=self.rng.randint(0, max(tage, 0))))
+
+    # Eine zufällige Nutzeraktion: Zeitraum wechseln oder Kachel ein-/ausblenden
+    def aktion(self):
+        wahl = self.rng.random()
+        if wahl < 0.25:
+            geaendert = {("Auswahl-Dropdown", "value")}
+            self.werte[("Auswahl-Dropdown", "value")] = self.rng.choice(["D", "M", "Y"])
+        elif wahl < 0.5:
+            geaendert = {("Day", "date")}
+            self.werte[("Day", "date")] = self.zufallsTag()
+        elif wahl < 0.7:
+            geaendert = {("Month", "date")}
+            self.werte[("Month", "date")] = self.zufallsTag()[:8] + "01"
+        elif wahl < 0.85:
+            geaendert = {("Year", "value")}
+            self.werte[("Year", "value")] = self.rng.choice(self.dashboard.jahre)
+        else:
+            geaendert = {("checklist_variables", "value")}
+            auswahl = list(self.werte.get(("checklist_variables", "value")) or [])
+            kachel = self.rng.choice(self.dashboard.kacheln)
+            if kachel in auswahl:
+                auswahl.remove(kachel)
+            else:
+                auswahl.append(kachel)
+            self.werte[("checklist_variables", "value")] = auswahl
+        self.ausloesen(geaendert)
+        self.messung.aktion(self.messung.stufe)
+
+def virtuellerNutzer(dashboard, messung, stopp, seed, aktionen_pro_sitzung, denkzeit):
+    rng = random.Random(seed)
+    sitzung = Sitzung(dashboard, messung, rng)
+    while not stopp.is_set():
+        try:
+            sitzung.seitenaufruf()
+            for _ in range(aktionen_pro_sitzung):
+                if stopp.wait(rng.expovariate(1 / denkzeit) if denkzeit > 0 else 0):
+                    break
+                sitzung.aktion()
+        except (requests.RequestException, ValueError) as fehler:
+            messung.erfasse(messung.stufe, "fehler", 0.0, type(fehler).__name__, 0)
+
+def auswerten(messung, stufe, nutzer, dauer):
+    werte = messung.werte.get(stufe, {})
+    callbacks = {}
+    alle = []
+    anfragen = 0
+    for name, eintraege in sorted(werte.items()):
+        latenzen = np.array([e[0] for e in eintraege])
+        fehler = sum(1 for e in eintraege if e[1] != 200 and e[1] != 204)
+        anfragen += len(eintraege) + sum(e[3] for e in eintraege)
+        alle.append(latenzen)
+        callbacks[name] = {
+            "anzahl": len(eintraege),
+            "fehler": fehler,
+            "p50": float(np.percentile(latenzen, 50)),
+            "p95": float(np.percentile(latenzen, 95)),
+            "p99": float(np.percentile(latenzen, 99)),
+            "max": float(latenzen.max()),
+            "bytes_mittel": float(np.mean([e[2] for e in eintraege])),
+            "abfragen_mittel": float(np.mean([e[3] for e in eintraege]))
+        }
+    alle = np.concatenate(alle) if alle else np.array([0.0])
+    return {
+        "nutzer": nutzer,
+        "dauer": dauer,
+        "aktionen": messung.aktionen.get(stufe, 0),
+        "aktionen_pro_s": messung.aktionen.get(stufe, 0) / dauer,
+        "anfragen": anfragen,
+        "anfragen_pro_s": anfragen / dauer,
+        "p50": float(np.percentile(alle, 50)),
+        "p95": float(np.percentile(alle, 95)),
+        "p99": float(np.percentile(alle, 99)),
+        "callbacks": callbacks
+    }
+
+def drucke(ergebnis):
+    print(f"\n{ergebnis['nutzer']} Nutzer: {ergebnis['aktionen_pro_s']:.2f} Aktionen/s, {ergebnis['anfragen_pro_s']:.2f} Anfragen/s, "
+          f"p50 {ergebnis['p50'] * 1000:.0f} ms, p95 {ergebnis['p95'] * 1000:.0f} ms, p99 {ergebnis['p99'] * 1000:.0f} ms")
+    print(f"  {'Callback':<58} {'n':>5} {'Fehler':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'kB':>7}")
+    for name, w in ergebnis["callbacks"].items():
+        print(f"  {name[:58]:<58} {w['anzahl']:>5} {w['fehler']:>6} {w['p50'] * 1000:>8.0f} {w['p95'] * 1000:>8.0f} "
+              f"{w['p99'] * 1000:>8.0f} {w['bytes_mittel'] / 1024:>7.1f}")
+
+# Lokale Instanz in einem eigenen Prozess starten (eigener, leerer Hintergrund-Cache)
+def starteInstanz(port, daten_pfad):
+    cache = tempfile.mkdtemp(prefix="lasttest_cache_")
+    umgebung = dict(os.environ, HINTERGRUND_CACHE=cache)
+    app_pfad = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_BigData.py")
+    prozess = subprocess.Popen(
+        [sys.executable, app_pfad, "--port", str(port), "--daten", daten_pfad],
+        env=umgebung, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    basis = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        if prozess.poll() is not None:
+            raise RuntimeError("Instanz wurde beendet (Exit-Code %s)" % prozess.returncode)
+        try:
+            requests.get(basis + "/", timeout=5)
+            return prozess, basis, cache
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    prozess.terminate()
+    raise RuntimeError("Instanz antwortet nicht auf " + basis)
+
+def hauptprogramm():
+    parser = argparse.ArgumentParser(description="Lasttest Dashboard Klimastation Tübingen")
+    parser.add_argument("--nutzer", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Stufen gleichzeitiger Nutzer (Standard: 1 2 4 8 16)")
+    parser.add_argument("--dauer", type=float, default=30, help="Sekunden pro Stufe (Standard: 30)")
+    parser.add_argument("--denkzeit", type=float, default=1.0,
+                        help="mittlere Pause zwischen zwei Aktionen in Sekunden (Standard: 1.0, 0 = keine)")
+    parser.add_argument("--aktionen", type=int, default=20, help="Aktionen pro Sitzung bis zum nächsten Seitenaufruf")
+    parser.add_argument("--url", help="bereits laufende lokale Instanz statt eine zu starten")
+    parser.add_argument("--port", type=int, default=8765, help="Port der gestarteten Instanz (Standard: 8765)")
+    parser.add_argument("--daten", help="Datei für die gestartete Instanz (Standard: 1 Jahr synthetische Minutendaten)")
+    parser.add_argument("--ausgabe", default="lasttest.json", metavar="DATEI", help="Ergebnisdatei (JSON)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    prozess = cache = None
+    if args.url:
+        if urlparse(args.url).hostname not in lokale_hosts:
+            parser.error("Lasttests nur gegen lokale Instanzen (" + ", ".join(lokale_hosts) + ")")
+        basis = args.url
+    else:
+        daten_pfad = args.daten
+        if daten_pfad is None:
+            import benchmark_BigData
+            daten_pfad = benchmark_BigData.testdaten("benchmark_daten", 1)
+        print("Starte lokale Instanz ...")
+        prozess, basis, cache = starteInstanz(args.port, daten_pfad)
+
+    try:
+        dashboard = Dashboard(basis)
+        messung = Messung()
+
+        # Aufwärmen: Daten einlesen lassen, erste Aufrufe (Imports, Caches) nicht mitmessen
+        messung.stufe = "aufwaermen"
+        start = time.perf_counter()
+        Sitzung(dashboard, messung, random.Random(args.seed)).seitenaufruf()
+        print(f"Aufwärmen: {time.perf_counter() - start:.1f} s, {len(dashboard.callbacks)} Callbacks")
+
+        ergebnis = {
+            "meta": {
+                "zeitpunkt": datetime.now().isoformat(timespec="seconds"),
+                "basis": basis,
+                "dauer": args.dauer,
+                "denkzeit": args.denkzeit,
+                "aktionen_pro_sitzung": args.aktionen,
+                "cpus": os.cpu_count()
+            },
+            "stufen": []
+        }
+        for nutzer in args.nutzer:
+            messung.stufe = nutzer
+            stopp = threading.Event()
+            threads = [
+                threading.Thread(target=virtuellerNutzer, args=(dashboard, messung, stopp, args.seed * 1000 + i, args.aktionen, args.denkzeit), daemon=True)
+                for i in range(nutzer)
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            time.sleep(args.dauer)
+            stopp.set()
+            for thread in threads:
+                thread.join()
+            stufe = auswerten(messung, nutzer, nutzer, time.perf_counter() - start)
+            drucke(stufe)
+            ergebnis["stufen"].append(stufe)
+
+            with open(args.ausgabe, "w", encoding="utf-8") as datei:
+                json.dump(ergebnis, datei, indent=1)
+        print("\nErgebnisse: " + args.ausgabe)
+    finally:
+        if prozess is not None:
+            prozess.terminate()
+            prozess.wait()
+            shutil.rmtree(cache, ignore_errors=True)
+
+if __name__ == '__main__':
+    hauptprogramm()
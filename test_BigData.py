@@ -0,0 +1,237 @@
+# Tests für das Dashboard Klimastation Tübingen
+# Arbeiten auf kleinen synthetischen Dateien im CR300-Format (wie benchmark_BigData.py).
+#   python -m pytest -q test_BigData.py
+import csv
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app_BigData
+from benchmark_BigData import cr300_kopf, syntheticWerte
+
+# CR300-Datei mit 10-Minuten-Werten über zwei Jahreswechsel, mit zwei Tagen Ausfall
+def schreibeLoggerDatei(pfad, start="2000-07-01", ende="2002-03-01", freq="10min", seed=1):
+    zeiten = pd.date_range(start, ende, freq=freq, inclusive="left")
+    zeiten = zeiten[(zeiten < "2001-03-10") | (zeiten >= "2001-03-12")]
+    werte = syntheticWerte(zeiten, np.random.default_rng(seed), 0)
+    with open(pfad, "w", newline="", encoding="utf-8") as datei:
+        csv.writer(datei, quoting=csv.QUOTE_ALL, lineterminator="\n").writerows(cr300_kopf)
+        werte.to_csv(datei, header=False, index=False, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+
+@pytest.fixture
+def konfiguration(tmp_path, monkeypatch):
+    monkeypatch.setitem(app_BigData.konfiguration, "speicher_verzeichnis", str(tmp_path / "speicher"))
+    monkeypatch.setitem(app_BigData.konfiguration, "speicher_budget_mb", None)
+    monkeypatch.setattr(app_BigData, "aktueller_datenstand", None)
+    return app_BigData.konfiguration
+
+def vergleicheDatenstand(stand, voll):
+    assert stand.version == voll.version
+    assert len(stand.roh) == len(voll.roh)
+    pd.testing.assert_frame_equal(pd.concat(stand.roh.bloecke()), pd.concat(voll.roh.bloecke()))
+    pd.testing.assert_frame_equal(stand.df_hourly, voll.df_hourly)
+    pd.testing.assert_frame_equal(stand.df_daily, voll.df_daily)
+    pd.testing.assert_frame_equal(stand.df_monthly, voll.df_monthly)
+    np.testing.assert_array_equal(stand.abdeckung.stunden_summe, voll.abdeckung.stunden_summe)
+
+    for freq, klima in voll.klima.items():
+        assert stand.klima[freq].bis == klima.bis
+        for variable, felder in klima.werte.items():
+            for name, feld in felder.items():
+                np.testing.assert_allclose(stand.klima[freq].werte[variable][name], feld, rtol=1e-9, atol=1e-9, err_msg=f"{freq} {variable} {name}")
+
+    for freq, skizzen in voll.skizzen.items():
+        assert stand.skizzen[freq].index.equals(skizzen.index)
+        for variable, felder in skizzen.werte.items():
+            for name, feld in felder.items():
+                np.testing.assert_array_equal(stand.skizzen[freq].werte[variable][name], feld, err_msg=f"{freq} {variable} {name}")
+
+# Diagramme für einen Tag, einen Monat und ein Jahr aus dem aktuellen Datenstand
+zeitraeume = [("D", "2001-06-15", None, None), ("M", None, "2001-11-01", None), ("Y", None, None, "2001")]
+
+def diagramme():
+    methoden = [app_BigData.updateGraph, app_BigData.updateRose, app_BigData.updateSolarMap, app_BigData.displayHumidity]
+    return [json.loads(methode(*zeitraum).to_json()) for methode in methoden for zeitraum in zeitraeume]
+
+# Zahlen mit Toleranz vergleichen: Die Klimatologie wird beim Nachladen inkrementell (Chan et al.)
+# zusammengeführt und kann in den letzten Stellen vom vollständigen Einlesen abweichen
+def gleich(a, b):
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(gleich(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(map(gleich, a, b))
+    if isinstance(a, float) and isinstance(b, (int, float)):
+        return b == pytest.approx(a, rel=1e-9, abs=1e-9)
+    return a == b
+
+# Nachladen: Die zweite Hälfte der Datei wird in zufälligen Stücken angehängt (auch mitten in einer
+# Zeile), nach jedem Stück läuft ladeNach(). Das Ergebnis muss dem vollständigen Einlesen entsprechen,
+# auch wenn unterwegs Jahre wegen des Speicherbudgets ausgelagert werden.
+@pytest.mark.parametrize("budget_mb", [None, 6])
+def test_nachladen_wie_vollstaendig(tmp_path, konfiguration, monkeypatch, budget_mb):
+    quelle = tmp_path / "quelle.csv"
+    schreibeLoggerDatei(quelle)
+    inhalt = quelle.read_bytes()
+
+    pfad = str(tmp_path / "logger.csv")
+    monkeypatch.setitem(konfiguration, "daten_pfad", pfad)
+    monkeypatch.setitem(konfiguration, "speicher_budget_mb", budget_mb)
+    anfang = inhalt.index(b"\n", len(inhalt) // 5) + 1
+    with open(pfad, "wb") as datei:
+        datei.write(inhalt[:anfang])
+    app_BigData.datenstand()
+
+    rng = np.random.default_rng(0)
+    schnitte = sorted(rng.choice(np.arange(anfang + 1, len(inhalt)), size=15, replace=False)) + [len(inhalt)]
+    position = anfang
+    for schnitt in schnitte:
+        with open(pfad, "ab") as datei:
+            datei.write(inhalt[position:schnitt])
+        position = schnitt
+        app_BigData.ladeNach()
+        stand = app_BigData.aktueller_datenstand
+        assert stand.quelle_bytes <= schnitt
+        if budget_mb is not None:
+            assert stand.speicherbericht()["im_budget"]
+    assert stand.quelle_bytes == len(inhalt)
+
+    voll = app_BigData.Datenstand(app_BigData.leseDaten(pfad, still=True), quelle_bytes=len(inhalt))
+    vergleicheDatenstand(stand, voll)
+    if budget_mb is not None:
+        assert stand.speicherbericht()["roh_datei_jahre"] == [2000]
+
+    fingerabdruck, figuren = app_BigData.periodenFingerabdruecke(), diagramme()
+    monkeypatch.setattr(app_BigData, "aktueller_datenstand", voll)
+    assert fingerabdruck == app_BigData.periodenFingerabdruecke()
+    assert gleich(figuren, diagramme())
+
+# Die Nachlade-Schleife läuft nach einem Fehler weiter und endet, sobald nachladen_stop gesetzt ist
+def test_nachladen_schleife(monkeypatch):
+    aufrufe = []
+    def ladeNach():
+        aufrufe.append(len(aufrufe))
+        if len(aufrufe) == 1:
+            raise OSError("Datei nicht lesbar")
+        app_BigData.nachladen_stop.set()
+    monkeypatch.setattr(app_BigData, "ladeNach", ladeNach)
+    monkeypatch.setattr(app_BigData, "nachladen_stop", threading.Event())
+    app_BigData.nachladenSchleife(0.01)
+    assert aufrufe == [0, 1]
+
+# Mehrere Logger-Dateien in einem Verzeichnis: Reihenfolge nach Änderungszeit (nicht nach Namen),
+# überlappende Datensätze (gleicher TIMESTAMP und RECORD) nur einmal, mit den Werten der zuletzt
+# geänderten Datei
+def test_mehrere_dateien(tmp_path):
+    quelle = tmp_path / "quelle.csv"
+    schreibeLoggerDatei(quelle, start="2001-01-01", ende="2001-01-04")
+    zeilen = quelle.read_text(encoding="utf-8").splitlines(keepends=True)
+    kopf, daten = zeilen[:len(cr300_kopf)], zeilen[len(cr300_kopf):]
+
+    # c.csv ist die älteste, b.dat die neueste Datei, a.csv überlappt mit beiden. In der neuesten
+    # Datei hat ein überlappender Datensatz eine korrigierte Temperatur.
+    teile = {"c.csv": daten[:200], "a.csv": daten[150:350], "b.dat": daten[300:]}
+    felder = daten[320].rstrip("\n").split(",")
+    felder[4] = "99.5"
+    teile["b.dat"][20] = ",".join(felder) + "\n"
+    verzeichnis = tmp_path / "logger"
+    verzeichnis.mkdir()
+    for i, (name, teil) in enumerate(teile.items()):
+        (verzeichnis / name).write_text("".join(kopf + teil), encoding="utf-8")
+        os.utime(verzeichnis / name, (1e9 + i, 1e9 + i))
+    (verzeichnis / "notizen.txt").write_text("keine Messwerte")
+
+    dateien = app_BigData.datenDateien(str(verzeichnis))
+    assert [os.path.basename(datei) for datei in dateien] == ["c.csv", "a.csv", "b.dat"]
+    assert app_BigData.datenDateien(str(verzeichnis / "*.csv")) == dateien[:2]
+
+    erwartet = app_BigData.leseDaten(str(quelle), still=True)
+    erwartet.iloc[320, erwartet.columns.get_loc("AirTC_Avg")] = 99.5
+    pd.testing.assert_frame_equal(app_BigData.leseQuellen(dateien, still=True), erwartet, check_freq=False)
+
+# Rohdaten-Tabelle: Filter und Sortierung wie mit pandas; Teile, deren Wert nicht zur Spalte passt
+# oder deren Spalte es nicht gibt, werden ignoriert
+@pytest.mark.parametrize("filter_query, sort_by, auswahl", [
+    ("{AirTC_Avg} > 20 && {RH_Avg} <= 55", None, lambda df: df[(df["AirTC_Avg"] > 20) & (df["RH_Avg"] <= 55)]),
+    ("{TIMESTAMP} datestartswith 2001-06-15 1 && {TIMESTAMP} contains 2001-06-15", None, lambda df: df),
+    ("{TIMESTAMP} datestartswith 2001-06-15 12", [{"column_id": "AirTC_Avg", "direction": "asc"}],
+     lambda df: df[df.index.hour == 12].sort_values("AirTC_Avg", kind="stable")),
+    ('{TIMESTAMP} >= "2001-06-15 18:00" && {WindDir} ne 0', None, lambda df: df[df.index >= "2001-06-15 18:00"]),
+    ("{AirTC_Avg} > abc && {Unbekannt} > 3 && {TIMESTAMP} < xyz", None, lambda df: df),
+    (None, [{"column_id": "RH_Avg", "direction": "desc"}, {"column_id": "TIMESTAMP", "direction": "asc"}],
+     lambda df: df.sort_values(["RH_Avg", "TIMESTAMP"], ascending=[False, True], kind="stable")),
+    ("{AirTC_Avg} >= 15", [{"column_id": "TIMESTAMP", "direction": "desc"}], lambda df: df[df["AirTC_Avg"] >= 15].iloc[::-1]),
+])
+def test_tabelle_filter_und_sortierung(tmp_path, konfiguration, monkeypatch, filter_query, sort_by, auswahl):
+    quelle = tmp_path / "quelle.csv"
+    schreibeLoggerDatei(quelle, start="2001-06-14", ende="2001-06-17")
+    stand = app_BigData.Datenstand(app_BigData.leseDaten(str(quelle), still=True))
+    monkeypatch.setattr(app_BigData, "aktueller_datenstand", stand)
+
+    erwartet = auswahl(stand.roh.ausschnitt(pd.Timestamp("2001-06-15"), pd.Timestamp("2001-06-16"))).reset_index()
+    erwartet["TIMESTAMP"] = erwartet["TIMESTAMP"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    erwartet = erwartet.to_dict("records")
+    assert len(erwartet) > 4
+
+    # zweite Seite zu je 4 Zeilen
+    zeilen, seiten = app_BigData.updateTabelle("D", "2001-06-15", None, None, 1, 4, sort_by, filter_query, ["table"])
+    assert zeilen == erwartet[4:8]
+    assert seiten == -(-len(erwartet) // 4)
+
+# Archivformat: verlustfrei (auch NaN, negative Null und Werte ohne kurze Dezimaldarstellung) und
+# Bereichsabfragen über mehrere Blöcke wie auf dem DataFrame
+@pytest.fixture
+def archivdaten(tmp_path):
+    quelle = tmp_path / "quelle.csv"
+    schreibeLoggerDatei(quelle, start="2000-12-30", ende="2001-01-03", freq="min")
+    df = app_BigData.leseDaten(str(quelle), still=True)
+    rng = np.random.default_rng(2)
+    df.iloc[rng.choice(len(df), 50, replace=False), df.columns.get_loc("AirTC_Avg")] = np.nan
+    df.iloc[rng.choice(len(df), 20, replace=False), df.columns.get_loc("Rain_mm_Avg")] = -0.0
+    df["SlrkW_Avg"] = rng.random(len(df)) * np.pi
+    df.iloc[100:600, df.columns.get_loc("RH_Avg")] = np.nan
+    return df
+
+def test_archiv_verlustfrei(tmp_path, archivdaten):
+    pfad = str(tmp_path / ("daten" + app_BigData.archiv_endung))
+    app_BigData.schreibeArchiv(archivdaten, pfad, blockgroesse=500)
+    gelesen = app_BigData.Archiv(pfad).rahmen(slice(None))
+    assert gelesen.index.equals(archivdaten.index)
+    assert list(gelesen.columns) == list(archivdaten.columns)
+    # bitweise gleich, damit auch NaN und -0.0 erhalten bleiben
+    np.testing.assert_array_equal(gelesen.to_numpy().view(np.int64), archivdaten.to_numpy(dtype=float).view(np.int64))
+
+def test_archiv_bereichsabfragen(tmp_path, archivdaten):
+    pfad = str(tmp_path / ("daten" + app_BigData.archiv_endung))
+    app_BigData.schreibeArchiv(archivdaten, pfad, blockgroesse=500)
+    archiv = app_BigData.Archiv(pfad)
+    index = archivdaten.index
+    rng = np.random.default_rng(3)
+    grenzen = [index[0] - pd.Timedelta(days=1), index[0], index[499], index[500], index[-1], index[-1] + pd.Timedelta(days=1),
+               *(index[0] + pd.to_timedelta(rng.uniform(0, 4 * 24 * 3600, 30), unit="s"))]
+    np.testing.assert_array_equal(archiv.searchsorted(grenzen), index.searchsorted(grenzen))
+    for start, ende in zip(grenzen[::2], grenzen[1::2]):
+        start, ende = min(start, ende), max(start, ende)
+        erwartet = archivdaten[(index >= start) & (index < ende)]
+        pd.testing.assert_frame_equal(archiv.ausschnitt(start, ende), erwartet, check_freq=False)
+    positionen = rng.integers(0, len(archivdaten), 300)
+    pd.testing.assert_frame_equal(archiv.rahmen(positionen), archivdaten.iloc[positionen], check_freq=False)
+
+# Ausgelagerte Jahre im Archivformat: Abfragen über die Grenze zwischen Datei und Speicher, und ein
+# älterer Datenstand bleibt lesbar, auch wenn seine Datei schon gelöscht wurde
+def test_rohdaten_mit_archiv(konfiguration, monkeypatch, archivdaten):
+    monkeypatch.setitem(konfiguration, "speicher_format", "archiv")
+    budget = int(archivdaten[archivdaten.index.year == 2001].memory_usage(index=True).sum()) + 1024
+    roh = app_BigData.Rohdaten(archivdaten, budget=budget, reserviert=0, verzeichnis=konfiguration["speicher_verzeichnis"] + "/v1")
+    assert isinstance(roh.teile[0], app_BigData.ArchivJahr) and roh.teile[0].jahr == 2000
+    assert isinstance(roh.teile[1], pd.DataFrame) and roh.teile[1].index[0].year == 2001
+    start, ende = pd.Timestamp("2000-12-31 23:00"), pd.Timestamp("2001-01-01 01:00")
+    erwartet = archivdaten[(archivdaten.index >= start) & (archivdaten.index < ende)]
+    pd.testing.assert_frame_equal(roh.ausschnitt(start, ende), erwartet, check_freq=False)
+
+    app_BigData.os.remove(roh.teile[0].pfad)
+    roh.teile[0].cache.clear()
+    pd.testing.assert_frame_equal(roh.ausschnitt(start, ende), erwartet, check_freq=False)